@@ -2,30 +2,38 @@
 from telethon import TelegramClient, events, Button, types
 from telethon.tl.functions.users import GetFullUserRequest
 from telethon.sessions import StringSession
-from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError, FloodWaitError
-from config import API_ID, API_HASH, BOT_TOKEN, ADMIN_IDS, APP_VERSION
+from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError, FloodWaitError, MessageNotModifiedError
+from config import (
+    API_ID, API_HASH, BOT_TOKEN, ADMIN_IDS, APP_VERSION, METRICS_HOST, METRICS_PORT,
+    SHARD_WORKERS, SHARD_SECRET, SHARD_TLS,
+    BULK_CONCURRENCY, BULK_PROGRESS_INTERVAL, EXPIRY_CONCURRENCY, EXPIRY_MESSAGE
+)
+from storage import AsyncJsonStore, JsonStore
+from logging_setup import setup_logging, tenant_logger
+from session_pool import SessionUnauthorized, session_pool
+from zygote import ZygoteClient
+from sharding import RemoteUserbot, ShardRouter
+from metrics import REGISTRY, LoopLagMonitor, instrument_client, serve_prometheus
+from rpc import connect_socket, tls_context
 import asyncio
 from datetime import datetime, timedelta
 import os
 import time
-import math
 import json
 import logging
 import sys
 import re
+import bisect
 import subprocess
 import signal
+import socket
+import tempfile
+import threading
 from pathlib import Path
+from collections import deque
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+setup_logging('bot.log')
 
 logger = logging.getLogger(__name__)
 
@@ -34,9 +42,41 @@ class UserBotManager:
         self.running_bots = {}
         self.bot_status = {}
         self.last_restart = {}
-
-    async def start_userbot(self, session_string, api_id, api_hash):
+        self.tenant_reports = {}  # user_id -> (monotonic time, forwards total)
+        # Template process yang fork userbot baru dengan Telethon sudah ter-import
+        self.zygote = None
+        if os.name != 'nt' and hasattr(socket, 'send_fds'):
+            self.zygote = ZygoteClient(os.path.join(tempfile.gettempdir(), f"userbot-zygote-{os.getpid()}.sock"))
+        # Dengan SHARD_WORKERS userbot dijalankan di worker, bukan proses lokal
+        self.shards = ShardRouter(
+            SHARD_WORKERS,
+            secret=SHARD_SECRET,
+            ssl=tls_context(server=False, **SHARD_TLS) if SHARD_TLS else None
+        ) if SHARD_WORKERS else None
+        if self.shards:
+            self.shards.on_banned = self.save_banned
+            self.shards.on_filters = self.save_filters
+
+    async def start_userbot(self, session_string, api_id, api_hash, user_id=None):
         """Start userbot dengan penanganan proses yang lebih baik"""
+        output_logger = tenant_logger(user_id) if user_id else logger
+        if self.shards and user_id:
+            try:
+                data = await load_data()
+                handle = await self.shards.start_tenant(user_id, {
+                    'session': session_string,
+                    'api_id': api_id,
+                    'api_hash': api_hash,
+                    # Ikut dipakai saat tenant dipindah ke worker lain
+                    'banned': data.get('banned_groups', {}).get(user_id, []),
+                    'filters': data.get('target_filters', {}).get(user_id, {})
+                })
+                logger.info(f"Userbot {user_id} berjalan di worker {handle.node}")
+                return True, handle
+            except Exception as e:
+                logger.error(f"Gagal start userbot {user_id} di worker: {str(e)}")
+                return False, str(e)
+
         try:
             userbot_path = os.path.abspath("userbot.py")
             if not os.path.exists(userbot_path):
@@ -46,6 +86,10 @@ class UserBotManager:
             # Siapkan environment
             env = os.environ.copy()
             env['PYTHONPATH'] = os.path.dirname(userbot_path)
+            env['PYTHONUNBUFFERED'] = '1'  # baris ready harus langsung terbaca
+            if user_id:
+                # Userbot hanya log ke stdout, file per tenant ditulis oleh admin bot
+                env['USERBOT_TENANT_ID'] = str(user_id)
             
             # Buat command
             cmd = [
@@ -58,20 +102,27 @@ class UserBotManager:
             
             logger.info(f"Menjalankan userbot dengan command: {' '.join(cmd)}")
             
-            # Jalankan proses
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=env,
-                cwd=os.path.dirname(userbot_path),
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                preexec_fn=os.setsid if os.name != 'nt' else None
-            )
+            # Control channel: socketpair, ujung satunya diwariskan ke userbot
+            control_sock = child_sock = None
+            if os.name != 'nt':
+                control_sock, child_sock = socket.socketpair()
+                env['USERBOT_CONTROL_FD'] = str(child_sock.fileno())
 
-            # Monitor startup
+            # Jalankan proses
+            try:
+                process = await self.spawn_process(cmd, env, os.path.dirname(userbot_path), child_sock)
+            except BaseException:
+                if control_sock:
+                    control_sock.close()
+                raise
+            finally:
+                if child_sock:
+                    child_sock.close()
+
+            if control_sock:
+                return await self.wait_ready(process, control_sock, output_logger, user_id)
+
+            # Tanpa control channel (Windows): tunggu baris ready di stdout
             success = False
             error_output = []
             start_time = time.time()
@@ -89,11 +140,12 @@ class UserBotManager:
                 
                 if line:
                     line = line.strip()
-                    logger.info(f"Userbot output: {line}")
+                    output_logger.info(f"Userbot output: {line}")
                     
                     if "Userbot started successfully" in line:
                         success = True
                         logger.info("Userbot berhasil dijalankan!")
+                        self.relay_output(process, output_logger)
                         return True, process
                     
                     if "error" in line.lower() or "exception" in line.lower():
@@ -113,6 +165,149 @@ class UserBotManager:
             logger.error(f"Error saat start userbot: {str(e)}")
             return False, str(e)
 
+    async def spawn_process(self, cmd, env, cwd, control=None):
+        """Fork dari zygote kalau bisa, fallback ke interpreter baru"""
+        if self.zygote:
+            try:
+                return await self.zygote.spawn(cmd[1:], env, cwd, control.fileno() if control else None)
+            except Exception as e:
+                logger.warning(f"Zygote tidak bisa dipakai, pakai subprocess biasa: {str(e)}")
+
+        return subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            cwd=cwd,
+            text=True,
+            bufsize=1,
+            universal_newlines=True,
+            pass_fds=(control.fileno(),) if control else (),
+            preexec_fn=os.setsid if os.name != 'nt' else None
+        )
+
+    async def wait_ready(self, process, control_sock, output_logger, user_id, timeout=60):
+        """Tunggu notifikasi `ready` dari userbot lewat control channel"""
+        ready = asyncio.get_running_loop().create_future()
+
+        async def on_ready(pid=None):
+            if not ready.done():
+                ready.set_result(pid)
+
+        async def on_log(level, name, message):
+            output_logger.log(level, message)
+
+        async def on_metrics(counters):
+            if user_id:
+                self.record_tenant_report(user_id, counters)
+
+        async def on_banned(ids):
+            if user_id:
+                await self.save_banned(user_id, ids)
+
+        async def on_filters(filters):
+            if user_id:
+                await self.save_filters(user_id, filters)
+
+        process.control = await connect_socket(
+            control_sock,
+            handlers={
+                'ready': on_ready, 'log': on_log, 'metrics': on_metrics,
+                'banned_groups': on_banned, 'target_filters': on_filters
+            },
+            name=f"tenant {user_id}"
+        )
+        # print() tetap lewat stdout, log record lewat control channel
+        self.relay_output(process, output_logger)
+
+        deadline = time.monotonic() + timeout
+        while not ready.done() and time.monotonic() < deadline:
+            if process.poll() is not None:
+                _, stderr = process.communicate()
+                await process.control.close()
+                error_msg = f"Proses mati saat startup: {stderr or chr(10).join(process.output_tail)}"
+                logger.error(error_msg)
+                return False, error_msg
+            await asyncio.wait([ready], timeout=0.1)
+
+        if ready.done():
+            logger.info("Userbot berhasil dijalankan!")
+            return True, process
+
+        process.kill()
+        await process.control.close()
+        error_msg = "Timeout menunggu userbot start"
+        errors = [l for l in process.output_tail if "error" in l.lower() or "exception" in l.lower()]
+        if errors:
+            error_msg += f"\nError yang terdeteksi:\n" + "\n".join(errors)
+        logger.error(error_msg)
+        return False, error_msg
+
+    def relay_output(self, process, output_logger):
+        """Keep draining userbot stdout into its log stream"""
+        process.output_tail = deque(maxlen=20)
+
+        def relay():
+            try:
+                for line in process.stdout:
+                    line = line.rstrip()
+                    if line:
+                        process.output_tail.append(line)
+                        output_logger.info(line)
+            except (ValueError, OSError):
+                # Pipe closed by communicate() after the process died
+                pass
+
+        threading.Thread(target=relay, name=f"relay-{process.pid}", daemon=True).start()
+
+    async def tenant_call(self, user_id, method, timeout=5, **params):
+        """Panggil method control channel userbot, None kalau tidak tersedia"""
+        process = self.running_bots.get(user_id)
+        try:
+            if isinstance(process, RemoteUserbot):
+                return await process.router.call(process.node, 'tenant_call', user_id=user_id, control=method, params=params)
+            control = getattr(process, 'control', None)
+            if control:
+                return await control.call(method, timeout=timeout, **params)
+        except Exception as e:
+            logger.warning(f"Control call {method} ke userbot {user_id} gagal: {str(e)}")
+        return None
+
+    async def save_banned(self, user_id, ids):
+        """Simpan daftar grup yang di-ban userbot, satu kali tulis per perubahan"""
+        data = await load_data()
+        data.setdefault('banned_groups', {})[user_id] = ids
+        await save_data(data)
+
+    async def save_filters(self, user_id, filters):
+        """Simpan target list userbot, dipanggil setiap kali .target mengubahnya"""
+        data = await load_data()
+        data.setdefault('target_filters', {})[user_id] = filters
+        await save_data(data)
+
+    async def restore_state(self, user_id):
+        """Kirim daftar ban dan target list yang tersimpan ke userbot yang baru jalan"""
+        data = await load_data()
+        ids = data.get('banned_groups', {}).get(user_id)
+        if ids:
+            await self.tenant_call(user_id, 'set_banned', ids=ids)
+        filters = data.get('target_filters', {}).get(user_id)
+        if filters:
+            await self.tenant_call(user_id, 'set_filters', filters=filters)
+
+    def record_tenant_report(self, user_id, report):
+        """Turn a tenant's periodic counter report into per-tenant forward rates"""
+        now = time.monotonic()
+        forwards = report.get('userbot_forwards_total', 0)
+        previous = self.tenant_reports.get(user_id)
+        self.tenant_reports[user_id] = (now, forwards)
+
+        REGISTRY.set('tenant_forwards_total', forwards, tenant=user_id)
+        REGISTRY.set('tenant_forward_failures_total', report.get('userbot_forward_failures_total', 0), tenant=user_id)
+        if previous and forwards >= previous[1] and now > previous[0]:
+            per_minute = (forwards - previous[1]) / (now - previous[0]) * 60
+            REGISTRY.set('tenant_forwards_per_minute', round(per_minute, 2), tenant=user_id)
+
     async def monitor_userbot(self, user_id, process):
         """Monitor userbot dengan penanganan yang lebih baik"""
         retry_count = 0
@@ -120,6 +315,10 @@ class UserBotManager:
         retry_delay = 60  # 1 menit antara retry
         
         while True:
+            if self.running_bots.get(user_id) is not process:
+                # Dihentikan atau diganti dengan sengaja, bukan crash
+                break
+
             if process.poll() is not None:
                 stdout, stderr = process.communicate()
                 logger.error(f"Userbot {user_id} mati dengan stderr: {stderr}")
@@ -129,19 +328,21 @@ class UserBotManager:
                     logger.info(f"Mencoba restart userbot {user_id} (attempt {retry_count + 1}/{max_retries})")
                     await asyncio.sleep(retry_delay)
                     
-                    data = load_data()
+                    data = await load_data()
                     if user_id in data['userbots']:
                         info = data['userbots'][user_id]
                         success, new_process = await self.start_userbot(
                             info['session'],
                             info['api_id'],
-                            info['api_hash']
+                            info['api_hash'],
+                            user_id=user_id
                         )
                         
                         if success:
                             logger.info(f"Berhasil restart userbot {user_id}")
                             process = new_process
                             self.running_bots[user_id] = process
+                            await self.restore_state(user_id)
                             retry_count += 1
                             continue
                         else:
@@ -151,10 +352,10 @@ class UserBotManager:
                     del self.running_bots[user_id]
                     self.bot_status[user_id] = 'dead'
                 
-                data = load_data()
+                data = await load_data()
                 if user_id in data['userbots']:
                     data['userbots'][user_id]['active'] = False
-                    save_data(data)
+                    await save_data(data)
                     
                     try:
                         owner_id = int(data['userbots'][user_id]['owner_id'])
@@ -181,38 +382,91 @@ Solusi:
             
             await asyncio.sleep(30)
 
-    def stop_userbot(self, process):
-        """Stop userbot dengan cara yang aman"""
+    async def stop_userbot(self, process, timeout=10):
+        """Stop userbot: SIGTERM ke process group, tunggu tanpa blocking, lalu SIGKILL"""
+        with REGISTRY.timer('userbot_stop_seconds'):
+            await self._stop_userbot(process, timeout)
+
+    async def _stop_userbot(self, process, timeout):
         try:
-            process.terminate()
-            try:
-                process.wait(timeout=10)
-            except subprocess.TimeoutExpired:
-                process.kill()
-                process.wait()
+            if isinstance(process, RemoteUserbot):
+                await asyncio.wait_for(process.stop(), timeout)
+                return
+            if process.poll() is not None:
+                return
+            control = getattr(process, 'control', None)
+            if control:
+                # Minta userbot berhenti sendiri dulu, signal hanya cadangan
+                try:
+                    await control.call('shutdown', timeout=2)
+                except Exception:
+                    pass
+                else:
+                    deadline = time.monotonic() + timeout
+                    while process.poll() is None and time.monotonic() < deadline:
+                        await asyncio.sleep(0.1)
+                    if process.poll() is not None:
+                        await control.close()
+                        return
+                await control.close()
+            self._signal_group(process, kill=False)
+
+            deadline = time.monotonic() + timeout
+            while process.poll() is None and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+
+            if process.poll() is None:
+                logger.warning(f"Userbot pid {process.pid} tidak berhenti dalam {timeout} detik, kirim SIGKILL")
+                self._signal_group(process, kill=True)
+                deadline = time.monotonic() + 5
+                while process.poll() is None and time.monotonic() < deadline:
+                    await asyncio.sleep(0.1)
         except Exception as e:
             logger.error(f"Error saat stop userbot: {str(e)}")
 
+    async def stop_userbots(self, processes, timeout=10):
+        """Stop banyak userbot sekaligus, selesai dalam satu window timeout"""
+        await asyncio.gather(*(self.stop_userbot(p, timeout) for p in processes))
+
+    async def remove_userbots(self, user_ids, timeout=10):
+        """Lepas userbot dari running_bots lalu stop semuanya secara bersamaan"""
+        processes = [self.running_bots.pop(user_id) for user_id in user_ids if user_id in self.running_bots]
+        await self.stop_userbots(processes, timeout)
+
+    @staticmethod
+    def _signal_group(process, kill):
+        if process.poll() is not None:
+            # Sudah keluar, pid-nya bisa saja sudah dipakai proses lain
+            return
+        if os.name == 'nt':
+            process.kill() if kill else process.terminate()
+            return
+        sig = signal.SIGKILL if kill else signal.SIGTERM
+        try:
+            # Proses dijalankan dengan setsid, jadi pgid == pid dan child ikut kena
+            os.killpg(os.getpgid(process.pid), sig)
+        except ProcessLookupError:
+            pass
+
     async def ensure_userbot_running(self, user_id, info):
         """Ensure userbot is running with proper verification"""
         try:
             # Stop existing process if any
-            if user_id in self.running_bots:
-                old_process = self.running_bots[user_id]
-                self.stop_userbot(old_process)
-                del self.running_bots[user_id]
-                await asyncio.sleep(2)  # Wait for cleanup
+            await self.remove_userbots([user_id])
 
             # Start new process
-            success, result = await self.start_userbot(
-                info['session'],
-                info['api_id'],
-                info['api_hash']
-            )
+            with REGISTRY.timer('userbot_start_seconds'):
+                success, result = await self.start_userbot(
+                    info['session'],
+                    info['api_id'],
+                    info['api_hash'],
+                    user_id=user_id
+                )
 
             if success:
                 self.running_bots[user_id] = result
                 self.bot_status[user_id] = 'running'
+                await self.restore_state(user_id)
                 
                 # Start monitoring in background
                 asyncio.create_task(
@@ -230,38 +484,134 @@ Solusi:
             return False, f"Error tidak terduga: {str(e)}"
 
 # Helper functions
-def load_data():
-    try:
-        with open('data.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        default_data = {
-            'userbots': {},
-            'premium_users': {},
-            'users': {}
+data_store = AsyncJsonStore(
+    JsonStore('data.json', default={'userbots': {}, 'premium_users': {}, 'users': {}})
+)
+
+async def load_data():
+    return await data_store.load()
+
+async def save_data(data):
+    return await data_store.save(data)
+
+class UserbotIndex:
+    """Urutan data['userbots'] untuk pagination berbasis cursor di list admin.
+
+    Tiap urutan menyimpan list key string yang sudah terurut dan diakhiri
+    user id. Satu halaman dicari dengan bisect ke key cursor lalu dibaca maju
+    atau mundur, jadi hanya record di halaman itu yang disentuh. Cursor adalah
+    key itu sendiri, tetap valid walau ada userbot yang ditambah atau dihapus.
+    Key hanya dibangun ulang setelah data.json disimpan.
+    """
+
+    SORTS = {'e': "Kadaluarsa", 'n': "Nama", 's': "Status"}
+    # Callback data maksimal 64 byte, nama dipotong supaya cursor muat
+    NAME_KEY_LENGTH = 10
+
+    def __init__(self, store):
+        self.store = store
+        self.generation = None
+        self.keys = {}  # sort -> sorted keys
+        self.search = {}  # user_id -> "nama phone id" (casefold)
+        self.counts = {}
+
+    @classmethod
+    def key(cls, sort, user_id, info):
+        if sort == 'n':
+            name = (info.get('first_name') or '').casefold()[:cls.NAME_KEY_LENGTH].replace('|', ' ')
+            return f"{name}|{user_id}"
+        expiry = info.get('expires_at', '')
+        if sort == 's':
+            return f"{0 if info.get('active') else 1}{expiry}|{user_id}"
+        return f"{expiry}|{user_id}"
+
+    async def refresh(self):
+        data = await load_data()
+        if self.keys and self.generation == self.store.generation:
+            return data
+
+        userbots = data['userbots']
+        self.keys = {
+            sort: sorted(self.key(sort, user_id, info) for user_id, info in userbots.items())
+            for sort in self.SORTS
+        }
+        self.search = {
+            user_id: f"{info.get('first_name', '')} {info.get('phone', '')} {user_id}".casefold()
+            for user_id, info in userbots.items()
         }
-        for key, value in default_data.items():
-            if key not in data:
-                data[key] = value
+        now = datetime.now()
+        self.counts = {
+            'total': len(userbots),
+            'active': sum(1 for info in userbots.values() if info['active']),
+            'premium': sum(1 for info in data.get('premium_users', {}).values()
+                           if datetime.fromisoformat(info['expires_at']) > now),
+        }
+        self.generation = self.store.generation
         return data
-    except FileNotFoundError:
-        default_data = {'userbots': {}, 'premium_users': {}, 'users': {}}
-        save_data(default_data)
-        return default_data
-    except json.JSONDecodeError:
-        logger.error("Invalid JSON in data.json")
-        return {'userbots': {}, 'premium_users': {}, 'users': {}}
-
-def save_data(data):
-    try:
-        with open('data.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        return True
-    except Exception as e:
-        logger.error(f"Error saving data: {str(e)}")
-        return False
 
-def is_premium(user_id):
-    data = load_data()
+    async def find(self, query, limit=2):
+        """User id yang cocok dengan nama, nomor atau id, id persis didahulukan"""
+        data = await self.refresh()
+        if query in data['userbots']:
+            return [query]
+        query = query.casefold()
+        found = []
+        for user_id, text in self.search.items():
+            if query in text:
+                found.append(user_id)
+                if len(found) >= limit:
+                    break
+        return found
+
+    async def page(self, sort, cursor=None, direction='n', query=None, size=10):
+        """(rows, ada sebelumnya, ada sesudahnya, posisi); rows berisi (key, user_id, info)"""
+        data = await self.refresh()
+        userbots = data['userbots']
+        keys = self.keys[sort]
+        query = query.casefold() if query else None
+
+        def matches(key):
+            user_id = key.rsplit('|', 1)[1]
+            return user_id in userbots and (query is None or query in self.search.get(user_id, ''))
+
+        def exists(i, step):
+            while 0 <= i < len(keys):
+                if matches(keys[i]):
+                    return True
+                i += step
+            return False
+
+        if direction == 'p':
+            i, step = bisect.bisect_left(keys, cursor) - 1, -1
+        else:
+            i, step = (bisect.bisect_right(keys, cursor) if cursor is not None else 0), 1
+
+        found = []
+        while 0 <= i < len(keys) and len(found) <= size:
+            if matches(keys[i]):
+                found.append(keys[i])
+            i += step
+        more = len(found) > size
+        found = found[:size]
+        if step < 0:
+            found.reverse()
+
+        if not found:
+            if cursor is not None:
+                # Semua yang ada di arah itu sudah terhapus, mulai dari awal
+                return await self.page(sort, None, 'n', query, size)
+            return [], False, False, None
+
+        first = bisect.bisect_left(keys, found[0])
+        last = bisect.bisect_left(keys, found[-1])
+        has_before = more if step < 0 else exists(first - 1, -1)
+        has_after = more if step > 0 else exists(last + 1, 1)
+        position = None if query else (first, len(keys))
+        rows = [(key, key.rsplit('|', 1)[1], userbots[key.rsplit('|', 1)[1]]) for key in found]
+        return rows, has_before, has_after, position
+
+async def is_premium(user_id):
+    data = await load_data()
     str_id = str(user_id)
     if str_id in data.get('premium_users', {}):
         try:
@@ -270,75 +620,177 @@ def is_premium(user_id):
                 return True
             else:
                 del data['premium_users'][str_id]
-                save_data(data)
+                await save_data(data)
         except (ValueError, KeyError):
             pass
     return False
 
-def save_user(user_id, username=None):
-    data = load_data()
-    str_id = str(user_id)
-    if str_id not in data['users']:
-        data['users'][str_id] = {
+class UserRegistry:
+    """Write-once registry of users that have sent /start.
+
+    Membership is answered from an in-memory set. New users are appended to
+    a journal file and folded into data.json with a single write once the
+    journal holds `compact_every` entries (or when compact() is called).
+    """
+
+    def __init__(self, journal_path='users.journal', compact_every=100):
+        self.journal_path = journal_path
+        self.compacting_path = f"{journal_path}.compacting"
+        self.compact_every = compact_every
+        self._known = None
+        self._pending = 0
+
+    def _read_journal(self, paths=None):
+        entries = []
+        for path in paths or (self.compacting_path, self.journal_path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entries.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            # Torn last line after a crash, the user will be journaled again
+                            logger.warning(f"Skipping corrupt journal entry: {line[:100]}")
+            except FileNotFoundError:
+                pass
+        return entries
+
+    def _append_journal(self, line):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def _take_journal(self):
+        # Move the journal aside so users registered during compaction land in a fresh file
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.compacting_path):
+                with open(self.journal_path, 'r', encoding='utf-8') as src, \
+                        open(self.compacting_path, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.compacting_path)
+        return self._read_journal([self.compacting_path])
+
+    def _remove_journal(self):
+        try:
+            os.remove(self.compacting_path)
+        except FileNotFoundError:
+            pass
+
+    async def _ensure_loaded(self):
+        if self._known is not None:
+            return
+        data = await load_data()
+        entries = await data_store.run(self._read_journal)
+        if self._known is not None:
+            return
+        self._known = set(data['users'])
+        self._known.update(str(entry['id']) for entry in entries)
+        self._pending = len(entries)
+
+    async def add(self, user_id, username=None):
+        """Register user_id, returns True if the user was not known before"""
+        await self._ensure_loaded()
+        str_id = str(user_id)
+        if str_id in self._known:
+            return False
+
+        # Mark as known before the write so a double /start journals once
+        self._known.add(str_id)
+        entry = {
             'id': user_id,
             'username': username,
             'first_seen': datetime.now().isoformat()
         }
-        save_data(data)
+        try:
+            await data_store.run(
+                self._append_journal,
+                json.dumps(entry, ensure_ascii=False) + '\n'
+            )
+        except Exception as e:
+            self._known.discard(str_id)
+            logger.error(f"Error writing user journal: {str(e)}")
+            return False
+
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            await self.compact()
+        return True
+
+    async def compact(self):
+        """Fold journaled users into data.json and truncate the journal"""
+        entries = await data_store.run(self._take_journal)
+        if not entries:
+            self._pending = 0
+            return True
+
+        data = await load_data()
+        for entry in entries:
+            # setdefault keeps replay idempotent if we crashed after saving
+            data['users'].setdefault(str(entry['id']), entry)
+        if not await save_data(data):
+            return False
+
+        await data_store.run(self._remove_journal)
+        self._pending = max(0, self._pending - len(entries))
+        if self._known is not None:
+            self._known.update(data['users'])
+        logger.info(f"Compacted {len(entries)} journaled users into data.json")
+        return True
+
+user_registry = UserRegistry()
+
+async def save_user(user_id, username=None):
+    return await user_registry.add(user_id, username)
+
+# Identitas device yang dipakai semua client userbot dari admin bot
+USERBOT_DEVICE = {
+    'device_model': "Userbot v1.0",
+    'system_version': "Android 11.0",
+    'app_version': "1.0.0",
+    'lang_code': "id"
+}
 
 async def verify_session(session_string, api_id, api_hash):
     """Verify if a session string is valid and working"""
-    client = None
     try:
-        client = TelegramClient(
-            StringSession(session_string),
-            api_id,
-            api_hash,
-            device_model="Userbot v1.0",
-            system_version="Android 11.0",
-            app_version="1.0.0",
-            lang_code="id"
-        )
-
-        await client.connect()
-        
-        if not await client.is_user_authorized():
-            logger.error("Session not authorized")
-            return False
-            
-        me = await client.get_me()
-        if not me:
-            logger.error("Could not get user info")
-            return False
-            
-        try:
-            await client.send_message('me', """
+        async with session_pool.borrow(session_string, api_id, api_hash, **USERBOT_DEVICE) as client:
+            me = await client.get_me()
+            if not me:
+                logger.error("Could not get user info")
+                return False
+                
+            try:
+                await client.send_message('me', """
 🔄 **Test Message**
 Userbot berhasil diverifikasi dan berjalan normal.
 
 Note: Pesan ini hanya untuk verifikasi sistem.
 """)
-        except Exception as e:
-            logger.error(f"Could not send test message: {str(e)}")
-            return False
-            
-        return True
-        
+            except Exception as e:
+                logger.error(f"Could not send test message: {str(e)}")
+                return False
+                
+            return True
+
+    except SessionUnauthorized:
+        logger.error("Session not authorized")
+        return False
     except Exception as e:
         logger.error(f"Session verification error: {str(e)}")
         return False
-    finally:
-        if client:
-            try:
-                await client.disconnect()
-            except:
-                pass
 
 class AdminBot:
     def __init__(self):
         self.bot = TelegramClient('admin_bot', API_ID, API_HASH)
         self.page_size = 10
         self.userbot_manager = UserBotManager()
+        self.userbot_index = UserbotIndex(data_store)
+        self.list_views = {}  # chat_id -> {'sort': ..., 'query': ...}
+        self.bulk_pending = {}  # chat_id -> operasi bulk yang menunggu konfirmasi
         self.help_pages = {
             'main': {
                 'text': """📚 **Panduan Penggunaan Bot**\n\nSilahkan pilih kategori bantuan di bawah ini:""",
@@ -401,122 +853,293 @@ class AdminBot:
             }
         }
 
-    async def show_userbot_list(self, event, page=0):
-        """Show list of userbots with proper pagination"""
-        data = load_data()
-        if not data['userbots']:
-            await event.edit("❌ **Tidak ada userbot yang ditemukan!**")
-            return
-
-        userbots = list(data['userbots'].items())
-        total_pages = math.ceil(len(userbots) / self.page_size)
-        start_idx = page * self.page_size
-        end_idx = start_idx + self.page_size
-        current_page_userbots = userbots[start_idx:end_idx]
+    async def userbot_page(self, chat_id, mode, cursor=None, direction='n'):
+        """Tombol satu halaman userbot; mode 'l' (list) atau 'd' (hapus), None kalau kosong"""
+        view = self.list_views.setdefault(chat_id, {'sort': 'e', 'query': None})
+        rows, has_before, has_after, position = await self.userbot_index.page(
+            view['sort'], cursor, direction, view['query'], self.page_size
+        )
+        if not rows:
+            return None, None
 
         buttons = []
-        for user_id, info in current_page_userbots:
+        action = 'toggle' if mode == 'l' else 'delete'
+        for _, user_id, info in rows:
             status = "🟢" if info['active'] else "🔴"
             expires = datetime.fromisoformat(info['expires_at'])
             days_left = (expires - datetime.now()).days
-            
+
             is_running = user_id in self.userbot_manager.running_bots
             status_text = f"{status} {'⚡️' if is_running else ''}"
-            
+
             button_text = f"{status_text} {info['first_name']} ({days_left} hari)"
-            buttons.append([Button.inline(button_text, f"toggle_{user_id}")])
+            buttons.append([Button.inline(button_text, f"{action}_{user_id}")])
 
         nav_buttons = []
-        if page > 0:
-            nav_buttons.append(Button.inline("⬅️ Kembali", f"page_{page-1}"))
-        if page < total_pages - 1:
-            nav_buttons.append(Button.inline("Lanjut ➡️", f"page_{page+1}"))
+        if has_before:
+            nav_buttons.append(Button.inline("⬅️ Kembali", f"ub{mode}:p:{rows[0][0]}"))
+        if has_after:
+            nav_buttons.append(Button.inline("Lanjut ➡️", f"ub{mode}:n:{rows[-1][0]}"))
         if nav_buttons:
             buttons.append(nav_buttons)
+        buttons.append([
+            Button.inline(f"{'✅ ' if sort == view['sort'] else ''}{label}", f"ub{mode}:s:{sort}")
+            for sort, label in UserbotIndex.SORTS.items()
+        ])
+        if view['query']:
+            buttons.append([Button.inline(f"❌ Hapus pencarian \"{view['query'][:20]}\"", f"ub{mode}:q:")])
+
+        if position:
+            start, total = position
+            summary = f"Menampilkan `{start + 1}-{start + len(rows)}` dari `{total}` • Urut: {UserbotIndex.SORTS[view['sort']]}"
+        else:
+            summary = f"Hasil pencarian `{view['query']}` • Urut: {UserbotIndex.SORTS[view['sort']]}"
+        return buttons, summary
+
+    @staticmethod
+    async def edit_or_reply(event, text, **kwargs):
+        """Edit pesan tombol untuk callback, balas untuk command biasa"""
+        # CallbackQuery.Event tidak punya atribut message, NewMessage.Event punya
+        if getattr(event, 'message', None) is not None:
+            await event.reply(text, **kwargs)
+            return
+        try:
+            await event.edit(text, **kwargs)
+        except MessageNotModifiedError:
+            pass
+
+    async def show_userbot_list(self, event, cursor=None, direction='n'):
+        """Show list of userbots, one page per cursor"""
+        buttons, summary = await self.userbot_page(event.chat_id, 'l', cursor, direction)
+        if buttons is None:
+            await self.edit_or_reply(event, "❌ **Tidak ada userbot yang ditemukan!**")
+            return
 
         buttons.append([Button.inline("🗑 Hapus Userbot", "show_delete_list")])
         buttons.append([Button.inline("❓ Bantuan", "help_main")])
 
-        active_count = sum(1 for _, info in data['userbots'].items() if info['active'])
-        inactive_count = len(data['userbots']) - active_count
+        counts = self.userbot_index.counts
         running_count = len(self.userbot_manager.running_bots)
-        premium_count = sum(1 for _, info in data['premium_users'].items() 
-                          if datetime.fromisoformat(info['expires_at']) > datetime.now())
 
         text = f"""
 📊 **Statistik Bot:**
-• Total Userbot: `{len(data['userbots'])}`
-• Userbot Aktif: `{active_count}`
+• Total Userbot: `{counts['total']}`
+• Userbot Aktif: `{counts['active']}`
 • Userbot Berjalan: `{running_count}`
-• Userbot Nonaktif: `{inactive_count}`
-• User Premium: `{premium_count}`
+• Userbot Nonaktif: `{counts['total'] - counts['active']}`
+• User Premium: `{counts['premium']}`
 
 🔄 **Daftar Userbot:**
 Status: 🟢 Aktif | 🔴 Nonaktif | ⚡️ Berjalan
 Klik status untuk mengubah aktif/nonaktif
+{summary}
+🔎 Cari: `/cari <nama/nomor/id>`
         """
 
-        try:
-            await event.edit(text, buttons=buttons)
-        except:
-            await event.reply(text, buttons=buttons)
+        await self.edit_or_reply(event, text, buttons=buttons)
 
-    async def show_delete_list(self, event, page=0):
+    async def show_delete_list(self, event, cursor=None, direction='n'):
         """Show list of userbots for deletion"""
-        data = load_data()
-        
-        if not data['userbots']:
-            await event.reply("❌ **Tidak ada userbot yang ditemukan!**")
+        buttons, summary = await self.userbot_page(event.chat_id, 'd', cursor, direction)
+        if buttons is None:
+            await self.edit_or_reply(event, "❌ **Tidak ada userbot yang ditemukan!**")
             return
-            
-        text = """
+
+        text = f"""
 ❌ **Hapus Userbot**
 
 Silahkan pilih userbot yang ingin dihapus:
 • Klik pada userbot untuk konfirmasi
 • Proses tidak dapat dibatalkan
 • Data userbot akan dihapus permanen
+{summary}
         """
-        
-        userbots = list(data['userbots'].items())
-        total_pages = math.ceil(len(userbots) / self.page_size)
-        start_idx = page * self.page_size
-        end_idx = start_idx + self.page_size
-        current_page_userbots = userbots[start_idx:end_idx]
-
-        buttons = []
-        for user_id, info in current_page_userbots:
-            status = "🟢" if info['active'] else "🔴"
-            expires = datetime.fromisoformat(info['expires_at'])
-            days_left = (expires - datetime.now()).days
-            is_running = user_id in self.userbot_manager.running_bots
-            status_text = f"{status} {'⚡️' if is_running else ''}"
-            button_text = f"{status_text} {info['first_name']} ({days_left} hari)"
-            buttons.append([Button.inline(button_text, f"delete_{user_id}")])
-
-        nav_buttons = []
-        if page > 0:
-            nav_buttons.append(Button.inline("⬅️ Kembali", f"delete_page_{page-1}"))
-        if page < total_pages - 1:
-            nav_buttons.append(Button.inline("Lanjut ➡️", f"delete_page_{page+1}"))
-        if nav_buttons:
-            buttons.append(nav_buttons)
 
         buttons.append([Button.inline("◀️ Kembali ke List", "back_to_list")])
         buttons.append([Button.inline("❌ Tutup", "help_close")])
 
-        if event.message:
-            await event.reply(text, buttons=buttons)
-        else:
-            await event.edit(text, buttons=buttons)
+        await self.edit_or_reply(event, text, buttons=buttons)
+
+    async def show_userbot_card(self, event, user_id):
+        """Langsung ke satu userbot hasil pencarian"""
+        data = await load_data()
+        info = data['userbots'][user_id]
+        expires = datetime.fromisoformat(info['expires_at'])
+        is_running = user_id in self.userbot_manager.running_bots
+
+        text = f"""
+🤖 **Detail Userbot**
+
+• Nama: `{info['first_name']}`
+• Phone: `{info['phone']}`
+• ID: `{user_id}`
+• Owner: `{info['owner_id']}`
+• Status: {"🟢 Aktif" if info['active'] else "🔴 Nonaktif"} {"⚡️ (Berjalan)" if is_running else ""}
+• Kadaluarsa: `{expires.strftime('%Y-%m-%d %H:%M:%S')}` ({(expires - datetime.now()).days} hari)
+        """
+        buttons = [
+            [Button.inline("🗑 Hapus Userbot", f"delete_{user_id}")],
+            [Button.inline("◀️ Kembali ke List", "back_to_list")]
+        ]
+        await event.reply(text, buttons=buttons)
+
+    BULK_OPERATIONS = {
+        'restart': "Restart",
+        'extend': "Perpanjang",
+        'disable': "Nonaktifkan",
+    }
+
+    async def select_userbots(self, filters):
+        """User id yang cocok dengan semua filter bulk, ValueError kalau filter tidak dikenal
+
+        Filter: all, dead, running, active, inactive, expired, expiring:<hari>,
+        owner:<id>, q:<nama/nomor>.
+        """
+        data = await self.userbot_index.refresh()
+        running = self.userbot_manager.running_bots
+        now = datetime.now()
+        checks = []
+        for item in filters:
+            name, _, value = item.partition(':')
+            if name == 'all':
+                continue
+            elif name == 'dead':
+                checks.append(lambda uid, info: uid not in running or running[uid].poll() is not None)
+            elif name == 'running':
+                checks.append(lambda uid, info: uid in running and running[uid].poll() is None)
+            elif name == 'active':
+                checks.append(lambda uid, info: info['active'])
+            elif name == 'inactive':
+                checks.append(lambda uid, info: not info['active'])
+            elif name == 'expired':
+                checks.append(lambda uid, info: datetime.fromisoformat(info['expires_at']) <= now)
+            elif name == 'expiring' and value.isdigit():
+                limit = now + timedelta(days=int(value))
+                checks.append(lambda uid, info, limit=limit: datetime.fromisoformat(info['expires_at']) <= limit)
+            elif name == 'owner' and value:
+                checks.append(lambda uid, info, value=value: str(info.get('owner_id')) == value)
+            elif name == 'q' and value:
+                query = value.casefold()
+                checks.append(lambda uid, info, query=query: query in self.userbot_index.search.get(uid, ''))
+            else:
+                raise ValueError(f"Filter tidak dikenal: `{item}`")
+
+        return [
+            user_id for user_id, info in data['userbots'].items()
+            if all(check(user_id, info) for check in checks)
+        ]
+
+    async def bulk_apply(self, op, arg, user_id, info):
+        """Satu userbot dalam operasi bulk, info hanya diubah setelah operasinya berhasil"""
+        if op == 'restart':
+            success, message = await self.userbot_manager.ensure_userbot_running(user_id, info)
+            if not success:
+                raise RuntimeError(message)
+            info['active'] = True
+        elif op == 'extend':
+            expiry = max(datetime.fromisoformat(info['expires_at']), datetime.now())
+            info['expires_at'] = (expiry + timedelta(days=arg)).isoformat()
+        elif op == 'disable':
+            await self.userbot_manager.remove_userbots([user_id])
+            info['active'] = False
+
+    async def run_bulk(self, message, op, arg, user_ids):
+        """Jalankan operasi bulk dengan worker terbatas, satu pesan progress, disimpan di akhir"""
+        data = await load_data()
+        limiter = asyncio.Semaphore(BULK_CONCURRENCY)
+        progress = {'done': 0, 'ok': 0, 'errors': []}
+        title = f"{self.BULK_OPERATIONS[op]}{f' {arg} hari' if op == 'extend' else ''}"
+        started = time.monotonic()
+
+        def render(final=False):
+            failed = progress['done'] - progress['ok']
+            text = f"""
+{'✅' if final else '⏳'} **Bulk {title}**
+
+• Selesai: `{progress['done']}/{len(user_ids)}`
+• Berhasil: `{progress['ok']}` • Gagal: `{failed}`
+• Waktu: `{time.monotonic() - started:.1f}s`
+"""
+            if progress['errors']:
+                text += "\n⚠️ **Gagal:**\n" + "\n".join(
+                    f"• `{user_id}`: {error[:80]}" for user_id, error in progress['errors'][:10]
+                )
+                if len(progress['errors']) > 10:
+                    text += f"\n• ... dan `{len(progress['errors']) - 10}` lainnya"
+            return text
+
+        async def one(user_id):
+            async with limiter:
+                info = data['userbots'].get(user_id)
+                try:
+                    if info is None:
+                        raise KeyError("userbot sudah dihapus")
+                    await self.bulk_apply(op, arg, user_id, info)
+                    progress['ok'] += 1
+                except Exception as e:
+                    progress['errors'].append((user_id, str(e)))
+                finally:
+                    progress['done'] += 1
+
+        async def report():
+            shown = None
+            while True:
+                await asyncio.sleep(BULK_PROGRESS_INTERVAL)
+                text = render()
+                if text != shown:
+                    try:
+                        await message.edit(text)
+                    except MessageNotModifiedError:
+                        pass
+                    except Exception as e:
+                        logger.warning(f"Gagal update progress bulk: {str(e)}")
+                    shown = text
+
+        reporter = asyncio.create_task(report())
+        try:
+            with REGISTRY.timer('admin_bulk_seconds', op=op):
+                await asyncio.gather(*(one(user_id) for user_id in user_ids))
+        finally:
+            reporter.cancel()
+
+        # Data yang diubah adalah dict live, save lain di tengah batch bisa
+        # sudah menulis sebagian; di sini dipastikan semuanya tersimpan
+        if progress['ok']:
+            await save_data(data)
+        logger.info(f"Bulk {op}: {progress['ok']}/{len(user_ids)} berhasil")
+        await message.edit(render(final=True))
+
+    async def notify_expired(self, chat_id, text, limiter):
+        """Kirim satu notifikasi expired, dibatasi limiter"""
+        async with limiter:
+            try:
+                await self.bot.send_message(chat_id, text)
+            except Exception as e:
+                logger.warning(f"Gagal kirim notifikasi expired ke {chat_id}: {str(e)}")
+
+    async def notify_userbot_expired(self, user_id, info, limiter):
+        """Kirim EXPIRY_MESSAGE ke Saved Messages userbot yang expired"""
+        async with limiter:
+            if user_id in self.userbot_manager.running_bots:
+                # Pakai koneksi tenant yang sedang jalan, koneksi kedua dengan
+                # auth key yang sama bisa memicu AuthKeyDuplicatedError
+                await self.userbot_manager.tenant_call(user_id, 'notify', timeout=30, text=EXPIRY_MESSAGE)
+                return
+            try:
+                async with session_pool.borrow(info['session'], info['api_id'], info['api_hash'], **USERBOT_DEVICE) as client:
+                    await client.send_message('me', EXPIRY_MESSAGE, parse_mode='md')
+            except Exception as e:
+                logger.warning(f"Gagal kirim notifikasi expired ke userbot {user_id}: {str(e)}")
 
     async def check_premium_expiry(self):
         """Check and handle expired premium users"""
         while True:
             try:
-                data = load_data()
+                data = await load_data()
                 current_time = datetime.now()
-                changes_made = False
+                to_stop = []
+                notices = []  # (chat_id, text)
+                expired = []  # (user_id, info) userbot yang diberi tahu lewat akunnya sendiri
                 
                 # Check premium users
                 for user_id, info in list(data['premium_users'].items()):
@@ -524,36 +1147,25 @@ Silahkan pilih userbot yang ingin dihapus:
                     if current_time > expiry:
                         # Remove premium status
                         del data['premium_users'][user_id]
-                        changes_made = True
                         
                         # End userbot if exists
                         for bot_id, bot_info in list(data['userbots'].items()):
                             if str(bot_info['owner_id']) == user_id:
-                                if bot_id in self.userbot_manager.running_bots:
-                                    process = self.userbot_manager.running_bots[bot_id]
-                                    self.userbot_manager.stop_userbot(process)
-                                    del self.userbot_manager.running_bots[bot_id]
+                                to_stop.append(bot_id)
                                 del data['userbots'][bot_id]
                         
-                        # Notify user
-                        try:
-                            await self.bot.send_message(int(user_id), """
+                        notices.append((int(user_id), """
 ⚠️ **Masa Premium Anda telah berakhir!**
 
 Akses premium dan userbot Anda telah dinonaktifkan.
 Silahkan hubungi @hiyaok untuk perpanjang premium.
-""")
-                        except:
-                            pass
+"""))
 
                 # Check userbots expiry
                 for user_id, info in list(data['userbots'].items()):
                     expiry = datetime.fromisoformat(info['expires_at'])
                     if current_time > expiry:
-                        # Notify owner
-                        try:
-                            owner_id = int(info['owner_id'])
-                            await self.bot.send_message(owner_id, f"""
+                        notices.append((int(info['owner_id']), f"""
 ⚠️ **Userbot Expired**
 
 Userbot Anda telah berakhir dan akan dihapus:
@@ -562,20 +1174,25 @@ Userbot Anda telah berakhir dan akan dihapus:
 • Dibuat: {info['created_at']}
 
 Silahkan hubungi @hiyaok untuk membuat userbot baru.
-""")
-                        except:
-                            pass
+"""))
 
                         # Stop and remove userbot
-                        if user_id in self.userbot_manager.running_bots:
-                            process = self.userbot_manager.running_bots[user_id]
-                            self.userbot_manager.stop_userbot(process)
-                            del self.userbot_manager.running_bots[user_id]
+                        expired.append((user_id, info))
+                        to_stop.append(user_id)
                         del data['userbots'][user_id]
-                        changes_made = True
-                
-                if changes_made:
-                    save_data(data)
+
+                if to_stop or notices:
+                    # Simpan sekali untuk satu batch, baru stop dan kirim notifikasi
+                    await save_data(data)
+                    limiter = asyncio.Semaphore(EXPIRY_CONCURRENCY)
+                    # Sebelum stop, supaya tenant yang masih jalan bisa mengirimnya sendiri
+                    await asyncio.gather(*(
+                        self.notify_userbot_expired(user_id, info, limiter) for user_id, info in expired
+                    ))
+                    await self.userbot_manager.remove_userbots(to_stop)
+                    await asyncio.gather(*(
+                        self.notify_expired(chat_id, text, limiter) for chat_id, text in notices
+                    ))
                     
             except Exception as e:
                 logger.error(f"Error in premium expiry check: {str(e)}")
@@ -585,6 +1202,7 @@ Silahkan hubungi @hiyaok untuk membuat userbot baru.
     async def create_new_userbot(self, conv, phone, api_id, api_hash, duration, owner_id):
         """Create new userbot with proper verification and setup"""
         client = None
+        session_string = None
         try:
             try:
                 api_id = int(api_id)
@@ -593,22 +1211,14 @@ Silahkan hubungi @hiyaok untuk membuat userbot baru.
                 return
 
             # Cek nomor yang sudah ada
-            data = load_data()
+            data = await load_data()
             for bot_info in data['userbots'].values():
                 if bot_info['phone'] == phone:
                     await conv.send_message("❌ **Error: Nomor telepon ini sudah memiliki userbot!**")
                     return
 
             # Setup client
-            client = TelegramClient(
-                StringSession(), 
-                api_id, 
-                api_hash,
-                device_model="Userbot v1.0",
-                system_version="Android 11.0",
-                app_version="1.0.0",
-                lang_code="id"
-            )
+            client = TelegramClient(StringSession(), api_id, api_hash, **USERBOT_DEVICE)
 
             await client.connect()
             
@@ -635,6 +1245,7 @@ Note:
             try:
                 otp_msg = await conv.get_response(timeout=300)
                 otp = ''.join(otp_msg.text.split())
+                onboarding_started = time.monotonic()
             except asyncio.TimeoutError:
                 await conv.send_message("❌ **Waktu habis! Silahkan coba lagi.**")
                 return
@@ -662,7 +1273,10 @@ Note:
             # Save session
             session_string = client.session.save()
             
-            # Verify session works
+            # Verify session works, on the connection we just logged in with.
+            # The pool drops it right after, so the userbot process that takes
+            # over is the only connection on this auth key
+            session_pool.adopt(session_string, client)
             is_working = await verify_session(session_string, api_id, api_hash)
             if not is_working:
                 await conv.send_message("❌ **Error: Gagal memverifikasi sesi userbot. Silahkan coba lagi.**")
@@ -672,7 +1286,7 @@ Note:
             setup_msg = await conv.send_message("⚡️ **Memulai setup userbot...**")
 
             # Save to database
-            data = load_data()
+            data = await load_data()
             expiry_date = (datetime.now() + timedelta(days=duration)).isoformat()
             data['userbots'][str(me.id)] = {
                 'first_name': me.first_name,
@@ -687,9 +1301,10 @@ Note:
                 'api_hash': api_hash
             }
 
-            if save_data(data):
+            if await save_data(data):
                 await setup_msg.edit("🔄 **Menjalankan userbot...**")
                 
+                await client.disconnect()
                 success, message = await self.userbot_manager.ensure_userbot_running(
                     str(me.id),
                     {
@@ -700,6 +1315,7 @@ Note:
                 )
 
                 if success:
+                    REGISTRY.observe('onboarding_seconds', time.monotonic() - onboarding_started)
                     success_text = f"""
 🤖 **User bot berhasil dibuat dan dijalankan!**
 
@@ -781,19 +1397,68 @@ Silahkan hubungi admin untuk bantuan.
             """)
         finally:
             if client:
+                if session_string:
+                    await session_pool.discard(session_string)
                 try:
                     await client.disconnect()
                 except:
                     pass
 
+    def render_metrics(self):
+        """Ringkasan metrics untuk command /metrics"""
+        def ms(seconds):
+            return f"{seconds * 1000:.1f}ms"
+
+        lines = ["📈 **Metrics Admin Bot**", ""]
+
+        lag = REGISTRY.histogram_items('event_loop_lag_seconds')
+        if lag:
+            h = lag[0][2]
+            lines.append(f"⏱ **Event loop lag:** p50 `{ms(h.quantile(0.5))}` • p95 `{ms(h.quantile(0.95))}` • max `{ms(h.max)}`")
+
+        handlers = sorted(
+            REGISTRY.histogram_items('handler_latency_seconds'),
+            key=lambda item: item[2].quantile(0.95),
+            reverse=True
+        )
+        if handlers:
+            lines += ["", "🧩 **Handler (p95 / max / jumlah):**"]
+            for _, labels, h in handlers[:10]:
+                lines.append(f"• `{dict(labels)['handler']}`: `{ms(h.quantile(0.95))}` / `{ms(h.max)}` / `{h.count}`")
+
+        storage = REGISTRY.histogram_items('storage_seconds')
+        if storage:
+            lines += ["", "💾 **Storage (p95 / max / jumlah):**"]
+            for _, labels, h in storage:
+                labels = dict(labels)
+                lines.append(f"• `{labels['file']} {labels['op']}`: `{ms(h.quantile(0.95))}` / `{ms(h.max)}` / `{h.count}`")
+
+        for name, title in (('userbot_start_seconds', 'Start userbot'), ('userbot_stop_seconds', 'Stop userbot')):
+            items = REGISTRY.histogram_items(name)
+            if items:
+                h = items[0][2]
+                lines.append(f"🔄 **{title}:** p95 `{ms(h.quantile(0.95))}` • max `{ms(h.max)}` • `{h.count}`x")
+
+        rates = REGISTRY.gauges_by_label('tenant_forwards_per_minute', 'tenant')
+        totals = REGISTRY.gauges_by_label('tenant_forwards_total', 'tenant')
+        if totals:
+            lines += ["", "🤖 **Forward per tenant:**"]
+            for tenant, total in sorted(totals.items(), key=lambda item: -rates.get(item[0], 0)):
+                lines.append(f"• `{tenant}`: `{rates.get(tenant, 0)}`/menit (total `{total}`)")
+
+        lines += ["", f"📡 Prometheus: `http://{METRICS_HOST}:{METRICS_PORT}/metrics`"]
+        return "\n".join(lines)
+
     async def start(self):
         """Start the bot and register all handlers"""
+        # Semua handler yang didaftarkan setelah ini ikut diukur latency-nya
+        instrument_client(self.bot)
         
         @self.bot.on(events.NewMessage(pattern=r'(?i)[!/\.]start$'))
         async def start_handler(event):
             """Handle start command"""
             user_id = event.sender_id
-            save_user(user_id, event.sender.username)
+            await save_user(user_id, event.sender.username)
             
             if user_id in ADMIN_IDS:
                 buttons = [
@@ -814,7 +1479,7 @@ Silahkan pilih menu yang tersedia:
 
 ⚡️ Status: Sistem berjalan normal
 """, buttons=buttons)
-            elif is_premium(user_id):
+            elif await is_premium(user_id):
                 text = """
 👋 **Selamat datang User Premium!**
 
@@ -891,6 +1556,29 @@ Silahkan pilih menu yang tersedia:
             
             await self.show_delete_list(event)
 
+        @self.bot.on(events.CallbackQuery(pattern=r'^ub([ld]):([npsq]):(.*)$'))
+        async def userbot_page_handler(event):
+            """Handle navigasi, urutan dan reset pencarian list userbot"""
+            if event.sender_id not in ADMIN_IDS:
+                await event.answer("⚠️ Hanya untuk admin!", alert=True)
+                return
+
+            # Callback data: ub<mode>:<aksi>:<argumen>, mode l = list, d = hapus
+            mode, action, arg = (group.decode() for group in event.pattern_match.groups())
+            view = self.list_views.setdefault(event.chat_id, {'sort': 'e', 'query': None})
+            cursor, direction = None, 'n'
+            if action == 's':
+                view['sort'] = arg if arg in UserbotIndex.SORTS else 'e'
+            elif action == 'q':
+                view['query'] = None
+            else:
+                cursor, direction = arg, action
+
+            if mode == 'l':
+                await self.show_userbot_list(event, cursor, direction)
+            else:
+                await self.show_delete_list(event, cursor, direction)
+
         @self.bot.on(events.CallbackQuery(pattern="back_to_list"))
         async def back_to_list_handler(event):
             """Handle back to list button"""
@@ -908,7 +1596,7 @@ Silahkan pilih menu yang tersedia:
                 return
             
             user_id = event.data.decode().split('_')[1]
-            data = load_data()
+            data = await load_data()
             
             if user_id not in data['userbots']:
                 await event.answer("❌ Userbot tidak ditemukan!", alert=True)
@@ -940,25 +1628,22 @@ Apakah Anda yakin ingin menghapus userbot ini?
                 return
             
             user_id = event.data.decode().split('_')[2]
-            data = load_data()
+            data = await load_data()
             
             if user_id not in data['userbots']:
                 await event.answer("❌ Userbot tidak ditemukan!", alert=True)
                 return
             
-            # Stop userbot if running
-            if user_id in self.userbot_manager.running_bots:
-                process = self.userbot_manager.running_bots[user_id]
-                self.userbot_manager.stop_userbot(process)
-                del self.userbot_manager.running_bots[user_id]
-            
-            # Get info before deletion
+            # Get info before deletion, data is live and may change while we wait
             info = data['userbots'][user_id]
             owner_id = info['owner_id']
             
+            # Stop userbot if running
+            await self.userbot_manager.remove_userbots([user_id])
+            
             # Delete from database
-            del data['userbots'][user_id]
-            save_data(data)
+            data['userbots'].pop(user_id, None)
+            await save_data(data)
             
             # Notify owner
             try:
@@ -993,7 +1678,7 @@ Silahkan hubungi admin untuk informasi lebih lanjut.
         async def restart_handler(event):
             """Handle restart command"""
             user_id = event.sender_id
-            data = load_data()
+            data = await load_data()
             
             # Cek apakah user punya userbot
             user_bot = None
@@ -1040,13 +1725,126 @@ Solusi:
 3. Hubungi admin jika masih error
 """)
 
-        # Start monitoring tasks
-        asyncio.create_task(self.check_premium_expiry())
-        
-        # Start the bot
-        await self.bot.start(bot_token=BOT_TOKEN)
-        logger.info("Admin bot started.")
-        await self.bot.run_until_disconnected()
+        # Fold users journaled by a previous run into data.json
+        await user_registry.compact()
+
+        @self.bot.on(events.NewMessage(pattern=r'(?i)[!/\.]metrics$'))
+        async def metrics_handler(event):
+            """Show instrumentation summary to admins"""
+            if event.sender_id not in ADMIN_IDS:
+                await event.reply("⚠️ Hanya untuk admin!")
+                return
+
+            await event.reply(self.render_metrics())
+
+        @self.bot.on(events.NewMessage(pattern=r'(?i)[!/\.]cari(?:\s+(.+))?$'))
+        async def search_userbot_handler(event):
+            """Cari userbot berdasarkan nama, nomor atau id"""
+            if event.sender_id not in ADMIN_IDS:
+                await event.reply("⚠️ Hanya untuk admin!")
+                return
+
+            query = (event.pattern_match.group(1) or '').strip()
+            if not query:
+                await event.reply("🔎 Penggunaan: `/cari <nama/nomor/id>`")
+                return
+
+            found = await self.userbot_index.find(query)
+            if not found:
+                await event.reply(f"❌ Tidak ada userbot yang cocok dengan `{query}`")
+                return
+            if len(found) == 1:
+                await self.show_userbot_card(event, found[0])
+                return
+
+            view = self.list_views.setdefault(event.chat_id, {'sort': 'e', 'query': None})
+            view['query'] = query
+            await self.show_userbot_list(event)
+
+        @self.bot.on(events.NewMessage(pattern=r'(?i)[!/\.]bulk(?:\s+(.+))?$'))
+        async def bulk_handler(event):
+            """Operasi admin untuk banyak userbot sekaligus"""
+            if event.sender_id not in ADMIN_IDS:
+                await event.reply("⚠️ Hanya untuk admin!")
+                return
+
+            usage = """
+⚙️ **Operasi Bulk**
+
+• `/bulk restart <filter>` - Restart userbot
+• `/bulk extend <hari> <filter>` - Perpanjang masa aktif
+• `/bulk disable <filter>` - Nonaktifkan dan stop userbot
+
+🔎 **Filter** (boleh lebih dari satu, semua harus cocok):
+`all`, `dead`, `running`, `active`, `inactive`, `expired`,
+`expiring:<hari>`, `owner:<id>`, `q:<nama/nomor>`
+
+Contoh: `/bulk restart dead active`
+            """
+            args = (event.pattern_match.group(1) or '').split()
+            if not args or args[0] not in self.BULK_OPERATIONS:
+                await event.reply(usage)
+                return
+
+            op, args = args[0], args[1:]
+            arg = None
+            if op == 'extend':
+                if not args or not args[0].isdigit() or int(args[0]) < 1:
+                    await event.reply("❌ Jumlah hari harus angka positif\n" + usage)
+                    return
+                arg, args = int(args[0]), args[1:]
+            if not args:
+                await event.reply("❌ Sertakan minimal satu filter (`all` untuk semua)\n" + usage)
+                return
+
+            try:
+                user_ids = await self.select_userbots(args)
+            except ValueError as e:
+                await event.reply(f"❌ {str(e)}")
+                return
+            if not user_ids:
+                await event.reply("❌ Tidak ada userbot yang cocok dengan filter.")
+                return
+
+            self.bulk_pending[event.chat_id] = (op, arg, user_ids)
+            data = await load_data()
+            sample = "\n".join(f"• {data['userbots'][u]['first_name']} (`{u}`)" for u in user_ids[:10])
+            more = f"\n• ... dan `{len(user_ids) - 10}` lainnya" if len(user_ids) > 10 else ""
+            await event.reply(
+                f"""
+⚠️ **Konfirmasi Bulk {self.BULK_OPERATIONS[op]}{f' {arg} hari' if arg else ''}**
+
+Filter: `{' '.join(args)}`
+Userbot: `{len(user_ids)}`
+{sample}{more}
+                """,
+                buttons=[
+                    [Button.inline(f"✅ Jalankan ({len(user_ids)})", "bulk_go")],
+                    [Button.inline("❌ Batal", "bulk_cancel")]
+                ]
+            )
+
+        @self.bot.on(events.CallbackQuery(pattern=r'^bulk_(go|cancel)$'))
+        async def bulk_confirm_handler(event):
+            """Handle konfirmasi operasi bulk"""
+            if event.sender_id not in ADMIN_IDS:
+                await event.answer("⚠️ Hanya untuk admin!", alert=True)
+                return
+
+            pending = self.bulk_pending.pop(event.chat_id, None)
+            if pending is None:
+                await event.answer("❌ Tidak ada operasi yang menunggu", alert=True)
+                return
+            if event.data == b'bulk_cancel':
+                await event.edit("❌ Operasi bulk dibatalkan")
+                return
+
+            op, arg, user_ids = pending
+            # Jawab callback dulu, run_bulk bisa jauh lebih lama dari batas waktu jawaban
+            await event.answer()
+            await event.edit(f"⏳ **Bulk {self.BULK_OPERATIONS[op]}:** memulai `{len(user_ids)}` userbot...")
+            message = await event.get_message()
+            await self.run_bulk(message, op, arg, user_ids)
 
         @self.bot.on(events.CallbackQuery(pattern="broadcast"))
         async def broadcast_button_handler(event):
@@ -1070,7 +1868,8 @@ Note:
                     """)
                     msg = await conv.get_response(timeout=300)
                     
-                    data = load_data()
+                    await user_registry.compact()
+                    data = await load_data()
                     success = 0
                     failed = 0
                     
@@ -1126,10 +1925,10 @@ Silahkan klik tombol broadcast untuk mencoba lagi.
             """Handle check status button for premium users"""
             user_id = event.sender_id
             
-            if not is_premium(user_id):
+            if not await is_premium(user_id):
                 return await not_premium_handler(event)
                 
-            data = load_data()
+            data = await load_data()
             user_bot = None
             for bot_id, info in data['userbots'].items():
                 if str(info.get('owner_id')) == str(user_id):
@@ -1141,6 +1940,18 @@ Silahkan klik tombol broadcast untuk mencoba lagi.
                 expires = datetime.fromisoformat(info['expires_at'])
                 days_left = (expires - datetime.now()).days
                 is_running = bot_id in self.userbot_manager.running_bots
+
+                # Angka live langsung dari userbot lewat control channel
+                live_text = ""
+                stats = await self.userbot_manager.tenant_call(bot_id, 'stats') if is_running else None
+                if stats:
+                    tasks = stats['tasks']
+                    live_text = (
+                        f"\n\n📊 **Live:**\n"
+                        f"• Task forward aktif: `{sum(t['running'] for t in tasks)}`\n"
+                        f"• Forward sukses: `{sum(t['success'] for t in tasks)}`\n"
+                        f"• Forward gagal: `{sum(t['failed'] for t in tasks)}`"
+                    )
                 
                 text = f"""
 🤖 **Status Userbot Anda**
@@ -1151,7 +1962,7 @@ Silahkan klik tombol broadcast untuk mencoba lagi.
 • Nomor: `{info['phone']}`
 • Dibuat: `{datetime.fromisoformat(info['created_at']).strftime('%Y-%m-%d %H:%M:%S')}`
 • Kadaluarsa: `{datetime.fromisoformat(info['expires_at']).strftime('%Y-%m-%d %H:%M:%S')}`
-• Sisa Durasi: {days_left} hari
+• Sisa Durasi: {days_left} hari{live_text}
 
 📱 **Perintah Tersedia:**
 • .help - Lihat panduan
@@ -1203,7 +2014,7 @@ Note:
                         return
                     
                     # Check if already premium
-                    if is_premium(user_id):
+                    if await is_premium(user_id):
                         await conv.send_message("⚠️ **User  sudah memiliki akses premium!**")
                         return
                     
@@ -1225,7 +2036,7 @@ Contoh durasi:
                         await conv.send_message("❌ **Error: Durasi harus berupa angka positif!**")
                         return
                     
-                    data = load_data()
+                    data = await load_data()
                     expiry_date = (datetime.now() + timedelta(days=duration)).isoformat()
                     
                     # Check if user exists
@@ -1245,7 +2056,7 @@ Contoh durasi:
                         'first_name': user.first_name
                     }
                     
-                    if save_data(data):
+                    if await save_data(data):
                         # Notify user
                         try:
                             text = f"""
@@ -1361,11 +2172,11 @@ Untuk membuat userbot, Anda memerlukan akses premium.
             user_id = event.sender_id
             
             if user_id not in ADMIN_IDS:
-                if not is_premium(user_id):
+                if not await is_premium(user_id):
                     await event.answer("⚠️ Anda harus premium untuk membuat userbot!", alert=True)
                     return await not_premium_handler(event)
                 
-                data = load_data()
+                data = await load_data()
                 for info in data['userbots'].values():
                     if str(info.get('owner_id')) == str(user_id):
                         text = f"""
@@ -1500,30 +2311,30 @@ Silahkan hubungi admin untuk bantuan.
                     """)
                     
         @self.bot.on(events.NewMessage(pattern=r'(?i)[!/\.]cek$'))
-async def check_userbot_handler(event):
-    user_id = event.sender_id
+        async def check_userbot_handler(event):
+            user_id = event.sender_id
     
-    if user_id in ADMIN_IDS:
-        # Admin gets full list of userbots
-        await self.show_userbot_list(event, page=0)
-        return
+            if user_id in ADMIN_IDS:
+                # Admin gets full list of userbots
+                await self.show_userbot_list(event)
+                return
         
-    # For premium users, only show their userbot
-    if is_premium(user_id):
-        data = load_data()
-        user_bot = None
-        for bot_id, info in data['userbots'].items():
-            if str(info.get('owner_id')) == str(user_id):
-                user_bot = (bot_id, info)
-                break
+            # For premium users, only show their userbot
+            if await is_premium(user_id):
+                data = await load_data()
+                user_bot = None
+                for bot_id, info in data['userbots'].items():
+                    if str(info.get('owner_id')) == str(user_id):
+                        user_bot = (bot_id, info)
+                        break
                 
-        if user_bot:
-            bot_id, info = user_bot
-            expires = datetime.fromisoformat(info['expires_at'])
-            days_left = (expires - datetime.now()).days
-            is_running = bot_id in self.userbot_manager.running_bots
+                if user_bot:
+                    bot_id, info = user_bot
+                    expires = datetime.fromisoformat(info['expires_at'])
+                    days_left = (expires - datetime.now()).days
+                    is_running = bot_id in self.userbot_manager.running_bots
             
-            text = f"""
+                    text = f"""
 🤖 **Status Userbot Anda**
 
 👤 **Detail Userbot:**
@@ -1545,34 +2356,25 @@ async def check_userbot_handler(event):
 • Hubungi admin untuk perpanjang durasi
 • Backup string session dengan aman
             """
-            buttons = [[Button.inline("◀️ Kembali", "back_to_start")]]
-            await event.reply(text, buttons=buttons)
-        else:
-            await event.reply("❌ **Anda belum memiliki userbot!**")
-    else:
-        return await not_premium_handler(event)
+                    buttons = [[Button.inline("◀️ Kembali", "back_to_start")]]
+                    await event.reply(text, buttons=buttons)
+                else:
+                    await event.reply("❌ **Anda belum memiliki userbot!**")
+            else:
+                return await not_premium_handler(event)
         
-        @self.bot.on(events.CallbackQuery(pattern=r'^page_(\d+)'))
-        async def page_callback(event):
-            if event.sender_id not in ADMIN_IDS:
-                await event.answer("⚠️ Hanya untuk admin!", alert=True)
-                return
-                
-            page = int(event.data.decode().split('_')[1])
-            await self.show_userbot_list(event, page)
-            
-    @self.bot.on(events.NewMessage(pattern=r'(?i)[!/\.]hapus$'))
-async def delete_userbot_handler(event):
-    user_id = event.sender_id
+        @self.bot.on(events.NewMessage(pattern=r'(?i)[!/\.]hapus$'))
+        async def delete_userbot_handler(event):
+            user_id = event.sender_id
     
-    if user_id in ADMIN_IDS:
-        # Admin gets delete menu
-        await self.show_delete_list(event, page=0)
-        return
+            if user_id in ADMIN_IDS:
+                # Admin gets delete menu
+                await self.show_delete_list(event)
+                return
         
-    # For premium users, show can't delete message
-    if is_premium(user_id):
-        text = """
+            # For premium users, show can't delete message
+            if await is_premium(user_id):
+                text = """
 ⚠️ **Fitur Hapus Tidak Tersedia**
 
 Maaf, Anda tidak dapat menghapus userbot secara langsung.
@@ -1583,34 +2385,34 @@ Silahkan hubungi admin @hiyaok untuk bantuan penghapusan userbot.
 • Pembersihan database yang aman
 • Mencegah kesalahan teknis
         """
-        buttons = [
-            [Button.url("💬 Hubungi Admin", "https://t.me/hiyaok")],
-            [Button.inline("◀️ Kembali", "back_to_start")]
-        ]
-        await event.reply(text, buttons=buttons)
-    else:
-        return await not_premium_handler(event)
+                buttons = [
+                    [Button.url("💬 Hubungi Admin", "https://t.me/hiyaok")],
+                    [Button.inline("◀️ Kembali", "back_to_start")]
+                ]
+                await event.reply(text, buttons=buttons)
+            else:
+                return await not_premium_handler(event)
         
-    @self.bot.on(events.CallbackQuery(pattern="back_to_start"))
-    async def back_to_start_handler(event):
-    """Handle back to start button with improved error handling"""
-    try:
-        user_id = event.sender_id
-        # Try to delete original message first
-        try:
-            await event.delete()
-        except:
-            pass  # Continue even if delete fails
+        @self.bot.on(events.CallbackQuery(pattern="back_to_start"))
+        async def back_to_start_handler(event):
+            """Handle back to start button with improved error handling"""
+            try:
+                user_id = event.sender_id
+                # Try to delete original message first
+                try:
+                    await event.delete()
+                except:
+                    pass  # Continue even if delete fails
         
-        # Generate appropriate menu based on user type
-        if user_id in ADMIN_IDS:
-            buttons = [
-                [Button.inline("🤖 Buat Userbot", "create_userbot")],
-                [Button.inline("👥 Add Premium", "add_premium")],
-                [Button.inline("📢 Broadcast", "broadcast")],
-                [Button.inline("❓ Bantuan", "help_main")]
-            ]
-            text = """
+                # Generate appropriate menu based on user type
+                if user_id in ADMIN_IDS:
+                    buttons = [
+                        [Button.inline("🤖 Buat Userbot", "create_userbot")],
+                        [Button.inline("👥 Add Premium", "add_premium")],
+                        [Button.inline("📢 Broadcast", "broadcast")],
+                        [Button.inline("❓ Bantuan", "help_main")]
+                    ]
+                    text = """
 👋 **Selamat datang Admin!**
 
 Silahkan pilih menu yang tersedia:
@@ -1622,8 +2424,8 @@ Silahkan pilih menu yang tersedia:
 
 ⚡️ Status: Sistem berjalan normal
             """
-        elif is_premium(user_id):
-            text = """
+                elif await is_premium(user_id):
+                    text = """
 👋 **Selamat datang User Premium!**
 
 Silahkan pilih menu yang tersedia:
@@ -1636,12 +2438,12 @@ Silahkan pilih menu yang tersedia:
 • Support prioritas
 • Update otomatis
             """
-            buttons = [
-                [Button.inline("🤖 Buat Userbot", "create_userbot")],
-                [Button.inline("❓ Bantuan", "help_main")]
-            ]
-        else:
-            text = """
+                    buttons = [
+                        [Button.inline("🤖 Buat Userbot", "create_userbot")],
+                        [Button.inline("❓ Bantuan", "help_main")]
+                    ]
+                else:
+                    text = """
 👋 **Selamat datang!**
 
 🔒 Untuk membuat userbot, Anda memerlukan akses premium.
@@ -1672,26 +2474,39 @@ Silahkan pilih menu yang tersedia:
 3. Lakukan pembayaran
 4. Dapatkan akses instant!
             """
-            buttons = [
-                [Button.url("💬 Chat Admin", "https://t.me/hiyaok")],
-                [Button.inline("❓ Bantuan", "help_main")]
-            ]
+                    buttons = [
+                        [Button.url("💬 Chat Admin", "https://t.me/hiyaok")],
+                        [Button.inline("❓ Bantuan", "help_main")]
+                    ]
 
-        # Try to send new message with menu
-        try:
-            await event.respond(text, buttons=buttons)
-        except Exception as e:
-            # If respond fails, try one more time with reply
-            await self.bot.send_message(event.chat_id, text, buttons=buttons)
+                # Try to send new message with menu
+                try:
+                    await event.respond(text, buttons=buttons)
+                except Exception as e:
+                    # If respond fails, try one more time with reply
+                    await self.bot.send_message(event.chat_id, text, buttons=buttons)
             
-    except Exception as e:
-        logger.error(f"Error in back_to_start: {str(e)}")
-        # Last resort - send basic menu
-        basic_text = "👋 **Menu Utama**\n\nSilahkan kirim /start untuk memulai ulang."
+            except Exception as e:
+                logger.error(f"Error in back_to_start: {str(e)}")
+                # Last resort - send basic menu
+                basic_text = "👋 **Menu Utama**\n\nSilahkan kirim /start untuk memulai ulang."
+                try:
+                    await event.respond(basic_text)
+                except:
+                    await self.bot.send_message(event.chat_id, basic_text)
+
+        # Start monitoring tasks
+        asyncio.create_task(self.check_premium_expiry())
+        LoopLagMonitor().start()
         try:
-            await event.respond(basic_text)
-        except:
-            await self.bot.send_message(event.chat_id, basic_text)
+            await serve_prometheus(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            logger.error(f"Gagal menjalankan metrics endpoint: {str(e)}")
+        
+        # Start the bot
+        await self.bot.start(bot_token=BOT_TOKEN)
+        logger.info("Admin bot started.")
+        await self.bot.run_until_disconnected()
 
 # Run the bot
 if __name__ == "__main__":
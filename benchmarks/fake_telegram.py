@@ -0,0 +1,259 @@
+# benchmarks/fake_telegram.py
+"""Offline stand-in for a Telegram account, used by the benchmarks.
+
+FakeServer models one account on a simulated MTProto server: its dialogs,
+per-request latency, the rate of FloodWaitError / ChatWriteForbiddenError
+answers and which groups have slow mode on. FakeClient implements the subset of the Telethon client API that
+userbot.py uses, on top of a FakeServer.
+"""
+from telethon.errors import ChatWriteForbiddenError, FloodWaitError, SlowModeWaitError
+from telethon.tl.functions.channels import GetFullChannelRequest
+import asyncio
+import itertools
+import math
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+DIALOG_PAGE = 100  # dialogs returned per GetDialogs request
+
+class FakeEntity:
+    def __init__(self, id, title, participants_count, megagroup):
+        self.id = id
+        self.title = title
+        self.participants_count = participants_count
+        self.megagroup = megagroup
+        self.broadcast = False
+
+class FakeDialog:
+    def __init__(self, id, title, is_group, participants_count=0, megagroup=False):
+        self.id = id
+        self.title = title
+        self.name = title
+        self.is_group = is_group
+        self.is_channel = megagroup
+        self.is_user = not is_group
+        self.folder_id = None
+        self.entity = FakeEntity(id, title, participants_count, megagroup)
+        self.input_entity = self.entity
+
+class FakeParticipants(list):
+    def __init__(self, total):
+        super().__init__()
+        self.total = total
+
+class FakeFile:
+    """Message.file: metadata of an attached document"""
+
+    def __init__(self, data, name=None, mime_type=None):
+        self.name = name
+        self.mime_type = mime_type
+        self.size = len(data)
+
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, client, chat_id, text):
+        self.client = client
+        self.id = next(self._ids)
+        self.chat_id = chat_id
+        self.text = text
+        self.document = None
+        self.file = None
+        self.edits = []  # (monotonic time, text)
+
+    async def edit(self, text, **kwargs):
+        await self.client.server.rpc('edit_message')
+        self.text = text
+        self.edits.append((time.monotonic(), text))
+        return self
+
+    async def delete(self):
+        await self.client.server.rpc('delete_messages')
+
+    async def reply(self, text, **kwargs):
+        return await self.client.send_message(self.chat_id, text, **kwargs)
+
+class FakeEvent:
+    """Minimal events.NewMessage.Event for invoking handlers directly"""
+
+    def __init__(self, client, text, chat_id=None, reply_to=None, is_group=False, document=None,
+                 file_name='ids.txt', mime_type='text/plain'):
+        self.client = client
+        self.sender_id = client.uid
+        self.chat_id = chat_id if chat_id is not None else client.uid
+        self.text = text
+        self.is_group = is_group
+        self.is_reply = reply_to is not None
+        self._reply_to = reply_to
+        self.document = document  # bytes standing in for an attached file
+        self.file = FakeFile(document, file_name, mime_type) if document is not None else None
+        self.replies = []
+
+    async def reply(self, text, **kwargs):
+        message = await self.client.send_message(self.chat_id, text, **kwargs)
+        self.replies.append(message)
+        return message
+
+    async def get_reply_message(self):
+        return self._reply_to
+
+    async def download_media(self, file=None):
+        return self.document
+
+    async def get_chat(self):
+        return await self.client.get_entity(self.chat_id)
+
+class FakeServer:
+    """One simulated account: dialogs, latency and injected errors"""
+
+    def __init__(self, groups=100, users=20, latency=0.005, jitter=0.0,
+                 flood_rate=0.0, flood_seconds=1, forbidden_rate=0.0,
+                 slowmode_rate=0.0, slowmode_seconds=60, seed=0):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.flood_seconds = flood_seconds
+        self.calls = Counter()
+        self.forwards = Counter()
+
+        self.dialogs = []
+        for i in range(groups):
+            megagroup = self.rng.random() < 0.8
+            chat_id = -1000000000000 - i if megagroup else -100000 - i
+            self.dialogs.append(FakeDialog(
+                chat_id, f"Group {i}", True,
+                participants_count=self.rng.randint(10, 200000),
+                megagroup=megagroup
+            ))
+        for i in range(users):
+            self.dialogs.append(FakeDialog(100000 + i, f"User {i}", False))
+        self.rng.shuffle(self.dialogs)
+
+        group_ids = [d.id for d in self.dialogs if d.is_group]
+        self.forbidden = set(self.rng.sample(group_ids, int(len(group_ids) * forbidden_rate)))
+        self.slowmode = set(self.rng.sample(group_ids, int(len(group_ids) * slowmode_rate)))
+        self.slowmode_seconds = slowmode_seconds
+        self.last_forward = {}
+        self.entities = {d.id: d.entity for d in self.dialogs}
+
+    async def rpc(self, method):
+        self.calls[method] += 1
+        delay = self.latency
+        if self.jitter:
+            delay += self.rng.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(0.0, delay))
+
+    async def forward(self, chat_id):
+        await self.rpc('forward_messages')
+        if chat_id in self.forbidden:
+            raise ChatWriteForbiddenError(request=None)
+        if self.flood_rate and self.rng.random() < self.flood_rate:
+            self.calls['flood_wait'] += 1
+            raise FloodWaitError(request=None, capture=self.flood_seconds)
+        if chat_id in self.slowmode:
+            now = time.monotonic()
+            left = self.last_forward.get(chat_id, -self.slowmode_seconds) + self.slowmode_seconds - now
+            if left > 0:
+                self.calls['slowmode_wait'] += 1
+                # Like Telegram, the error carries the time left, not the interval
+                raise SlowModeWaitError(request=None, capture=math.ceil(left))
+            self.last_forward[chat_id] = now
+        self.forwards[chat_id] += 1
+
+class FakeClient:
+    """The slice of telethon.TelegramClient that userbot.py relies on"""
+
+    def __init__(self, server, uid=777000):
+        self.server = server
+        self.uid = uid
+        self.handlers = {}
+        self.connected = False
+        self._disconnected = None
+
+    async def __call__(self, request):
+        """Raw requests, only GetFullChannelRequest for the slow mode interval"""
+        await self.server.rpc(type(request).__name__)
+        if isinstance(request, GetFullChannelRequest):
+            chat_id = getattr(request.channel, 'id', request.channel)
+            seconds = self.server.slowmode_seconds if chat_id in self.server.slowmode else 0
+            return SimpleNamespace(full_chat=SimpleNamespace(slowmode_seconds=seconds))
+        raise NotImplementedError(type(request).__name__)
+
+    def on(self, event_builder):
+        def decorator(func):
+            self.handlers[func.__name__] = func
+            return func
+        return decorator
+
+    async def start(self, *args, **kwargs):
+        await self.server.rpc('connect')
+        self.connected = True
+        return self
+
+    async def connect(self):
+        await self.server.rpc('connect')
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+        if self._disconnected and not self._disconnected.done():
+            self._disconnected.set_result(None)
+
+    def is_connected(self):
+        return self.connected
+
+    @property
+    def disconnected(self):
+        """Future that completes on disconnect, like TelegramClient.disconnected"""
+        if self._disconnected is None:
+            self._disconnected = asyncio.get_running_loop().create_future()
+            if not self.connected:
+                self._disconnected.set_result(None)
+        return self._disconnected
+
+    async def is_user_authorized(self):
+        return True
+
+    async def get_me(self):
+        await self.server.rpc('get_me')
+        return FakeEntity(self.uid, 'Bench', 0, False)
+
+    async def get_messages(self, chat_id, ids=None):
+        await self.server.rpc('get_messages')
+        message = FakeMessage(self, chat_id, "Benchmark message " * 8)
+        message.id = ids
+        return message
+
+    async def iter_dialogs(self, limit=None):
+        dialogs = self.server.dialogs if limit is None else self.server.dialogs[:limit]
+        for start in range(0, len(dialogs), DIALOG_PAGE):
+            await self.server.rpc('get_dialogs')
+            for dialog in dialogs[start:start + DIALOG_PAGE]:
+                yield dialog
+
+    async def get_dialogs(self, limit=None):
+        return [d async for d in self.iter_dialogs(limit)]
+
+    async def forward_messages(self, entity, messages, *args, **kwargs):
+        chat_id = getattr(entity, 'id', entity)
+        await self.server.forward(chat_id)
+
+    async def send_message(self, entity, message, **kwargs):
+        await self.server.rpc('send_message')
+        return FakeMessage(self, getattr(entity, 'id', entity), message)
+
+    async def get_participants(self, entity, limit=None):
+        await self.server.rpc('get_participants')
+        chat_id = getattr(entity, 'id', entity)
+        return FakeParticipants(self.server.entities[chat_id].participants_count)
+
+    async def get_entity(self, entity):
+        await self.server.rpc('get_entity')
+        chat_id = getattr(entity, 'id', entity)
+        try:
+            return self.server.entities[chat_id]
+        except KeyError:
+            raise ValueError(f"Could not find the input entity for {chat_id}")
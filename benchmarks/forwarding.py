@@ -0,0 +1,242 @@
+# benchmarks/forwarding.py
+"""Load benchmark for the userbot forwarding engine.
+
+Runs offline against the simulated server in benchmarks.fake_telegram,
+so it needs no accounts or network. From the repository root:
+
+    python -m benchmarks.forwarding --tenants 10 --groups 500 --cycles 2
+    python -m benchmarks.forwarding --flood-rate 0.01 --forbidden-rate 0.05 --json
+
+Reports forwards/sec, cycle wall time, event-loop lag, `.listgrup` latency,
+traced memory per tenant and per-tenant runtime state at 1k and 10k groups.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+
+from benchmarks import fake_telegram
+from benchmarks.fake_telegram import FakeClient, FakeEvent, FakeServer
+from userbot import ForwardTask, Userbot
+
+class LoopLagSampler:
+    """Measures how late a periodic wakeup fires, i.e. event-loop lag"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.monotonic() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def summary(self):
+        if not self.samples:
+            return {'max_ms': 0.0, 'p95_ms': 0.0}
+        ordered = sorted(self.samples)
+        return {
+            'max_ms': round(ordered[-1] * 1000, 3),
+            'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1 if len(ordered) > 1 else 0] * 1000, 3),
+        }
+
+def make_server(args, seed):
+    return FakeServer(
+        groups=args.groups,
+        users=args.users,
+        latency=args.latency,
+        jitter=args.jitter,
+        flood_rate=args.flood_rate,
+        flood_seconds=args.flood_seconds,
+        forbidden_rate=args.forbidden_rate,
+        slowmode_rate=args.slowmode_rate,
+        seed=seed
+    )
+
+async def make_tenant(server, forward_interval):
+    client = FakeClient(server)
+    userbot = Userbot(None, 0, '', client=client)
+    userbot.forward_interval = forward_interval
+    await userbot.start()
+    return userbot
+
+async def run_cycles(userbot, cycles):
+    """Run one forward task for `cycles` cycles, returns the cycle durations"""
+    client = userbot.client
+    task_id = f"{client.uid}_1"
+    userbot.forward_tasks[task_id] = ForwardTask(message_id=1, chat_id=client.uid, delay=0)
+    event = FakeEvent(client, '.hiyaok 0')
+
+    task = userbot.forward_tasks[task_id]
+    runner = asyncio.create_task(userbot._forward_message(task_id, event))
+    try:
+        while len(task.cycles) < cycles:
+            if runner.done():
+                runner.result()
+                raise RuntimeError("forward task ended early")
+            await asyncio.sleep(0.005)
+    finally:
+        userbot.forward_tasks[task_id].running = False
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+
+    return [c.wall for c in list(task.cycles)[:cycles]]
+
+async def bench_forwarding(args):
+    servers = [make_server(args, seed) for seed in range(args.tenants)]
+    tenants = [await make_tenant(server, args.forward_interval) for server in servers]
+
+    lag = LoopLagSampler()
+    lag.start()
+    started = time.monotonic()
+    durations = await asyncio.gather(*(run_cycles(t, args.cycles) for t in tenants))
+    wall = time.monotonic() - started
+    await lag.stop()
+
+    forwards = sum(sum(s.forwards.values()) for s in servers)
+    cycle_times = [d for tenant in durations for d in tenant]
+    phases = [c for t in tenants for task in t.forward_tasks.values() for c in task.cycles]
+    return {
+        'tenants': args.tenants,
+        'groups_per_tenant': args.groups,
+        'cycles': args.cycles,
+        'wall_s': round(wall, 3),
+        'forwards': forwards,
+        'forwards_per_s': round(forwards / wall, 1) if wall else 0.0,
+        'flood_waits': sum(s.calls['flood_wait'] for s in servers),
+        'status_edits': sum(s.calls['edit_message'] for s in servers),
+        'cycle_s_mean': round(statistics.mean(cycle_times), 3),
+        'cycle_s_max': round(max(cycle_times), 3),
+        'dialog_scan_s_mean': round(statistics.mean(c.dialog_scan for c in phases), 3),
+        'flood_wait_s_total': round(sum(c.flood_wait for c in phases), 3),
+        'send_p95_ms_max': round(max(c.send_p95 for c in phases) * 1000, 2),
+        'loop_lag': lag.summary(),
+    }
+
+async def bench_listgrup(args):
+    server = make_server(args, 0)
+    userbot = await make_tenant(server, args.forward_interval)
+    event = FakeEvent(userbot.client, '.listgrup')
+
+    lag = LoopLagSampler()
+    lag.start()
+    started = time.monotonic()
+    await userbot.client.handlers['listgrup_handler'](event)
+    wall = time.monotonic() - started
+    await lag.stop()
+
+    return {
+        'groups': args.groups,
+        'wall_s': round(wall, 3),
+        'replies': len(event.replies),
+        'reply_chars': sum(len(m.text) for m in event.replies),
+        'rpc_calls': dict(server.calls),
+        'loop_lag': lag.summary(),
+    }
+
+async def bench_memory(args):
+    """Traced allocations of N tenants after one forward cycle each"""
+    servers = [make_server(args, seed) for seed in range(args.tenants)]
+    for server in servers:
+        server.latency = 0.0
+        server.flood_rate = 0.0
+
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    tenants = [await make_tenant(server, 0) for server in servers]
+    await asyncio.gather(*(run_cycles(t, 1) for t in tenants))
+    current = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in current.compare_to(baseline, 'filename'))
+    return {
+        'tenants': args.tenants,
+        'bytes_per_tenant': allocated // args.tenants,
+    }
+
+async def bench_group_state(args):
+    """Bytes of tenant runtime state (tasks, scheduler, failures) per group count.
+
+    The simulated server is built before the baseline, so only what the
+    userbot itself keeps is counted. Half the groups reject the account and
+    half of the rest have slow mode, so most groups end up with state.
+    """
+    results = {}
+    for groups in args.state_groups:
+        server = FakeServer(groups=groups, users=0, latency=0.0,
+                            forbidden_rate=0.5, slowmode_rate=0.5, seed=0)
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        userbot = await make_tenant(server, 0)
+        await run_cycles(userbot, 2)
+        current = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        # The simulated server's own bookkeeping isn't tenant state
+        server_side = [tracemalloc.Filter(False, fake_telegram.__file__)]
+        current = current.filter_traces(server_side)
+        baseline = baseline.filter_traces(server_side)
+        allocated = sum(stat.size_diff for stat in current.compare_to(baseline, 'filename'))
+        results[f"{groups}_groups"] = {
+            'bytes_per_tenant': allocated,
+            'bytes_per_group': round(allocated / groups, 1),
+        }
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--tenants', type=int, default=4)
+    parser.add_argument('--groups', type=int, default=200, help="groups per tenant")
+    parser.add_argument('--users', type=int, default=50, help="private dialogs per tenant")
+    parser.add_argument('--cycles', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.005, help="seconds per request")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--flood-rate', type=float, default=0.0)
+    parser.add_argument('--flood-seconds', type=int, default=1)
+    parser.add_argument('--forbidden-rate', type=float, default=0.0)
+    parser.add_argument('--slowmode-rate', type=float, default=0.0)
+    parser.add_argument('--state-groups', type=lambda v: [int(n) for n in v.split(',')],
+                        default=[1000, 10000], help="group counts for the runtime state benchmark")
+    parser.add_argument('--forward-interval', type=float, default=0.0,
+                        help="pause between forwards, the userbot default is 2")
+    parser.add_argument('--json', action='store_true', help="print one JSON object")
+    return parser.parse_args(argv)
+
+async def run(args):
+    return {
+        'forwarding': await bench_forwarding(args),
+        'listgrup': await bench_listgrup(args),
+        'memory': await bench_memory(args),
+        'group_state': await bench_group_state(args),
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results))
+        return
+    for name, values in results.items():
+        print(f"[{name}]")
+        for key, value in values.items():
+            print(f"  {key}: {value}")
+
+if __name__ == '__main__':
+    main()
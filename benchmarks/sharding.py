@@ -0,0 +1,99 @@
+# benchmarks/sharding.py
+"""Tenant placement and rebalancing across local shard workers.
+
+Starts shard_worker.py processes with --fake-telegram on unix sockets,
+places tenants through ShardRouter, then adds one worker and reports how
+many tenants moved (ideally about 1/(workers + 1)). From the repository root:
+
+    python -m benchmarks.sharding --workers 3 --tenants 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sharding import ShardRouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_worker(address):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'shard_worker.py'), address, '--fake-telegram'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=ROOT,
+        text=True
+    )
+    for line in process.stdout:
+        if line.strip() == "SHARD READY":
+            # Tenants still print to stdout, keep the pipe from filling up
+            threading.Thread(target=process.stdout.read, daemon=True).start()
+            return process
+    raise RuntimeError(f"Worker {address} did not start")
+
+async def run(args):
+    tmp = tempfile.mkdtemp(prefix='shards-')
+    addresses = {f"w{i}": f"unix:{tmp}/w{i}.sock" for i in range(args.workers + 1)}
+    processes = [start_worker(a) for a in addresses.values()]
+    extra = f"w{args.workers}"
+
+    router = ShardRouter({n: a for n, a in addresses.items() if n != extra}, vnodes=args.vnodes)
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            router.start_tenant(str(1000 + i), {'session': f"s{i}", 'api_id': 1, 'api_hash': 'h'})
+            for i in range(args.tenants)
+        ))
+        place_s = time.perf_counter() - started
+        before = Counter(node for node, _ in router.tenants.values())
+
+        started = time.perf_counter()
+        moved = await router.add_worker(extra, addresses[extra])
+        rebalance_s = time.perf_counter() - started
+        after = Counter(node for node, _ in router.tenants.values())
+
+        reported = {}
+        for node in sorted(router.addresses):
+            reported[node] = len(await router.call(node, 'list_tenants'))
+    finally:
+        await router.close()
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    return {
+        'tenants': args.tenants,
+        'workers_before': args.workers,
+        'placement_s': round(place_s, 3),
+        'per_worker_before': dict(sorted(before.items())),
+        'per_worker_after': dict(sorted(after.items())),
+        'per_worker_reported': reported,
+        'moved': len(moved),
+        'moved_fraction': round(len(moved) / args.tenants, 3),
+        'ideal_fraction': round(1 / (args.workers + 1), 3),
+        'rebalance_s': round(rebalance_s, 3),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--tenants', type=int, default=200)
+    parser.add_argument('--vnodes', type=int, default=160)
+    parser.add_argument('--json', action='store_true', help="print one JSON object")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results))
+        return
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+
+if __name__ == '__main__':
+    main()
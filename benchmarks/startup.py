@@ -0,0 +1,103 @@
+# benchmarks/startup.py
+"""Time-to-ready of a userbot tenant, cold interpreter vs zygote fork.
+
+Measures from the spawn call until the tenant prints "Starting userbot...",
+i.e. the interpreter is up and userbot.py plus Telethon are imported. The
+Telegram connect that follows is the same network round trip on both paths
+and is not part of the measurement (the dummy session fails right after).
+From the repository root:
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from zygote import ZygoteClient
+
+READY = "Starting userbot..."
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARGV = [os.path.join(ROOT, 'userbot.py'), 'bench-session', '1', 'bench-hash']
+
+def wait_ready(stdout):
+    for line in stdout:
+        if line.strip() == READY:
+            return True
+    return False
+
+async def time_cold():
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable] + ARGV,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=dict(os.environ, PYTHONUNBUFFERED='1', USERBOT_TENANT_ID='bench'),
+        cwd=ROOT,
+        text=True
+    )
+    ready = await asyncio.to_thread(wait_ready, process.stdout)
+    elapsed = time.perf_counter() - started
+    process.wait()
+    process.stdout.close()
+    return elapsed if ready else None
+
+async def time_zygote(zygote):
+    started = time.perf_counter()
+    process = await zygote.spawn(ARGV, dict(os.environ, USERBOT_TENANT_ID='bench'), ROOT)
+    ready = await asyncio.to_thread(wait_ready, process.stdout)
+    elapsed = time.perf_counter() - started
+    process.stdout.close()
+    process.stderr.close()
+    return elapsed if ready else None
+
+def summarize(samples):
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        return {'runs': 0}
+    return {
+        'runs': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 1),
+        'min_ms': round(min(samples) * 1000, 1),
+        'max_ms': round(max(samples) * 1000, 1),
+    }
+
+async def run(args):
+    cold = [await time_cold() for _ in range(args.runs)]
+
+    zygote = ZygoteClient(os.path.join(tempfile.gettempdir(), f"bench-zygote-{os.getpid()}.sock"))
+    started = time.perf_counter()
+    await zygote.ensure_started()
+    zygote_boot = time.perf_counter() - started
+    try:
+        forked = [await time_zygote(zygote) for _ in range(args.runs)]
+    finally:
+        zygote.close()
+
+    return {
+        'cold': summarize(cold),
+        'zygote': dict(summarize(forked), boot_ms=round(zygote_boot * 1000, 1)),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help="print one JSON object")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results))
+        return
+    for name, values in results.items():
+        print(f"[{name}]")
+        for key, value in values.items():
+            print(f"  {key}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,14 @@
 # config.py
-from telethon.sync import TelegramClient
 from telethon.errors import (
-    SessionPasswordNeededError, 
     AuthKeyUnregisteredError, 
     AuthKeyError,
     UserDeactivatedBanError
 )
 from telethon.sessions import StringSession
-import json
+from storage import AsyncJsonStore, JsonStore
+from session_pool import SessionUnauthorized, session_pool
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import asyncio
 
 # Basic Configuration
@@ -26,28 +25,35 @@ DB_FILE = "userbot_data.json"
 CHECK_INTERVAL = 60  # 1 minute in seconds
 MAX_RETRIES = 2
 RETRY_DELAY = 10  # 10 seconds between retries
+EXPIRY_CONCURRENCY = 10  # expiry notifications sent at the same time
+BULK_CONCURRENCY = 8  # userbots handled at the same time by admin bulk operations
+BULK_PROGRESS_INTERVAL = 3  # seconds between edits of the bulk progress message
+
+# Metrics Configuration (Prometheus text endpoint, localhost only)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+
+# Sharding Configuration: worker name -> rpc address ("unix:/path" or "tcp:host:port").
+# Empty means every userbot runs on this host as its own process
+SHARD_WORKERS = {}
+# Workers on another host need both: a shared secret for the handshake and TLS
+# files ({'ca': ..., 'cert': ..., 'key': ...}). Unix sockets and 127.0.0.1 work without
+SHARD_SECRET = None
+SHARD_TLS = {}
 
 # Bot instance for notifications
 admin_bot = None
 
-def load_data():
+db_store = AsyncJsonStore(JsonStore(DB_FILE, default={'userbots': {}, 'banned_groups': {}}))
+
+async def load_data():
     """Load data from database file"""
-    try:
-        if os.path.exists(DB_FILE):
-            with open(DB_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {'userbots': {}, 'banned_groups': {}}
-    except Exception as e:
-        print(f"Error loading database: {str(e)}")
-        return {'userbots': {}, 'banned_groups': {}}
-
-def save_data(data):
+    return await db_store.load()
+
+async def save_data(data):
     """Save data to database file"""
-    try:
-        with open(DB_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print(f"Error saving database: {str(e)}")
+    if not await db_store.save(data):
+        print(f"Error saving database: {DB_FILE}")
 
 async def notify_admin(message):
     """Send notification to all admin users"""
@@ -63,21 +69,16 @@ async def check_session_validity(user_id, info):
     retries = 0
     while retries < MAX_RETRIES:
         try:
-            client = TelegramClient(StringSession(info['session']), API_ID, API_HASH)
-            await client.connect()
-            
-            if not await client.is_user_authorized():
-                raise AuthKeyUnregisteredError("Session unauthorized")
-                
-            # Test basic functionality
-            me = await client.get_me()
-            if not me:
-                raise Exception("Failed to get user info")
-                
-            await client.disconnect()
+            # Shares one connect with concurrent checks, dropped right after
+            async with session_pool.borrow(info['session'], API_ID, API_HASH) as client:
+                # Test basic functionality
+                me = await client.get_me()
+                if not me:
+                    raise Exception("Failed to get user info")
+                    
             return True
             
-        except (AuthKeyUnregisteredError, AuthKeyError, UserDeactivatedBanError):
+        except (SessionUnauthorized, AuthKeyUnregisteredError, AuthKeyError, UserDeactivatedBanError):
             # Session is definitely invalid
             return False
             
@@ -93,7 +94,7 @@ async def monitor_sessions():
     """Monitor all userbot sessions and handle invalid ones"""
     while True:
         try:
-            data = load_data()
+            data = await load_data()
             sessions_to_remove = []
 
             for user_id, info in data['userbots'].items():
@@ -134,7 +135,7 @@ async def monitor_sessions():
                 await notify_admin(notification)
 
             if sessions_to_remove:
-                save_data(data)
+                await save_data(data)
 
         except Exception as e:
             print(f"Error in session monitoring: {str(e)}")
@@ -142,37 +143,12 @@ async def monitor_sessions():
         # Wait before next check
         await asyncio.sleep(CHECK_INTERVAL)
 
-def check_expiry():
-    """Check and handle expired userbot sessions"""
-    try:
-        data = load_data()
-        current_time = datetime.now()
-        changes_made = False
-        
-        for user_id, info in list(data['userbots'].items()):
-            if info['active']:
-                expiry = datetime.fromisoformat(info['expires_at'])
-                if current_time > expiry:
-                    info['active'] = False
-                    changes_made = True
-                    
-                    # Send notification to userbot
-                    try:
-                        client = TelegramClient(StringSession(info['session']), API_ID, API_HASH)
-                        with client:
-                            client.send_message('me', """
+# Sent by the admin bot to an expired userbot's own Saved Messages
+EXPIRY_MESSAGE = """
 ⚠️ **Userbot Expired!**
 Your userbot has expired. Please contact @hiyaok to extend your subscription.
 Thank you for using our service! 🙏
-""", parse_mode='md')
-                    except Exception as e:
-                        print(f"Failed to send expiry notification to user {user_id}: {str(e)}")
-        
-        if changes_made:
-            save_data(data)
-            
-    except Exception as e:
-        print(f"Error in expiry check: {str(e)}")
+"""
 
 def start_session_monitor(bot):
     """Initialize and start the session monitoring"""
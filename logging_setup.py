@@ -0,0 +1,98 @@
+# logging_setup.py
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import logging
+import os
+import queue
+import sys
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DIR = 'logs'
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+TENANT_PREFIX = 'tenant.'
+
+class TenantRouter(logging.Handler):
+    """Send `tenant.<id>` records to their own rotating file.
+
+    Everything else goes to the default handler. Tenant files are opened
+    lazily on the listener thread, so the hot path never touches the disk.
+    """
+
+    def __init__(self, default, log_dir=LOG_DIR, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        super().__init__()
+        self.default = default
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.tenants = {}
+
+    def _tenant_handler(self, tenant_id):
+        handler = self.tenants.get(tenant_id)
+        if handler is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            handler = RotatingFileHandler(
+                os.path.join(self.log_dir, f"userbot_{tenant_id}.log"),
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding='utf-8'
+            )
+            handler.setFormatter(self.formatter)
+            self.tenants[tenant_id] = handler
+        return handler
+
+    def emit(self, record):
+        if record.name.startswith(TENANT_PREFIX):
+            handler = self._tenant_handler(record.name[len(TENANT_PREFIX):])
+        else:
+            handler = self.default
+        handler.handle(record)
+
+    def close(self):
+        for handler in self.tenants.values():
+            handler.close()
+        self.default.close()
+        super().close()
+
+def setup_logging(log_file=None, level=logging.INFO, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, stream=None):
+    """Configure the root logger to hand records to a background thread.
+
+    Loggers only put records on a queue; a QueueListener thread formats them
+    and writes to `stream` (stdout by default) and, when log_file is given,
+    to a size-rotated file (tenant loggers get their own file next to it).
+    Returns the listener, which is also stopped automatically at exit.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setFormatter(formatter)
+    handlers = [console]
+
+    if log_file:
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(formatter)
+        router = TenantRouter(file_handler, max_bytes=max_bytes, backup_count=backup_count)
+        router.setFormatter(formatter)
+        handlers.append(router)
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def tenant_logger(tenant_id):
+    """Logger whose records end up in logs/userbot_<tenant_id>.log"""
+    return logging.getLogger(f"{TENANT_PREFIX}{tenant_id}")
@@ -14,7 +14,7 @@ async def main():
     bot = await admin_bot.start()
     
     # Start all active userbots
-    data = load_data()
+    data = await load_data()
     active_bots = []
     for user_id, info in data['userbots'].items():
         if info['active']:
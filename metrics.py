@@ -0,0 +1,208 @@
+# metrics.py
+from contextlib import contextmanager
+import asyncio
+import bisect
+import functools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, shared by every histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+class Registry:
+    """Thread-safe store of counters, gauges and histograms keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def gauges_by_label(self, name, label):
+        with self._lock:
+            return {
+                dict(labels).get(label): value
+                for (n, labels), value in self.gauges.items() if n == name
+            }
+
+    def histogram_items(self, name=None):
+        with self._lock:
+            return [(n, labels, h) for (n, labels), h in self.histograms.items() if name in (None, n)]
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        def fmt(labels, extra=()):
+            pairs = [f'{k}="{v}"' for k, v in tuple(labels) + tuple(extra)]
+            return '{' + ','.join(pairs) + '}' if pairs else ''
+
+        lines = []
+        with self._lock:
+            for kind, items in (('counter', self.counters), ('gauge', self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(items.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{name}{fmt(labels)} {value}")
+
+            typed = set()
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, n in zip([str(b) for b in h.buckets] + ['+Inf'], h.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {h.sum}")
+                lines.append(f"{name}_count{fmt(labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot_counters(self, prefix=''):
+        """Counters as a JSON-friendly dict, used by tenants to report to the admin bot"""
+        with self._lock:
+            return {
+                name: value for (name, labels), value in self.counters.items()
+                if name.startswith(prefix) and not labels
+            }
+
+REGISTRY = Registry()
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes up a periodic timer"""
+
+    def __init__(self, registry=REGISTRY, interval=0.5):
+        self.registry = registry
+        self.interval = interval
+        self.task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.registry.observe('event_loop_lag_seconds', lag)
+            self.registry.set('event_loop_lag_last_seconds', lag)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        return self.task
+
+def instrument_client(client, registry=REGISTRY):
+    """Time every handler registered through client.on() from now on"""
+    original_on = client.on
+
+    def on(event_builder):
+        register = original_on(event_builder)
+
+        def decorator(func):
+            name = func.__name__
+
+            @functools.wraps(func)
+            async def timed(event):
+                start = time.perf_counter()
+                try:
+                    return await func(event)
+                except Exception:
+                    registry.inc('handler_errors_total', handler=name)
+                    raise
+                finally:
+                    registry.observe('handler_latency_seconds', time.perf_counter() - start, handler=name)
+
+            register(timed)
+            return func
+        return decorator
+
+    client.on = on
+    return client
+
+async def serve_prometheus(host='127.0.0.1', port=9464, registry=REGISTRY):
+    """Serve GET /metrics in Prometheus text format"""
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain headers, we only look at the request line
+            while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+                pass
+            parts = request.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                body = registry.render_prometheus().encode()
+                status = '200 OK'
+            else:
+                body = b'not found\n'
+                status = '404 Not Found'
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,254 @@
+# rpc.py
+"""Small framed RPC used between the admin bot, shard workers and tenants.
+
+Every frame is a 4-byte big-endian length followed by a UTF-8 JSON object:
+
+    {"id": 1, "method": "ping", "params": {}}     request
+    {"id": 1, "result": ...} / {"id": 1, "error": "..."}   response
+    {"method": "log", "params": {...}}             notification, no reply
+
+Both ends of a Connection can call and notify, so a worker or tenant can
+push events (tenant exited, log lines) without being asked. Addresses are
+`unix:/path/to.sock` or `tcp:host:port`.
+
+Frames carry session strings, so TCP is only allowed on loopback unless both
+a shared secret and a TLS context are given. With a secret, every connection
+starts with a mutual HMAC challenge before any frame is dispatched:
+
+    server -> {"challenge": nonce_s}
+    client -> {"auth": hmac(secret, "client" + nonce_s), "challenge": nonce_c}
+    server -> {"auth": hmac(secret, "server" + nonce_c)}
+"""
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import itertools
+import json
+import logging
+import os
+import ssl as ssl_module
+import struct
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('!I')
+MAX_FRAME = 16 * 1024 * 1024
+CALL_TIMEOUT = 30
+HANDSHAKE_TIMEOUT = 10
+NONCE_BYTES = 32
+
+class RpcError(Exception):
+    """The remote handler failed, or the connection went away"""
+
+async def read_frame(reader):
+    """Next message from reader, None at EOF"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise RpcError(f"Frame too large: {size} bytes")
+    return json.loads(await reader.readexactly(size))
+
+def write_frame(writer, message):
+    body = json.dumps(message, separators=(',', ':')).encode()
+    writer.write(HEADER.pack(len(body)) + body)
+
+def parse_address(address):
+    """'unix:/path' -> ('unix', path), 'tcp:host:port' -> ('tcp', (host, port))"""
+    scheme, _, rest = address.partition(':')
+    if scheme == 'unix' and rest:
+        return 'unix', rest
+    if scheme == 'tcp':
+        host, _, port = rest.rpartition(':')
+        return 'tcp', (host or '127.0.0.1', int(port))
+    raise ValueError(f"Unsupported RPC address: {address}")
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def check_transport(scheme, target, secret=None, ssl=None):
+    """Refuse plain or unauthenticated TCP to anything but loopback"""
+    if scheme == 'tcp' and not is_loopback(target[0]) and (not secret or ssl is None):
+        raise ValueError(
+            f"RPC over tcp:{target[0]}:{target[1]} needs a shared secret and TLS, "
+            "use a unix socket or 127.0.0.1 otherwise"
+        )
+
+def tls_context(server, cert=None, key=None, ca=None):
+    """TLS context for RPC; with `ca` the peer must present a certificate signed by it"""
+    if server:
+        context = ssl_module.SSLContext(ssl_module.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        if ca:
+            context.load_verify_locations(ca)
+            context.verify_mode = ssl_module.CERT_REQUIRED
+    else:
+        context = ssl_module.create_default_context(cafile=ca)
+        if cert:
+            context.load_cert_chain(cert, key)
+    return context
+
+def _proof(secret, role, nonce):
+    return hmac.new(secret.encode(), role.encode() + bytes.fromhex(nonce), hashlib.sha256).hexdigest()
+
+async def _server_handshake(reader, writer, secret):
+    nonce = os.urandom(NONCE_BYTES).hex()
+    write_frame(writer, {'challenge': nonce})
+    await writer.drain()
+    reply = await read_frame(reader)
+    if not reply or not hmac.compare_digest(str(reply.get('auth', '')), _proof(secret, 'client', nonce)):
+        raise RpcError("Authentication failed")
+    write_frame(writer, {'auth': _proof(secret, 'server', str(reply.get('challenge', '')))})
+    await writer.drain()
+
+async def _client_handshake(reader, writer, secret):
+    challenge = await read_frame(reader)
+    if not challenge or 'challenge' not in challenge:
+        raise RpcError("Server did not send an authentication challenge")
+    nonce = os.urandom(NONCE_BYTES).hex()
+    write_frame(writer, {'auth': _proof(secret, 'client', challenge['challenge']), 'challenge': nonce})
+    await writer.drain()
+    reply = await read_frame(reader)
+    if not reply or not hmac.compare_digest(str(reply.get('auth', '')), _proof(secret, 'server', nonce)):
+        raise RpcError("Server failed authentication")
+
+class Connection:
+    """One RPC peer over an asyncio stream pair"""
+
+    def __init__(self, reader, writer, handlers=None, name='rpc'):
+        self.reader = reader
+        self.writer = writer
+        self.handlers = handlers or {}
+        self.name = name
+        self.pending = {}
+        self._ids = itertools.count(1)
+        self._task = None
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._read_loop())
+        return self
+
+    async def call(self, method, timeout=CALL_TIMEOUT, **params):
+        if self.closed.done():
+            raise RpcError(f"{self.name}: connection closed")
+        request_id = next(self._ids)
+        future = self.pending[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            write_frame(self.writer, {'id': request_id, 'method': method, 'params': params})
+            await self.writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(request_id, None)
+
+    def notify(self, method, **params):
+        if not self.closed.done():
+            write_frame(self.writer, {'method': method, 'params': params})
+
+    async def _read_loop(self):
+        try:
+            while True:
+                message = await read_frame(self.reader)
+                if message is None:
+                    break
+                if 'method' in message:
+                    asyncio.create_task(self._dispatch(message))
+                else:
+                    future = self.pending.get(message.get('id'))
+                    if future and not future.done():
+                        if 'error' in message:
+                            future.set_exception(RpcError(message['error']))
+                        else:
+                            future.set_result(message.get('result'))
+        except (ConnectionError, RpcError, ValueError) as e:
+            logger.warning(f"{self.name}: connection dropped: {str(e)}")
+        finally:
+            self._close_pending()
+
+    async def _dispatch(self, message):
+        request_id = message.get('id')
+        handler = self.handlers.get(message['method'])
+        try:
+            if handler is None:
+                raise RpcError(f"Unknown method: {message['method']}")
+            result = await handler(**message.get('params', {}))
+            reply = {'id': request_id, 'result': result}
+        except Exception as e:
+            if request_id is None:
+                logger.error(f"{self.name}: notification {message['method']} failed: {str(e)}")
+            reply = {'id': request_id, 'error': f"{type(e).__name__}: {str(e)}"}
+        if request_id is not None and not self.closed.done():
+            try:
+                write_frame(self.writer, reply)
+                await self.writer.drain()
+            except ConnectionError:
+                pass
+
+    def _close_pending(self):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(RpcError(f"{self.name}: connection closed"))
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+        if self._task:
+            self._task.cancel()
+        self._close_pending()
+
+async def connect(address, handlers=None, name=None, secret=None, ssl=None):
+    scheme, target = parse_address(address)
+    check_transport(scheme, target, secret, ssl)
+    if scheme == 'unix':
+        # Local only, the socket file's permissions guard it
+        reader, writer = await asyncio.open_unix_connection(target)
+    else:
+        reader, writer = await asyncio.open_connection(*target, ssl=ssl)
+    if secret:
+        try:
+            await asyncio.wait_for(_client_handshake(reader, writer, secret), HANDSHAKE_TIMEOUT)
+        except BaseException:
+            writer.close()
+            raise
+    return Connection(reader, writer, handlers, name or address).start()
+
+async def connect_socket(sock, handlers=None, name='rpc'):
+    """Connection over an already connected socket, e.g. one end of a socketpair"""
+    reader, writer = await asyncio.open_unix_connection(sock=sock)
+    return Connection(reader, writer, handlers, name).start()
+
+async def serve(address, handlers, on_connect=None, secret=None, ssl=None):
+    """Accept connections on address, each one served by `handlers`"""
+    async def accept(reader, writer):
+        if secret:
+            try:
+                await asyncio.wait_for(_server_handshake(reader, writer, secret), HANDSHAKE_TIMEOUT)
+            except (asyncio.TimeoutError, ConnectionError, RpcError, ValueError) as e:
+                logger.warning(f"{address}: rejected connection: {str(e)}")
+                writer.close()
+                return
+        connection = Connection(reader, writer, handlers, address).start()
+        if on_connect:
+            on_connect(connection)
+
+    scheme, target = parse_address(address)
+    check_transport(scheme, target, secret, ssl)
+    if scheme == 'unix':
+        server = await asyncio.start_unix_server(accept, target)
+        os.chmod(target, 0o600)
+        return server
+    return await asyncio.start_server(accept, *target, ssl=ssl)
@@ -0,0 +1,140 @@
+# session_pool.py
+from contextlib import asynccontextmanager
+from telethon import TelegramClient
+from telethon.errors import AuthKeyError, AuthKeyUnregisteredError, UserDeactivatedBanError
+from telethon.sessions import StringSession
+import asyncio
+import hashlib
+import logging
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Errors after which a pooled connection must not be handed out again
+DEAD_CONNECTION_ERRORS = (
+    ConnectionError,
+    OSError,
+    AuthKeyError,
+    AuthKeyUnregisteredError,
+    UserDeactivatedBanError,
+)
+
+class SessionUnauthorized(Exception):
+    """The session string no longer belongs to a logged-in account"""
+
+class PooledClient:
+    def __init__(self, client):
+        self.client = client
+        self.in_use = 0
+
+class SessionPool:
+    """Keyed, connected and authorized TelegramClients shared by concurrent borrowers.
+
+    Verification and notifications borrow a live connection for a session.
+    Borrowers that overlap share a single connect and auth check, and a
+    client handed in with adopt() is reused instead of opening a new one.
+    The client is disconnected as soon as the last borrower returns it.
+    Nothing is kept warm between borrows: the sessions also belong to
+    userbots that run elsewhere, and a second idle connection on the same
+    auth key from another IP can get the key revoked with
+    AuthKeyDuplicatedError.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self._connecting = {}  # key -> task of the connect in progress
+
+    @staticmethod
+    def key(session_string):
+        return hashlib.sha256(session_string.encode()).hexdigest()[:16]
+
+    @asynccontextmanager
+    async def borrow(self, session_string, api_id, api_hash, **client_kwargs):
+        """Yield a connected, authorized client for session_string"""
+        key = self.key(session_string)
+        entry = await self._acquire(key, session_string, api_id, api_hash, client_kwargs)
+        entry.in_use += 1
+        try:
+            yield entry.client
+        except DEAD_CONNECTION_ERRORS:
+            await self.discard(session_string)
+            raise
+        finally:
+            entry.in_use -= 1
+            if entry.in_use == 0 and self.entries.get(key) is entry:
+                del self.entries[key]
+                await self._disconnect(entry)
+
+    def adopt(self, session_string, client):
+        """Put an already connected and authorized client into the pool"""
+        key = self.key(session_string)
+        entry = self.entries.get(key)
+        if entry is None or entry.client is not client:
+            self.entries[key] = PooledClient(client)
+            if entry is not None:
+                asyncio.create_task(self._disconnect(entry))
+        return client
+
+    async def discard(self, session_string):
+        entry = self.entries.pop(self.key(session_string), None)
+        if entry:
+            await self._disconnect(entry)
+
+    async def _acquire(self, key, session_string, api_id, api_hash, client_kwargs):
+        missed = False
+        while True:
+            entry = self.entries.get(key)
+            if entry and entry.client.is_connected():
+                if not missed:
+                    REGISTRY.inc('session_pool_hits_total')
+                return entry
+            if entry:
+                del self.entries[key]
+
+            connecting = self._connecting.get(key)
+            if connecting is None:
+                missed = True
+                REGISTRY.inc('session_pool_misses_total')
+                connecting = self._connecting[key] = asyncio.ensure_future(
+                    self._connect(key, session_string, api_id, api_hash, client_kwargs)
+                )
+                # Kept only while the connect runs, so the map never outgrows the borrowers
+                connecting.add_done_callback(lambda _: self._connecting.pop(key, None))
+            # Overlapping borrowers wait on the same connect, then take the entry it added
+            try:
+                await asyncio.shield(connecting)
+            except asyncio.CancelledError:
+                # The connect goes on without us, don't leave its client connected unused
+                connecting.add_done_callback(lambda _: self._drop_unused(key))
+                raise
+
+    async def _connect(self, key, session_string, api_id, api_hash, client_kwargs):
+        client = TelegramClient(StringSession(session_string), int(api_id), api_hash, **client_kwargs)
+        with REGISTRY.timer('session_pool_connect_seconds'):
+            await client.connect()
+        try:
+            if not await client.is_user_authorized():
+                raise SessionUnauthorized("Session unauthorized")
+        except BaseException:
+            await self._disconnect(PooledClient(client))
+            raise
+        self.entries[key] = PooledClient(client)
+
+    def _drop_unused(self, key):
+        entry = self.entries.get(key)
+        if entry and entry.in_use == 0:
+            del self.entries[key]
+            asyncio.create_task(self._disconnect(entry))
+
+    async def _disconnect(self, entry):
+        try:
+            await entry.client.disconnect()
+        except Exception as e:
+            logger.error(f"Error disconnecting pooled client: {str(e)}")
+
+    async def close(self):
+        entries, self.entries = list(self.entries.values()), {}
+        await asyncio.gather(*(self._disconnect(e) for e in entries))
+
+session_pool = SessionPool()
@@ -0,0 +1,155 @@
+# shard_worker.py
+"""Shard worker: runs a share of the userbot tenants in one process.
+
+The admin bot's ShardRouter (sharding.py) decides which tenants land here
+and drives the worker over rpc.py:
+
+    python shard_worker.py unix:/tmp/shard-1.sock
+    python shard_worker.py tcp:127.0.0.1:9601 --fake-telegram
+    python shard_worker.py tcp:0.0.0.0:9601 --secret-file shard.secret \
+        --tls-cert worker.pem --tls-key worker.key --tls-ca ca.pem
+
+--fake-telegram runs tenants against benchmarks.fake_telegram, so several
+workers can be tried on one box without real accounts. Listening on anything
+but a unix socket or loopback requires the shared secret and TLS, the RPC
+carries session strings.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+import rpc
+from logging_setup import setup_logging
+from metrics import REGISTRY
+from session_pool import SessionUnauthorized
+from userbot import ControlChannel, Userbot
+
+logger = logging.getLogger(__name__)
+
+class ShardWorker:
+    def __init__(self, client_factory=None):
+        self.client_factory = client_factory
+        self.tenants = {}  # user_id -> Userbot
+        self.watchers = {}
+        self.admins = set()
+        self.handlers = {
+            'ping': self.ping,
+            'start_tenant': self.start_tenant,
+            'stop_tenant': self.stop_tenant,
+            'list_tenants': self.list_tenants,
+            'stats': self.stats,
+            'tenant_call': self.tenant_call,
+        }
+
+    def on_connect(self, connection):
+        self.admins.add(connection)
+        connection.closed.add_done_callback(lambda _: self.admins.discard(connection))
+
+    async def ping(self):
+        return {'pid': os.getpid(), 'tenants': len(self.tenants)}
+
+    async def start_tenant(self, user_id, session, api_id, api_hash, banned=None, filters=None):
+        if user_id in self.tenants:
+            return {'started': False}
+
+        client = self.client_factory(session, api_id, api_hash) if self.client_factory else None
+        userbot = Userbot(session, int(api_id), api_hash, client=client)
+        if banned:
+            userbot.load_banned(banned)
+        if filters:
+            userbot.load_filters(filters)
+        userbot.banned_listener = lambda ids: self._notify('tenant_banned', user_id=user_id, ids=ids)
+        userbot.filters_listener = lambda filters: self._notify('tenant_filters', user_id=user_id, filters=filters)
+        # client.start() would wait on input() for a revoked session and block every tenant here
+        await userbot.client.connect()
+        if not await userbot.client.is_user_authorized():
+            await userbot.client.disconnect()
+            raise SessionUnauthorized(f"Session tenant {user_id} sudah tidak login")
+        await userbot.start(login=False)
+        self.tenants[user_id] = userbot
+        self.watchers[user_id] = asyncio.create_task(self._watch(user_id, userbot))
+        logger.info(f"Tenant {user_id} berjalan ({len(self.tenants)} tenant di worker ini)")
+        return {'started': True}
+
+    async def _watch(self, user_id, userbot):
+        """Tell the admin bot when a tenant's connection ends on its own"""
+        await userbot.client.disconnected
+        if self.tenants.get(user_id) is userbot:
+            del self.tenants[user_id]
+            self.watchers.pop(user_id, None)
+            self._notify('tenant_exit', user_id=user_id, reason="Koneksi Telegram terputus")
+
+    def _notify(self, method, **params):
+        for admin in list(self.admins):
+            admin.notify(method, **params)
+
+    async def stop_tenant(self, user_id):
+        userbot = self.tenants.pop(user_id, None)
+        watcher = self.watchers.pop(user_id, None)
+        if watcher:
+            watcher.cancel()
+        if userbot is None:
+            return {'stopped': False}
+        userbot.stop_tasks()
+        await userbot.client.disconnect()
+        return {'stopped': True}
+
+    async def tenant_call(self, user_id, control, params=None):
+        """Control channel call for one tenant, same methods as a tenant process.
+
+        The method name travels as `control`, `method` is taken by the RPC call itself.
+        """
+        userbot = self.tenants.get(user_id)
+        if userbot is None:
+            raise KeyError(f"Tenant {user_id} tidak ada di worker ini")
+        return await ControlChannel(userbot).dispatch(control, **(params or {}))
+
+    async def list_tenants(self):
+        return sorted(self.tenants)
+
+    async def stats(self):
+        return {
+            'tenants': len(self.tenants),
+            'tasks': sum(len(u.forward_tasks) for u in self.tenants.values()),
+            'counters': REGISTRY.snapshot_counters('userbot_'),
+        }
+
+def fake_client_factory(groups=50):
+    from benchmarks.fake_telegram import FakeClient, FakeServer
+
+    def factory(session, api_id, api_hash):
+        return FakeClient(FakeServer(groups=groups, latency=0.001, seed=hash(session) & 0xffff))
+    return factory
+
+async def run(address, fake_telegram=False, secret=None, ssl=None):
+    worker = ShardWorker(fake_client_factory() if fake_telegram else None)
+    server = await rpc.serve(address, worker.handlers, on_connect=worker.on_connect, secret=secret, ssl=ssl)
+    logger.info(f"Shard worker listening on {address}")
+    print("SHARD READY", flush=True)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Userbot shard worker")
+    parser.add_argument('address', help="unix:/path/to.sock or tcp:host:port")
+    parser.add_argument('--fake-telegram', action='store_true')
+    parser.add_argument('--secret-file', help="file holding the shared secret (SHARD_SECRET in config.py)")
+    parser.add_argument('--tls-cert')
+    parser.add_argument('--tls-key')
+    parser.add_argument('--tls-ca', help="CA the admin bot's client certificate must be signed by")
+    args = parser.parse_args()
+
+    secret = None
+    if args.secret_file:
+        with open(args.secret_file, 'r', encoding='utf-8') as f:
+            secret = f.read().strip()
+    ssl = rpc.tls_context(True, args.tls_cert, args.tls_key, args.tls_ca) if args.tls_cert else None
+
+    # stdout only carries the ready line for whoever started us
+    setup_logging(stream=sys.stderr)
+    try:
+        asyncio.run(run(args.address, args.fake_telegram, secret, ssl))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,210 @@
+# sharding.py
+"""Spread userbot tenants over shard workers by consistent hashing.
+
+Each worker (shard_worker.py) runs its share of tenants in one process and
+is reached over rpc.py. A tenant's worker is picked on a hash ring with
+`vnodes` points per worker, so adding or removing a worker only moves the
+tenants whose ring segment changed hands (about 1/N of them).
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+
+import rpc
+
+logger = logging.getLogger(__name__)
+
+VNODES = 160
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+class HashRing:
+    def __init__(self, nodes=(), vnodes=VNODES):
+        self.vnodes = vnodes
+        self.nodes = set()
+        self._points = []  # sorted (hash, node)
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            bisect.insort(self._points, (_hash(f"{node}#{i}"), node))
+
+    def remove(self, node):
+        self.nodes.discard(node)
+        self._points = [p for p in self._points if p[1] != node]
+
+    def node_for(self, key):
+        if not self._points:
+            raise LookupError("Hash ring is empty")
+        i = bisect.bisect(self._points, (_hash(str(key)), ''))
+        return self._points[i % len(self._points)][1]
+
+class RemoteUserbot:
+    """Userbot running on a shard worker, Popen-like for UserBotManager"""
+
+    pid = None
+
+    def __init__(self, router, user_id, node):
+        self.router = router
+        self.user_id = user_id
+        self.node = node
+        self.returncode = None
+        self.reason = ''
+
+    def poll(self):
+        return self.returncode
+
+    def communicate(self):
+        return "", self.reason
+
+    def exited(self, reason):
+        if self.returncode is None:
+            self.returncode = 1
+            self.reason = reason
+
+    async def stop(self):
+        try:
+            await self.router.stop_tenant(self.user_id)
+        finally:
+            if self.returncode is None:
+                self.returncode = 0
+
+class ShardRouter:
+    """Admin-side view of the workers: placement, start/stop and rebalancing"""
+
+    def __init__(self, workers, vnodes=VNODES, secret=None, ssl=None):
+        self.addresses = dict(workers)  # node name -> rpc address
+        self.secret = secret
+        self.ssl = ssl
+        self.ring = HashRing(self.addresses, vnodes)
+        self.connections = {}
+        self.tenants = {}  # user_id -> (node, info)
+        self.handles = {}  # user_id -> RemoteUserbot
+        self._locks = {}
+        # async (user_id, ids) callback, persists a tenant's ban list on the admin side
+        self.on_banned = None
+        # async (user_id, filters) callback, same for its target lists
+        self.on_filters = None
+
+    def owner_of(self, user_id):
+        return self.ring.node_for(user_id)
+
+    async def _connection(self, node):
+        lock = self._locks.setdefault(node, asyncio.Lock())
+        async with lock:
+            connection = self.connections.get(node)
+            if connection is None or connection.closed.done():
+                connection = await rpc.connect(
+                    self.addresses[node],
+                    handlers={
+                        'tenant_exit': self._tenant_exit,
+                        'tenant_banned': self._tenant_banned,
+                        'tenant_filters': self._tenant_filters,
+                    },
+                    name=f"shard {node}",
+                    secret=self.secret,
+                    ssl=self.ssl
+                )
+                self.connections[node] = connection
+                connection.closed.add_done_callback(lambda _, node=node: self._worker_lost(node))
+            return connection
+
+    async def call(self, node, method, **params):
+        connection = await self._connection(node)
+        return await connection.call(method, **params)
+
+    async def start_tenant(self, user_id, info):
+        """Start user_id on its worker, returns a RemoteUserbot handle"""
+        user_id = str(user_id)
+        node = self.owner_of(user_id)
+        await self.call(node, 'start_tenant', user_id=user_id, **info)
+        self.tenants[user_id] = (node, info)
+        handle = self.handles[user_id] = RemoteUserbot(self, user_id, node)
+        return handle
+
+    async def stop_tenant(self, user_id):
+        user_id = str(user_id)
+        entry = self.tenants.pop(user_id, None)
+        self.handles.pop(user_id, None)
+        if entry:
+            await self.call(entry[0], 'stop_tenant', user_id=user_id)
+
+    async def _move(self, user_id, source, target):
+        info = self.tenants[user_id][1]
+        if source in self.addresses:
+            try:
+                await self.call(source, 'stop_tenant', user_id=user_id)
+            except (rpc.RpcError, OSError) as e:
+                logger.warning(f"Tenant {user_id} tidak bisa dihentikan di {source}: {str(e)}")
+        await self.call(target, 'start_tenant', user_id=user_id, **info)
+        self.tenants[user_id] = (target, info)
+        handle = self.handles.get(user_id)
+        if handle:
+            handle.node = target
+
+    async def rebalance(self):
+        """Move every tenant whose owner changed, returns the moved user_ids"""
+        moves = [
+            (user_id, node, self.owner_of(user_id))
+            for user_id, (node, _) in self.tenants.items()
+            if self.owner_of(user_id) != node
+        ]
+        results = await asyncio.gather(
+            *(self._move(*move) for move in moves), return_exceptions=True
+        )
+        moved = []
+        for (user_id, _, target), result in zip(moves, results):
+            if isinstance(result, Exception):
+                logger.error(f"Gagal memindahkan tenant {user_id} ke {target}: {str(result)}")
+            else:
+                moved.append(user_id)
+        return moved
+
+    async def add_worker(self, node, address):
+        self.addresses[node] = address
+        self.ring.add(node)
+        return await self.rebalance()
+
+    async def remove_worker(self, node):
+        self.ring.remove(node)
+        moved = await self.rebalance()
+        self.addresses.pop(node, None)
+        connection = self.connections.pop(node, None)
+        if connection:
+            await connection.close()
+        return moved
+
+    async def _tenant_exit(self, user_id, reason=''):
+        handle = self.handles.get(user_id)
+        if handle:
+            handle.exited(reason)
+
+    async def _tenant_banned(self, user_id, ids):
+        entry = self.tenants.get(user_id)
+        if entry:
+            # A moved tenant starts on its new worker with the current list
+            entry[1]['banned'] = ids
+        if self.on_banned:
+            await self.on_banned(user_id, ids)
+
+    async def _tenant_filters(self, user_id, filters):
+        entry = self.tenants.get(user_id)
+        if entry:
+            entry[1]['filters'] = filters
+        if self.on_filters:
+            await self.on_filters(user_id, filters)
+
+    def _worker_lost(self, node):
+        for handle in self.handles.values():
+            if handle.node == node:
+                handle.exited(f"Koneksi ke worker {node} terputus")
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.connections.values()))
+        self.connections.clear()
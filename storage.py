@@ -0,0 +1,243 @@
+# storage.py
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import copy
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+class JsonStore:
+    """JSON database file with crash-safe writes.
+
+    Every save goes to a temp file in the same directory, is fsynced and then
+    renamed over the target, so readers only ever see a complete file. The
+    previous versions are kept as rolling snapshots (`<path>.1` is the newest).
+    When the main file is missing or does not parse on load, the newest valid
+    snapshot is restored automatically.
+    """
+
+    def __init__(self, path, default=None, snapshots=3):
+        self.path = path
+        self.default = default or {}
+        self.snapshots = snapshots
+
+    def snapshot_path(self, n):
+        return f"{self.path}.{n}"
+
+    def _read(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("top-level JSON value is not an object")
+        return data
+
+    def load(self):
+        """Load the database, falling back to the newest valid snapshot"""
+        try:
+            data = self._read(self.path)
+        except FileNotFoundError:
+            data = self._recover()
+        except ValueError as e:
+            # Only a file that does not parse is corrupt; any other OSError
+            # (permissions, EIO, too many open files) is raised so a transient
+            # failure never moves a good database aside
+            logger.error(f"{self.path} is corrupt: {str(e)}")
+            self._quarantine()
+            data = self._recover()
+
+        if data is None:
+            data = copy.deepcopy(self.default)
+        for key, value in self.default.items():
+            if key not in data:
+                data[key] = copy.deepcopy(value)
+        return data
+
+    def save(self, data):
+        """Atomically replace the database file, returns True on success"""
+        try:
+            payload = json.dumps(data, indent=4, ensure_ascii=False)
+            self.write(payload)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving {self.path}: {str(e)}")
+            return False
+
+    def write(self, payload, rotate=True):
+        """Write an already serialized payload through temp file, fsync and rename"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(self.path)}.",
+            suffix='.tmp',
+            dir=directory
+        )
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            if rotate:
+                self._rotate()
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._fsync_dir(directory)
+
+    def _rotate(self):
+        if self.snapshots < 1 or not os.path.exists(self.path):
+            return
+        for n in range(self.snapshots - 1, 0, -1):
+            if os.path.exists(self.snapshot_path(n)):
+                os.replace(self.snapshot_path(n), self.snapshot_path(n + 1))
+        # Hard link keeps the current file in place until the rename, so there
+        # is never a moment without a complete primary file
+        try:
+            os.link(self.path, self.snapshot_path(1))
+        except OSError:
+            shutil.copy2(self.path, self.snapshot_path(1))
+
+    def _recover(self):
+        for n in range(1, self.snapshots + 1):
+            path = self.snapshot_path(n)
+            try:
+                data = self._read(path)
+            except FileNotFoundError:
+                continue
+            except ValueError as e:
+                logger.error(f"Snapshot {path} is corrupt: {str(e)}")
+                continue
+
+            logger.warning(f"Restoring {self.path} from snapshot {path}")
+            try:
+                self.write(json.dumps(data, indent=4, ensure_ascii=False), rotate=False)
+            except Exception as e:
+                logger.error(f"Error restoring {self.path}: {str(e)}")
+            return data
+
+        if os.path.exists(f"{self.path}.corrupt"):
+            logger.error(f"No valid snapshot of {self.path} found, starting empty")
+        return None
+
+    def _quarantine(self):
+        # Keep the broken file around for a manual look instead of overwriting it
+        try:
+            os.replace(self.path, f"{self.path}.corrupt")
+        except OSError as e:
+            logger.error(f"Could not move corrupt {self.path} aside: {str(e)}")
+
+    @staticmethod
+    def _fsync_dir(directory):
+        if os.name == 'nt':
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+class AsyncJsonStore:
+    """Awaitable facade over a JsonStore.
+
+    The database is loaded once and then served from memory: every load()
+    returns the same live dict, so a change made by one handler is seen by
+    all others right away and is written by whichever save() comes next.
+    Callers must not keep references across an await and expect them to be
+    unchanged, and must not mutate data they do not intend to persist.
+
+    save() serializes the dict on the event loop thread, so the snapshot is
+    consistent, and only hands the bytes to one dedicated executor thread for
+    the write, fsync and rename. Saves requested while a write is in flight
+    are coalesced into a single follow-up write.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._name = os.path.basename(store.path)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"storage-{os.path.basename(store.path)}"
+        )
+        self._data = None
+        self._loading = None
+        self._writer = None
+        self._dirty = False
+        # Bumped on every save, lets callers cache views derived from the data
+        self.generation = 0
+
+    async def run(self, func, *args):
+        """Run a blocking callable on the storage thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def load(self):
+        if self._data is not None:
+            return self._data
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self.run(self._load))
+        try:
+            data = await asyncio.shield(self._loading)
+        except Exception:
+            self._loading = None
+            raise
+        if self._data is None:
+            self._data = data
+        return self._data
+
+    async def save(self, data=None):
+        """Persist data (or the cached database), returns True on success"""
+        if data is not None:
+            self._data = data
+        if self._data is None:
+            return True
+        self.generation += 1
+        self._dirty = True
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._flush())
+        return await asyncio.shield(self._writer)
+
+    async def _flush(self):
+        ok = True
+        while self._dirty:
+            self._dirty = False
+            payload = self._serialize(self._data)
+            if payload is None:
+                ok = False
+                continue
+            ok = await self.run(self._write, payload)
+        return ok
+
+    def _load(self):
+        with REGISTRY.timer('storage_seconds', op='load', file=self._name):
+            return self.store.load()
+
+    def _serialize(self, data):
+        # Runs on the loop thread, no handler can touch the dict meanwhile
+        try:
+            with REGISTRY.timer('storage_seconds', op='serialize', file=self._name):
+                return json.dumps(data, indent=4, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"Error serializing {self.store.path}: {str(e)}")
+            return None
+
+    def _write(self, payload):
+        try:
+            with REGISTRY.timer('storage_seconds', op='write', file=self._name):
+                self.store.write(payload)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving {self.store.path}: {str(e)}")
+            return False
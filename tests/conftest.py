@@ -0,0 +1,82 @@
+import asyncio
+import importlib
+
+import pytest
+
+from storage import AsyncJsonStore, JsonStore
+
+
+class FakeBot:
+    """Stands in for the admin TelegramClient, keeps the registered handlers"""
+
+    def __init__(self, *args, **kwargs):
+        self.handlers = []  # (event builder, handler)
+        self.sent = []
+
+    def on(self, event_builder):
+        def decorator(func):
+            self.handlers.append((event_builder, func))
+            return func
+        return decorator
+
+    async def start(self, *args, **kwargs):
+        return self
+
+    async def run_until_disconnected(self):
+        return None
+
+    async def send_message(self, entity, message, **kwargs):
+        self.sent.append((entity, message))
+
+    def handler(self, data):
+        """Callback handler whose pattern matches data, with the match"""
+        for builder, func in self.handlers:
+            match = getattr(builder, 'match', None)
+            if type(builder).__name__ == 'CallbackQuery' and match and match(data):
+                return func, match(data)
+        raise KeyError(data)
+
+
+class FakeCallback:
+    """Minimal CallbackQuery.Event, it has no message attribute"""
+
+    def __init__(self, data, sender_id, chat_id=1):
+        self.data = data
+        self.sender_id = sender_id
+        self.chat_id = chat_id
+        self.pattern_match = None
+        self.edits = []
+        self.answers = []
+
+    async def edit(self, text, **kwargs):
+        self.edits.append((text, kwargs.get('buttons')))
+
+    async def answer(self, *args, **kwargs):
+        self.answers.append(args)
+
+
+@pytest.fixture
+def admin_bot(tmp_path, monkeypatch):
+    # admin_bot opens bot.log and data.json relative to cwd on import
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module('admin_bot')
+    store = AsyncJsonStore(JsonStore(str(tmp_path / 'data.json'), default={
+        'userbots': {}, 'premium_users': {}, 'users': {}
+    }))
+    monkeypatch.setattr(module, 'data_store', store)
+    return module
+
+
+@pytest.fixture
+def admin(admin_bot, monkeypatch):
+    """AdminBot with every handler registered on a FakeBot, nothing started"""
+    async def idle(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(admin_bot, 'TelegramClient', FakeBot)
+    monkeypatch.setattr(admin_bot, 'serve_prometheus', idle)
+    monkeypatch.setattr(admin_bot.AdminBot, 'check_premium_expiry', idle)
+    monkeypatch.setattr(admin_bot.LoopLagMonitor, 'start', lambda self: None)
+    bot = admin_bot.AdminBot()
+    asyncio.run(bot.start())
+    return bot
@@ -0,0 +1,63 @@
+from userbot import ADMISSION_HEADROOM, INITIAL_SEND_RATE, RATE_WINDOW, AdmissionController, CycleStats
+
+
+def cycle(flood_wait=0.0):
+    stats = CycleStats()
+    stats.flood_wait = flood_wait
+    return stats
+
+
+def controller(now=0.0):
+    admission = AdmissionController()
+    admission.since = now
+    return admission
+
+
+def test_normal_first_task_is_admitted():
+    accepted, utilization, _ = controller().admit([], 110, 5, 2)
+    assert accepted
+    assert utilization == 110 / 5 / INITIAL_SEND_RATE
+
+
+def test_demand_over_headroom_is_rejected():
+    admission = controller()
+    groups = int(INITIAL_SEND_RATE * ADMISSION_HEADROOM * 5) + 5
+    accepted, utilization, _ = admission.admit([], groups, 5, 2)
+    assert not accepted and utilization > ADMISSION_HEADROOM
+    # The same groups fit with a longer delay
+    assert admission.admit([], groups, 10, 2)[0]
+
+
+def test_existing_tasks_count_towards_the_load():
+    admission = controller()
+    loads = [(100, 5), (100, 5)]
+    assert admission.admit([], 100, 5, 2)[0]
+    assert not admission.admit(loads, 100, 5, 2)[0]
+
+
+def test_rate_is_measured_across_tasks():
+    admission = controller()
+    # Three tasks sending 40/min each for five minutes: 120/min account wide
+    for second in range(300):
+        for _ in range(2):
+            admission.sent(float(second))
+    assert admission.measured(300.0) == 120.0
+    admission.observe(cycle(), 300.0)
+    assert INITIAL_SEND_RATE < admission.rate < 120.0
+
+
+def test_flood_wait_caps_rate_at_measured():
+    admission = controller()
+    for second in range(0, 600, 2):
+        admission.sent(float(second))
+    admission.observe(cycle(flood_wait=30), 600.0)
+    assert admission.rate == 30.0
+
+
+def test_old_sends_leave_the_window():
+    admission = controller()
+    for second in range(60):
+        admission.sent(float(second))
+    later = 60.0 + RATE_WINDOW
+    assert admission.measured(later) == 0.0
+    assert not admission.sends
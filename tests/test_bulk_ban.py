@@ -0,0 +1,45 @@
+import asyncio
+
+from benchmarks.fake_telegram import FakeClient, FakeEvent, FakeServer
+from userbot import ID_FILE_LIMIT, Userbot, parse_group_ids
+
+
+def test_parse_group_ids_accepts_any_separator():
+    assert parse_group_ids("-1001, -1002\n-1003 x 42") == {-1001, -1002, -1003, 42}
+    assert parse_group_ids("none here") == set()
+
+
+def run_ban(text, **event_kwargs):
+    async def scenario():
+        client = FakeClient(FakeServer(groups=10, users=0, latency=0))
+        userbot = Userbot(None, 0, '', client=client)
+        await userbot.start()
+        event = FakeEvent(client, text, **event_kwargs)
+        await client.handlers['ban_handler'](event)
+        return userbot, event.replies[-1].text
+
+    return asyncio.run(scenario())
+
+
+def test_bulk_ban_by_ids():
+    userbot, reply = run_ban('.ban -1001 -1002')
+    assert userbot.banned_groups == {-1001, -1002}
+    assert 'Bulk Ban' in reply
+
+
+def test_bulk_ban_from_text_file():
+    userbot, _ = run_ban('.ban', document=b"-1001\n-1002\n")
+    assert userbot.banned_groups == {-1001, -1002}
+    # The extension is enough when the client sends a generic mime type
+    userbot, _ = run_ban('.ban', document=b"-1003", mime_type='application/octet-stream')
+    assert userbot.banned_groups == {-1003}
+
+
+def test_other_documents_get_usage_instead_of_being_parsed():
+    userbot, reply = run_ban('.ban', document=b"\x89PNG -1001", file_name='photo.png', mime_type='image/png')
+    assert userbot.banned_groups == set()
+    assert '.txt' in reply
+
+    userbot, reply = run_ban('.ban', document=b"1\n" * (ID_FILE_LIMIT // 2 + 1))
+    assert userbot.banned_groups == set()
+    assert 'terlalu besar' in reply
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+
+class ProgressMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, text, **kwargs):
+        self.edits.append(text)
+
+
+def userbots(count, days=10):
+    return {
+        str(100 + n): {
+            'first_name': f"Bot{n}", 'phone': "+62", 'owner_id': 1, 'session': 's',
+            'api_id': 1, 'api_hash': 'h', 'active': True,
+            'created_at': datetime.now().isoformat(),
+            'expires_at': (datetime.now() + timedelta(days=days)).isoformat(),
+        }
+        for n in range(count)
+    }
+
+
+@pytest.fixture
+def bulk(admin_bot, monkeypatch, tmp_path):
+    from conftest import FakeBot
+
+    monkeypatch.setattr(admin_bot, 'TelegramClient', FakeBot)
+    monkeypatch.setattr(admin_bot, 'BULK_CONCURRENCY', 3)
+    monkeypatch.setattr(admin_bot, 'BULK_PROGRESS_INTERVAL', 0.01)
+
+    def run(op, arg, user_ids, count=10, manager=None):
+        async def scenario():
+            bot = admin_bot.AdminBot()
+            for name, func in (manager or {}).items():
+                setattr(bot.userbot_manager, name, func)
+            await admin_bot.save_data({'userbots': userbots(count), 'premium_users': {}, 'users': {}})
+            message = ProgressMessage()
+            await bot.run_bulk(message, op, arg, user_ids)
+            return message.edits, await admin_bot.load_data()
+
+        edits, data = asyncio.run(scenario())
+        with open(tmp_path / 'data.json') as f:
+            return edits, data, json.load(f)
+
+    return run
+
+
+def test_workers_are_bounded_by_bulk_concurrency(bulk):
+    running = {'now': 0, 'max': 0}
+
+    async def ensure_userbot_running(user_id, info):
+        running['now'] += 1
+        running['max'] = max(running['max'], running['now'])
+        await asyncio.sleep(0.01)
+        running['now'] -= 1
+        return True, None
+
+    ids = [str(100 + n) for n in range(10)]
+    edits, data, saved = bulk('restart', None, ids, manager={'ensure_userbot_running': ensure_userbot_running})
+    assert running['max'] == 3
+    # Progress goes into the same message while the workers run
+    assert any(text.lstrip().startswith("⏳ **Bulk Restart**") for text in edits[:-1])
+    assert "Berhasil: `10` • Gagal: `0`" in edits[-1]
+
+
+def test_one_failure_does_not_stop_the_batch(bulk):
+    async def remove_userbots(user_ids, timeout=10):
+        if user_ids == ['103']:
+            raise RuntimeError("stop gagal")
+
+    ids = [str(100 + n) for n in range(5)] + ['999']
+    edits, data, saved = bulk('disable', None, ids, manager={'remove_userbots': remove_userbots})
+    active = {user_id: info['active'] for user_id, info in saved['userbots'].items()}
+    assert active == {'100': False, '101': False, '102': False, '103': True, '104': False,
+                      '105': True, '106': True, '107': True, '108': True, '109': True}
+    final = edits[-1]
+    assert final.lstrip().startswith("✅ **Bulk Nonaktifkan**")
+    assert "Selesai: `6/6`" in final and "Berhasil: `4` • Gagal: `2`" in final
+    assert "• `103`: stop gagal" in final
+    assert "• `999`: " in final
+
+
+def test_extend_is_saved_with_the_final_summary(bulk):
+    ids = [str(100 + n) for n in range(4)]
+    before = datetime.now() + timedelta(days=10)
+    edits, data, saved = bulk('extend', 30, ids, count=6)
+    assert edits[-1].lstrip().startswith("✅ **Bulk Perpanjang 30 hari**")
+    assert "Berhasil: `4`" in edits[-1]
+    for user_id, info in saved['userbots'].items():
+        expiry = datetime.fromisoformat(info['expires_at'])
+        assert (expiry - before).days >= 29 if user_id in ids else (expiry - before).days < 1
+
+
+def test_error_list_is_capped(bulk):
+    ids = [str(n) for n in range(15)]  # none of them exist
+    edits, data, saved = bulk('disable', None, ids, count=0)
+    final = edits[-1]
+    assert "Gagal: `15`" in final
+    assert final.count("userbot sudah dihapus") == 10
+    assert "dan `5` lainnya" in final
@@ -0,0 +1,84 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from benchmarks.fake_telegram import FakeClient, FakeServer
+from userbot import ControlChannel, Userbot
+
+
+class RecordingClient(FakeClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = []
+
+    async def send_message(self, entity, message, **kwargs):
+        self.sent.append((entity, message))
+        return await super().send_message(entity, message, **kwargs)
+
+
+def test_notify_control_method_posts_to_saved_messages():
+    async def scenario():
+        client = RecordingClient(FakeServer(groups=0, users=0, latency=0))
+        userbot = Userbot(None, 0, '', client=client)
+        reply = await ControlChannel(userbot).dispatch('notify', text="expired")
+        return reply, client.sent
+
+    reply, sent = asyncio.run(scenario())
+    assert reply == {'sent': True}
+    assert sent == [('me', "expired")]
+
+
+def userbot(owner, days):
+    return {
+        'first_name': "Bot", 'phone': "+62", 'owner_id': owner, 'session': f"s{owner}",
+        'api_id': 1, 'api_hash': 'h', 'active': True,
+        'created_at': datetime.now().isoformat(),
+        'expires_at': (datetime.now() + timedelta(days=days)).isoformat(),
+    }
+
+
+def test_expired_tenants_are_notified_over_their_own_connection(admin_bot, monkeypatch):
+    from conftest import FakeBot
+
+    events = []
+
+    class Control:
+        async def call(self, method, timeout=5, **params):
+            events.append(('tenant', method, params['text']))
+            return {'sent': True}
+
+    class Process:
+        control = Control()
+
+    @asynccontextmanager
+    async def borrow(session_string, api_id, api_hash, **kwargs):
+        client = RecordingClient(FakeServer(groups=0, users=0, latency=0))
+        yield client
+        events.append(('pool', session_string, client.sent[0][0]))
+
+    async def remove_userbots(user_ids, timeout=10):
+        events.append(('stop', sorted(user_ids)))
+
+    monkeypatch.setattr(admin_bot, 'TelegramClient', FakeBot)
+    monkeypatch.setattr(admin_bot.session_pool, 'borrow', borrow)
+
+    async def scenario():
+        bot = admin_bot.AdminBot()
+        bot.userbot_manager.running_bots['1'] = Process()
+        bot.userbot_manager.remove_userbots = remove_userbots
+        await admin_bot.save_data({
+            'userbots': {'1': userbot(10, -1), '2': userbot(20, -1), '3': userbot(30, 5)},
+            'premium_users': {}, 'users': {},
+        })
+        task = asyncio.create_task(bot.check_premium_expiry())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        return bot.bot.sent, await admin_bot.load_data()
+
+    owners, data = asyncio.run(scenario())
+    assert ('tenant', 'notify', admin_bot.EXPIRY_MESSAGE) in events
+    assert ('pool', 's20', 'me') in events
+    # Notices go out before the tenants are stopped
+    assert events[-1] == ('stop', ['1', '2'])
+    assert sorted(chat_id for chat_id, _ in owners) == [10, 20]
+    assert list(data['userbots']) == ['3']
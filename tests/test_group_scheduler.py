@@ -0,0 +1,85 @@
+from userbot import BACKOFF_BASE, BACKOFF_MAX, QUARANTINE_AFTER, GroupScheduler
+
+
+def test_untracked_groups_are_always_eligible():
+    scheduler = GroupScheduler()
+    assert scheduler.eligible(-100, 0.0)
+    scheduler.sent(-100, 0.0)
+    # A plain success does not start tracking a group
+    assert len(scheduler) == 0
+
+
+def test_slow_mode_defers_the_next_send():
+    scheduler = GroupScheduler()
+    scheduler.slowed(-100, 30, 10.0)
+    assert not scheduler.eligible(-100, 39.0)
+    assert scheduler.eligible(-100, 40.0)
+    scheduler.sent(-100, 40.0)
+    assert not scheduler.eligible(-100, 69.0)
+    assert scheduler.eligible(-100, 70.0)
+
+
+def test_failures_back_off_exponentially_up_to_the_cap():
+    scheduler = GroupScheduler()
+    scheduler.failed(-100, 0.0)
+    assert not scheduler.eligible(-100, BACKOFF_BASE - 1)
+    assert scheduler.eligible(-100, BACKOFF_BASE)
+    scheduler.failed(-100, 0.0)
+    assert not scheduler.eligible(-100, 2 * BACKOFF_BASE - 1)
+    for _ in range(40):
+        scheduler.failed(-100, 0.0)
+    assert scheduler.eligible(-100, BACKOFF_MAX)
+    # Success resets the streak
+    scheduler.sent(-100, 0.0)
+    scheduler.failed(-100, 0.0)
+    assert scheduler.eligible(-100, BACKOFF_BASE)
+
+
+def test_permanent_failures_ask_for_quarantine():
+    scheduler = GroupScheduler()
+    results = [scheduler.failed(-100, 0.0, permanent=True) for _ in range(QUARANTINE_AFTER)]
+    assert results == [False] * (QUARANTINE_AFTER - 1) + [True]
+    assert not GroupScheduler().failed(-100, 0.0)
+
+
+def test_forget_keeps_arrays_dense():
+    scheduler = GroupScheduler()
+    for chat_id in (-1, -2, -3):
+        scheduler.slowed(chat_id, chat_id * -10, 0.0)
+    scheduler.forget(-1)
+    assert len(scheduler) == 2
+    assert scheduler.index == {-3: 0, -2: 1}
+    assert not scheduler.eligible(-3, 29.0) and scheduler.eligible(-3, 30.0)
+    assert scheduler.eligible(-1, 0.0)
+    scheduler.forget(-1)
+    assert len(scheduler) == 2
+
+
+def test_slow_mode_wait_is_a_one_off_deadline():
+    scheduler = GroupScheduler()
+    # SlowModeWaitError said 5s left of a 30s slow mode
+    scheduler.slowed(-100, 30, 10.0, wait=5)
+    assert scheduler.interval(-100) == 30
+    assert not scheduler.eligible(-100, 14.0)
+    assert scheduler.eligible(-100, 15.0)
+    scheduler.sent(-100, 15.0)
+    assert not scheduler.eligible(-100, 44.0)
+    assert scheduler.eligible(-100, 45.0)
+    assert scheduler.interval(-200) == 0
+
+
+def test_slow_mode_interval_is_read_from_the_chat():
+    import asyncio
+
+    from benchmarks.fake_telegram import FakeClient, FakeServer
+    from userbot import TargetGroup, Userbot
+
+    async def scenario():
+        server = FakeServer(groups=20, users=0, latency=0, slowmode_rate=0.5, slowmode_seconds=45, seed=1)
+        userbot = Userbot(None, 0, '', client=FakeClient(server))
+        slowed = next(d for d in server.dialogs if d.id in server.slowmode and d.entity.megagroup)
+        plain = next(d for d in server.dialogs if d.id not in server.slowmode and d.entity.megagroup)
+        return (await userbot.slowmode_interval(TargetGroup(slowed)),
+                await userbot.slowmode_interval(TargetGroup(plain)))
+
+    assert asyncio.run(scenario()) == (45, 0)
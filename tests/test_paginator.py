@@ -0,0 +1,58 @@
+import asyncio
+
+from benchmarks.fake_telegram import FakeClient, FakeEvent, FakeServer
+from userbot import Paginator
+
+
+async def render(items, start):
+    return "\n".join(f"{start + i + 1}. {item}" for i, item in enumerate(items))
+
+
+def test_pages_are_rendered_on_demand_and_edited_in_place():
+    async def scenario():
+        client = FakeClient(FakeServer(groups=0, users=0, latency=0))
+        paginator = Paginator()
+        event = FakeEvent(client, '.listgrup')
+        await paginator.open(event, "📋 Grup", [f"g{i}" for i in range(45)], render, 20)
+        message = event.replies[0]
+        first = message.text
+        await paginator.turn(event, +1)
+        second = message.text
+        await paginator.turn(event, page=99)
+        last = message.text
+        await paginator.turn(event, +1)  # already on the last page, nothing to edit
+        return first, second, last, len(event.replies), len(message.edits)
+
+    first, second, last, replies, edits = asyncio.run(scenario())
+    assert "Halaman `1/3`" in first and "1. g0" in first and "21." not in first
+    assert "Halaman `2/3`" in second and "21. g20" in second
+    assert "Halaman `3/3`" in last and "45. g44" in last
+    assert Paginator.NAVIGATION in first
+    assert (replies, edits) == (1, 2)
+
+
+def test_single_page_has_no_navigation_and_long_bodies_are_cut():
+    async def scenario():
+        client = FakeClient(FakeServer(groups=0, users=0, latency=0))
+        paginator = Paginator()
+        event = FakeEvent(client, '.detail')
+
+        async def huge(items, start):
+            return "x" * 10000
+
+        await paginator.open(event, "Detail", ["a"], huge, 3)
+        return event.replies[0].text
+
+    text = asyncio.run(scenario())
+    assert Paginator.NAVIGATION not in text
+    assert len(text) <= Paginator.MAX_LENGTH and text.endswith("…")
+
+
+def test_turning_without_a_view_explains():
+    async def scenario():
+        client = FakeClient(FakeServer(groups=0, users=0, latency=0))
+        event = FakeEvent(client, '.next')
+        await Paginator().turn(event, +1)
+        return event.replies[0].text
+
+    assert "Tidak ada daftar" in asyncio.run(scenario())
@@ -0,0 +1,137 @@
+import asyncio
+import shutil
+import subprocess
+
+import pytest
+
+import rpc
+
+
+class Buffer:
+    """Minimal StreamWriter stand-in that keeps what was written"""
+
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+
+def feed(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def test_frames_round_trip_and_eof():
+    async def scenario():
+        writer = Buffer()
+        rpc.write_frame(writer, {'id': 1, 'method': 'ping', 'params': {}})
+        rpc.write_frame(writer, {'method': 'log', 'params': {'line': 'é'}})
+        reader = feed(writer.data)
+        return [await rpc.read_frame(reader) for _ in range(3)]
+
+    first, second, end = asyncio.run(scenario())
+    assert first == {'id': 1, 'method': 'ping', 'params': {}}
+    assert second == {'method': 'log', 'params': {'line': 'é'}}
+    assert end is None
+
+
+def test_oversized_frame_is_rejected():
+    async def scenario():
+        await rpc.read_frame(feed(rpc.HEADER.pack(rpc.MAX_FRAME + 1)))
+
+    with pytest.raises(rpc.RpcError):
+        asyncio.run(scenario())
+
+
+def test_parse_address():
+    assert rpc.parse_address('unix:/tmp/a.sock') == ('unix', '/tmp/a.sock')
+    assert rpc.parse_address('tcp::9601') == ('tcp', ('127.0.0.1', 9601))
+    assert rpc.parse_address('tcp:10.0.0.2:9601') == ('tcp', ('10.0.0.2', 9601))
+    with pytest.raises(ValueError):
+        rpc.parse_address('http://example')
+
+
+async def echo(**params):
+    return params
+
+
+def test_call_and_notify_over_unix_socket(tmp_path):
+    async def scenario():
+        address = f"unix:{tmp_path}/rpc.sock"
+        notified = asyncio.get_running_loop().create_future()
+        peers = []
+        server = await rpc.serve(address, {'echo': echo}, on_connect=peers.append)
+
+        async def event(**params):
+            notified.set_result(params)
+
+        client = await rpc.connect(address, handlers={'event': event})
+        result = await client.call('echo', value=[1, 2])
+        with pytest.raises(rpc.RpcError):
+            await client.call('missing')
+        peers[0].notify('event', n=3)
+        event = await asyncio.wait_for(notified, 5)
+        await client.close()
+        server.close()
+        return result, event
+
+    assert asyncio.run(scenario()) == ({'value': [1, 2]}, {'n': 3})
+
+
+def test_shared_secret_handshake(tmp_path):
+    async def scenario():
+        address = f"unix:{tmp_path}/rpc.sock"
+        server = await rpc.serve(address, {'echo': echo}, secret='s3cret')
+        good = await rpc.connect(address, secret='s3cret')
+        result = await good.call('echo', ok=True)
+        await good.close()
+        with pytest.raises(rpc.RpcError):
+            await rpc.connect(address, secret='wrong')
+        # No secret at all: the server only sends the challenge, then drops us
+        plain = await rpc.connect(address)
+        with pytest.raises(rpc.RpcError):
+            await plain.call('echo', timeout=5)
+        await plain.close()
+        server.close()
+        return result
+
+    assert asyncio.run(scenario()) == {'ok': True}
+
+
+def test_remote_tcp_needs_secret_and_tls():
+    async def scenario(**kwargs):
+        await rpc.serve('tcp:0.0.0.0:0', {}, **kwargs)
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+    with pytest.raises(ValueError):
+        asyncio.run(scenario(secret='s3cret'))
+    with pytest.raises(ValueError):
+        asyncio.run(rpc.connect('tcp:10.0.0.2:9601'))
+
+
+@pytest.mark.skipif(shutil.which('openssl') is None, reason="needs openssl to make a certificate")
+def test_tls_with_secret_over_tcp(tmp_path):
+    cert, key = tmp_path / 'cert.pem', tmp_path / 'key.pem'
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+         '-keyout', str(key), '-out', str(cert)],
+        check=True, capture_output=True
+    )
+
+    async def scenario():
+        server_ctx = rpc.tls_context(True, str(cert), str(key))
+        client_ctx = rpc.tls_context(False, ca=str(cert))
+        server = await rpc.serve('tcp:127.0.0.1:0', {'echo': echo}, secret='s3cret', ssl=server_ctx)
+        port = server.sockets[0].getsockname()[1]
+        client = await rpc.connect(f"tcp:127.0.0.1:{port}", secret='s3cret', ssl=client_ctx)
+        result = await client.call('echo', tls=True)
+        await client.close()
+        server.close()
+        return result
+
+    assert asyncio.run(scenario()) == {'tls': True}
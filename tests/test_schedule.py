@@ -0,0 +1,76 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from timer_queue import TimerQueue
+from userbot import TimeWindow
+
+# 2026-10-19 is a Monday
+MONDAY = datetime(2026, 10, 19)
+
+
+def at(day, hour, minute=0):
+    return MONDAY.replace(day=MONDAY.day + day, hour=hour, minute=minute)
+
+
+def test_daily_window():
+    window = TimeWindow.parse('08:00-22:00')
+    assert window.contains(at(0, 8))
+    assert window.contains(at(0, 21, 59))
+    assert not window.contains(at(0, 22))
+    assert window.next_open(at(0, 23)) == at(1, 8)
+    assert window.next_open(at(0, 12)) == at(0, 12)
+
+
+def test_window_past_midnight_belongs_to_the_start_day():
+    window = TimeWindow.parse('fri 22:00-02:00')
+    assert window.contains(at(4, 23))
+    assert window.contains(at(5, 1, 59))
+    assert not window.contains(at(5, 22, 30))
+    assert not window.contains(at(0, 1))
+    assert window.next_open(at(0, 12)) == at(4, 22)
+
+
+def test_day_ranges_wrap_around_the_week():
+    window = TimeWindow.parse('sat-mon 09:00-17:00')
+    assert window.days == {5, 6, 0}
+    assert window.contains(at(0, 10))
+    assert not window.contains(at(1, 10))
+
+
+@pytest.mark.parametrize('spec', ['', '25:00-26:00', '08:00-08:00', 'funday 08:00-09:00', 'a b c'])
+def test_invalid_windows(spec):
+    with pytest.raises(ValueError):
+        TimeWindow.parse(spec)
+
+
+def test_timer_queue_fires_in_deadline_order_and_skips_cancelled():
+    async def scenario():
+        queue = TimerQueue()
+        fired = []
+        now = time.monotonic()
+        queue.call_at(now + 0.06, lambda: fired.append('late'))
+        cancelled = queue.call_at(now + 0.02, lambda: fired.append('cancelled'))
+        queue.call_at(now + 0.04, lambda: fired.append('middle'))
+        cancelled.cancel()
+        assert len(queue) == 2
+        # An earlier deadline armed later wakes the runner
+        queue.call_at(now + 0.01, lambda: fired.append('early'))
+        await asyncio.sleep(0.15)
+        return fired, len(queue)
+
+    assert asyncio.run(scenario()) == (['early', 'middle', 'late'], 0)
+
+
+def test_timer_queue_survives_failing_callbacks():
+    async def scenario():
+        queue = TimerQueue()
+        fired = []
+        queue.call_later(0, lambda: 1 / 0)
+        queue.call_later(0.01, lambda: fired.append(True))
+        await asyncio.sleep(0.05)
+        return fired
+
+    assert asyncio.run(scenario()) == [True]
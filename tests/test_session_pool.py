@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+import session_pool
+from session_pool import SessionPool, SessionUnauthorized
+
+
+class FakeTelegramClient:
+    instances = []
+
+    def __init__(self, session, api_id, api_hash, **kwargs):
+        self.authorized = True
+        self.connected = False
+        self.connects = 0
+        FakeTelegramClient.instances.append(self)
+
+    async def connect(self):
+        await asyncio.sleep(0.01)
+        self.connects += 1
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def is_user_authorized(self):
+        return self.authorized
+
+
+@pytest.fixture(autouse=True)
+def fake_client(monkeypatch):
+    FakeTelegramClient.instances = []
+    monkeypatch.setattr(session_pool, 'TelegramClient', FakeTelegramClient)
+    monkeypatch.setattr(session_pool, 'StringSession', lambda s: s)
+
+
+def test_concurrent_borrows_share_one_connect_and_release_disconnects():
+    async def scenario():
+        pool = SessionPool()
+        seen = []
+
+        async def use():
+            async with pool.borrow('session', 1, 'hash') as client:
+                seen.append(client)
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(*(use() for _ in range(5)))
+        return pool, seen
+
+    pool, seen = asyncio.run(scenario())
+    assert len(FakeTelegramClient.instances) == 1
+    assert all(c is seen[0] for c in seen)
+    # No second connection on the tenant's auth key is left open
+    assert not seen[0].connected
+    assert pool.entries == {}
+
+
+def test_sequential_borrows_connect_again_and_leave_nothing_behind():
+    async def scenario():
+        pool = SessionPool()
+        clients = []
+        for _ in range(3):
+            async with pool.borrow('session', 1, 'hash') as client:
+                clients.append(client)
+        return pool, clients
+
+    pool, clients = asyncio.run(scenario())
+    # Nothing is kept warm, each borrow is its own connection
+    assert len(FakeTelegramClient.instances) == 3
+    assert not any(c.connected for c in clients)
+    assert pool.entries == {} and pool._connecting == {}
+
+
+def test_adopted_client_is_reused_then_dropped():
+    async def scenario():
+        pool = SessionPool()
+        adopted = FakeTelegramClient('session', 1, 'hash')
+        await adopted.connect()
+        pool.adopt('session', adopted)
+        async with pool.borrow('session', 1, 'hash') as client:
+            pass
+        return pool, adopted, client
+
+    pool, adopted, client = asyncio.run(scenario())
+    assert client is adopted
+    assert len(FakeTelegramClient.instances) == 1
+    assert not adopted.connected
+    assert pool.entries == {}
+
+
+def test_unauthorized_session_is_not_pooled(monkeypatch):
+    class Unauthorized(FakeTelegramClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.authorized = False
+
+    async def scenario():
+        pool = SessionPool()
+        with pytest.raises(SessionUnauthorized):
+            async with pool.borrow('session', 1, 'hash'):
+                pass
+        return pool
+
+    monkeypatch.setattr(session_pool, 'TelegramClient', Unauthorized)
+    pool = asyncio.run(scenario())
+    assert pool.entries == {} and pool._connecting == {}
+    assert not FakeTelegramClient.instances[0].connected
+
+
+def test_concurrent_borrowers_share_a_failed_connect(monkeypatch):
+    class Unauthorized(FakeTelegramClient):
+        async def is_user_authorized(self):
+            return False
+
+    async def scenario():
+        pool = SessionPool()
+
+        async def use():
+            async with pool.borrow('session', 1, 'hash'):
+                pass
+
+        results = await asyncio.gather(*(use() for _ in range(4)), return_exceptions=True)
+        return pool, results
+
+    monkeypatch.setattr(session_pool, 'TelegramClient', Unauthorized)
+    pool, results = asyncio.run(scenario())
+    assert all(isinstance(r, SessionUnauthorized) for r in results)
+    assert len(FakeTelegramClient.instances) == 1
+    assert pool._connecting == {}
+
+
+def test_cancelled_borrower_does_not_leave_a_connection_open():
+    async def scenario():
+        pool = SessionPool()
+
+        async def use():
+            async with pool.borrow('session', 1, 'hash'):
+                pass
+
+        task = asyncio.create_task(use())
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.entries == {} and pool._connecting == {}
+    assert not FakeTelegramClient.instances[0].connected
@@ -0,0 +1,109 @@
+import pytest
+
+from sharding import HashRing
+
+KEYS = [str(100000 + i) for i in range(5000)]
+
+
+def placement(ring):
+    return {key: ring.node_for(key) for key in KEYS}
+
+
+def test_placement_is_deterministic_and_balanced():
+    ring = HashRing(['w0', 'w1', 'w2', 'w3'])
+    assert placement(ring) == placement(HashRing(['w3', 'w2', 'w1', 'w0']))
+    counts = {}
+    for node in placement(ring).values():
+        counts[node] = counts.get(node, 0) + 1
+    assert all(abs(n - len(KEYS) / 4) < len(KEYS) / 4 * 0.25 for n in counts.values())
+
+
+def test_adding_a_node_moves_only_its_share_to_it():
+    ring = HashRing(['w0', 'w1', 'w2'])
+    before = placement(ring)
+    ring.add('w3')
+    after = placement(ring)
+
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert all(after[key] == 'w3' for key in moved)
+    assert abs(len(moved) / len(KEYS) - 1 / 4) < 0.05
+
+
+def test_removing_a_node_moves_only_its_keys():
+    ring = HashRing(['w0', 'w1', 'w2', 'w3'])
+    before = placement(ring)
+    ring.remove('w1')
+    after = placement(ring)
+
+    moved = {key for key in KEYS if before[key] != after[key]}
+    assert moved == {key for key in KEYS if before[key] == 'w1'}
+    assert 'w1' not in after.values()
+
+
+def test_empty_ring_has_no_owner():
+    with pytest.raises(LookupError):
+        HashRing().node_for('1')
+
+
+def test_router_reaches_tenant_control_methods(tmp_path):
+    import asyncio
+
+    import rpc
+    from benchmarks.fake_telegram import FakeClient, FakeServer
+    from shard_worker import ShardWorker
+    from sharding import ShardRouter
+
+    async def scenario():
+        worker = ShardWorker(lambda session, api_id, api_hash: FakeClient(FakeServer(groups=5, latency=0)))
+        address = f"unix:{tmp_path}/w0.sock"
+        server = await rpc.serve(address, worker.handlers, on_connect=worker.on_connect)
+        router = ShardRouter({'w0': address})
+        try:
+            await router.start_tenant('7', {'session': 's', 'api_id': 1, 'api_hash': 'h', 'banned': [-5]})
+            return await router.call('w0', 'tenant_call', user_id='7', control='set_banned', params={'ids': [-5, -6]})
+        finally:
+            await router.close()
+            server.close()
+
+    assert asyncio.run(scenario()) == {'banned': 2}
+
+
+def test_unauthorized_tenant_fails_without_prompting(tmp_path):
+    import asyncio
+
+    import pytest
+
+    import rpc
+    from benchmarks.fake_telegram import FakeClient, FakeServer
+    from shard_worker import ShardWorker
+    from sharding import ShardRouter
+
+    class RevokedClient(FakeClient):
+        async def is_user_authorized(self):
+            return False
+
+        async def start(self, *args, **kwargs):
+            raise AssertionError("client.start() would prompt for a phone number")
+
+    clients = []
+
+    def factory(session, api_id, api_hash):
+        clients.append(RevokedClient(FakeServer(groups=5, latency=0)))
+        return clients[-1]
+
+    async def scenario():
+        worker = ShardWorker(factory)
+        address = f"unix:{tmp_path}/w0.sock"
+        server = await rpc.serve(address, worker.handlers, on_connect=worker.on_connect)
+        router = ShardRouter({'w0': address})
+        try:
+            with pytest.raises(rpc.RpcError, match='SessionUnauthorized'):
+                await router.start_tenant('7', {'session': 's', 'api_id': 1, 'api_hash': 'h'})
+            return worker.tenants, router.tenants
+        finally:
+            await router.close()
+            server.close()
+
+    tenants, routed = asyncio.run(scenario())
+    assert tenants == {} and routed == {}
+    assert not clients[0].is_connected()
@@ -0,0 +1,44 @@
+import asyncio
+
+from benchmarks.fake_telegram import FakeClient, FakeEvent, FakeServer
+from userbot import ForwardTask, StatusBoard, Userbot
+
+
+class BrokenReplyEvent(FakeEvent):
+    async def reply(self, text, **kwargs):
+        raise ConnectionError("reply failed")
+
+
+def test_failed_first_reply_does_not_leave_a_broken_board():
+    async def scenario():
+        client = FakeClient(FakeServer(groups=0, users=0, latency=0))
+        board = StatusBoard(min_interval=0)
+        try:
+            await board.attach(BrokenReplyEvent(client, '.hiyaok'), 'a')
+        except ConnectionError:
+            pass
+        left = dict(board.boards)
+        event = FakeEvent(client, '.hiyaok')
+        await board.attach(event, 'b')
+        await asyncio.sleep(0.01)
+        return left, board.boards[event.chat_id], event.replies[0]
+
+    left, board, message = asyncio.run(scenario())
+    assert left == {}
+    assert board['running'] == {'b'}
+    assert board['message'].result() is message
+    assert "Task `b`" in message.text and "Task `a`" not in message.text
+
+
+def test_forward_task_is_dropped_when_the_dashboard_cannot_start():
+    async def scenario():
+        client = FakeClient(FakeServer(groups=5, users=0, latency=0))
+        userbot = Userbot(None, 0, '', client=client)
+        await userbot.start()
+        userbot.forward_tasks['t1'] = ForwardTask(message_id=1, chat_id=client.uid, delay=1)
+        await userbot._forward_message('t1', BrokenReplyEvent(client, '.hiyaok'))
+        return userbot
+
+    userbot = asyncio.run(scenario())
+    assert 't1' not in userbot.forward_tasks
+    assert userbot.status_board.boards == {}
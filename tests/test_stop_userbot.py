@@ -0,0 +1,77 @@
+import asyncio
+import signal
+import subprocess
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="uses process groups")
+
+STUBBORN = (
+    "import signal, time\n"
+    "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+    "print('ready', flush=True)\n"
+    "time.sleep(60)\n"
+)
+OBEDIENT = "import time\nprint('ready', flush=True)\ntime.sleep(60)\n"
+
+
+def spawn(code):
+    # Like start_userbot: own session, so pgid == pid
+    process = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, start_new_session=True)
+    assert process.stdout.readline() == b'ready\n'
+    return process
+
+
+class Control:
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+
+    async def call(self, method, timeout=5, **params):
+        # Acknowledges the shutdown but the process keeps running
+        self.calls.append(method)
+        return {'stopping': True}
+
+    async def close(self):
+        self.closed = True
+
+
+def test_sigterm_is_escalated_to_sigkill_before_remove_returns(admin_bot):
+    stubborn = spawn(STUBBORN)
+    obedient = spawn(OBEDIENT)
+    try:
+        async def scenario():
+            manager = admin_bot.UserBotManager()
+            manager.running_bots.update({'1': stubborn, '2': obedient})
+            await manager.remove_userbots(['1', '2'], timeout=0.5)
+            # Both are gone by the time remove_userbots returns
+            return manager.running_bots, stubborn.poll(), obedient.poll()
+
+        running, stubborn_status, obedient_status = asyncio.run(scenario())
+        assert running == {}
+        assert stubborn_status == -signal.SIGKILL
+        assert obedient_status == -signal.SIGTERM
+    finally:
+        for process in (stubborn, obedient):
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+
+def test_acknowledged_shutdown_still_falls_back_to_signals(admin_bot):
+    process = spawn(STUBBORN)
+    process.control = Control()
+    try:
+        async def scenario():
+            manager = admin_bot.UserBotManager()
+            await manager.stop_userbot(process, timeout=0.3)
+            return process.poll()
+
+        assert asyncio.run(scenario()) == -signal.SIGKILL
+        assert process.control.calls == ['shutdown']
+        assert process.control.closed
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from storage import AsyncJsonStore, JsonStore
+
+
+def write_raw(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_save_is_atomic_and_rotates_snapshots(tmp_path):
+    path = str(tmp_path / 'data.json')
+    store = JsonStore(path, default={'users': {}}, snapshots=2)
+
+    for n in range(3):
+        assert store.save({'users': {}, 'n': n})
+
+    assert store.load()['n'] == 2
+    with open(store.snapshot_path(1)) as f:
+        assert json.load(f)['n'] == 1
+    with open(store.snapshot_path(2)) as f:
+        assert json.load(f)['n'] == 0
+    # No temp files are left behind
+    assert sorted(os.listdir(tmp_path)) == ['data.json', 'data.json.1', 'data.json.2']
+
+
+def test_missing_keys_are_filled_from_default(tmp_path):
+    path = str(tmp_path / 'data.json')
+    write_raw(path, '{"users": {"1": {}}}')
+    data = JsonStore(path, default={'users': {}, 'banned': []}).load()
+    assert data == {'users': {'1': {}}, 'banned': []}
+
+
+def test_corrupt_file_is_quarantined_and_snapshot_restored(tmp_path):
+    path = str(tmp_path / 'data.json')
+    store = JsonStore(path, default={})
+    store.save({'n': 1})
+    store.save({'n': 2})
+    write_raw(path, '{"n": 3')
+
+    assert store.load() == {'n': 1}
+    with open(f"{path}.corrupt") as f:
+        assert f.read() == '{"n": 3'
+    with open(path) as f:
+        assert json.load(f) == {'n': 1}
+
+
+def test_non_object_document_counts_as_corrupt(tmp_path):
+    path = str(tmp_path / 'data.json')
+    write_raw(path, '[1, 2]')
+    assert JsonStore(path, default={'users': {}}).load() == {'users': {}}
+    assert os.path.exists(f"{path}.corrupt")
+
+
+def test_read_errors_are_raised_not_quarantined(tmp_path, monkeypatch):
+    path = str(tmp_path / 'data.json')
+    store = JsonStore(path)
+    store.save({'n': 1})
+
+    def failing_read(_path):
+        raise PermissionError(13, 'Permission denied')
+
+    monkeypatch.setattr(store, '_read', failing_read)
+    with pytest.raises(PermissionError):
+        store.load()
+    assert not os.path.exists(f"{path}.corrupt")
+    with open(path) as f:
+        assert json.load(f) == {'n': 1}
+
+
+class BlockingStore(JsonStore):
+    """JsonStore whose writes wait for the test and are recorded"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.release = threading.Event()
+        self.writes = []
+
+    def write(self, payload, rotate=True):
+        self.release.wait(5)
+        self.writes.append(json.loads(payload))
+        super().write(payload, rotate)
+
+
+def test_async_store_serves_one_live_dict(tmp_path):
+    async def scenario():
+        store = AsyncJsonStore(JsonStore(str(tmp_path / 'data.json'), default={'users': {}}))
+        first = await store.load()
+        first['users']['1'] = {}
+        assert (await store.load()) is first
+        assert await store.save()
+        assert store.generation == 1
+
+    asyncio.run(scenario())
+
+
+def test_async_store_coalesces_saves_during_write(tmp_path):
+    async def scenario():
+        inner = BlockingStore(str(tmp_path / 'data.json'))
+        store = AsyncJsonStore(inner)
+        data = await store.load()
+
+        data['n'] = 1
+        first = asyncio.ensure_future(store.save())
+        await asyncio.sleep(0.05)
+        # The first write is in flight, these collapse into one follow-up
+        waiters = []
+        for n in range(2, 6):
+            data['n'] = n
+            waiters.append(asyncio.ensure_future(store.save()))
+        inner.release.set()
+        assert all(await asyncio.gather(first, *waiters))
+        return inner.writes
+
+    assert asyncio.run(scenario()) == [{'n': 1}, {'n': 5}]
+
+
+def test_async_store_snapshots_before_handing_off(tmp_path):
+    async def scenario():
+        inner = BlockingStore(str(tmp_path / 'data.json'))
+        store = AsyncJsonStore(inner)
+        data = await store.load()
+        data['items'] = list(range(3))
+        saving = asyncio.ensure_future(store.save())
+        await asyncio.sleep(0.05)
+        # Mutating while the executor is still writing must not leak into it
+        data['items'].append(99)
+        data['extra'] = True
+        inner.release.set()
+        await saving
+        return inner.writes
+
+    assert asyncio.run(scenario()) == [{'items': [0, 1, 2]}]
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_telegram import FakeClient, FakeDialog, FakeEvent, FakeServer
+from shard_worker import ShardWorker
+from userbot import TargetFilter, TargetGroup, TargetIndex, Userbot
+
+
+def group(chat_id, title, members, megagroup=True, folder=None):
+    dialog = FakeDialog(chat_id, title, True, participants_count=members, megagroup=megagroup)
+    dialog.folder_id = folder
+    return TargetGroup(dialog)
+
+
+GROUPS = [
+    group(-1, "Jual Beli Motor", 5000),
+    group(-2, "jual beli hp", 200, megagroup=False),
+    group(-3, "Arisan", 12000, folder=1),
+    group(-4, "Info Loker", 800),
+]
+
+
+def matching(target_filter):
+    return [g.id for g in GROUPS if target_filter.matches(g)]
+
+
+def test_rules_combine_and_include_exclude_override():
+    target_filter = TargetFilter('jual')
+    assert matching(target_filter) == [-1, -2, -3, -4]
+    target_filter.set_rule('title', 'jual')
+    assert matching(target_filter) == [-1, -2]
+    target_filter.set_rule('members', '1000-')
+    assert matching(target_filter) == [-1]
+    target_filter.set_rule('include', '-4')
+    target_filter.set_rule('exclude', '-1')
+    assert matching(target_filter) == [-4]
+    target_filter.set_rule('title', 'off')
+    target_filter.set_rule('members', 'off')
+    target_filter.set_rule('type', 'basic')
+    assert matching(target_filter) == [-2, -4]
+
+
+def test_exclude_alone_works_as_a_ban_list():
+    target_filter = TargetFilter('semua')
+    target_filter.set_rule('exclude', '-2, -3')
+    assert matching(target_filter) == [-1, -4]
+    target_filter.set_rule('folder', '1')
+    assert matching(target_filter) == []
+
+
+@pytest.mark.parametrize('rule,value', [('title', '('), ('members', '100'), ('type', 'channel'), ('color', 'red')])
+def test_invalid_rules(rule, value):
+    with pytest.raises(ValueError):
+        TargetFilter('x').set_rule(rule, value)
+
+
+def test_filter_round_trips_through_dict():
+    target_filter = TargetFilter('jual')
+    for rule, value in (('title', 'jual'), ('members', '-6000'), ('folder', '0'), ('type', 'super'), ('include', '-3')):
+        target_filter.set_rule(rule, value)
+    restored = TargetFilter.from_dict('jual', target_filter.to_dict())
+    assert restored.to_dict() == target_filter.to_dict()
+    assert matching(restored) == matching(target_filter)
+
+
+def test_index_compiles_once_and_leaves_out_banned_groups():
+    async def scenario():
+        server = FakeServer(groups=30, users=5)
+        banned = set()
+        index = TargetIndex(FakeClient(server), banned)
+        first = await index.targets()
+        assert await index.targets() is first
+        assert server.calls['get_dialogs'] == 1
+
+        banned.add(first[0].id)
+        index.invalidate()
+        again = await index.targets()
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert len(first) == 30
+    assert [g.id for g in again] == [g.id for g in first[1:]]
+
+
+def make_userbot():
+    client = FakeClient(FakeServer(groups=20, users=2, latency=0))
+    userbot = Userbot(None, 0, '', client=client)
+    return userbot, client
+
+
+def test_target_command_reports_lists_for_persistence():
+    async def scenario():
+        userbot, client = make_userbot()
+        await userbot.start()
+        saved = []
+        userbot.filters_listener = saved.append
+        handler = client.handlers['target_handler']
+        await handler(FakeEvent(client, '.target besar members 1000-'))
+        await handler(FakeEvent(client, '.target kecil type basic'))
+        await handler(FakeEvent(client, '.target del kecil'))
+
+        # A fresh tenant started from what was persisted gets the same list
+        restored, _ = make_userbot()
+        restored.load_filters(saved[-1])
+        return saved, restored
+
+    saved, restored = asyncio.run(scenario())
+    assert len(saved) == 3
+    assert sorted(saved[1]) == ['besar', 'kecil']
+    assert list(saved[-1]) == ['besar']
+    assert restored.targets.filters['besar'].min_members == 1000
+
+
+def test_shard_worker_restores_and_reports_filters():
+    async def scenario():
+        worker = ShardWorker(lambda session, api_id, api_hash: FakeClient(FakeServer(groups=5, latency=0)))
+        notified = []
+        worker._notify = lambda method, **params: notified.append((method, params))
+        filters = {'arsip': TargetFilter.from_dict('arsip', {'folder': 1}).to_dict()}
+        await worker.start_tenant('42', 's', 1, 'h', filters=filters)
+        userbot = worker.tenants['42']
+        await userbot.client.handlers['target_handler'](FakeEvent(userbot.client, '.target arsip folder off'))
+        await worker.stop_tenant('42')
+        return notified
+
+    (method, params), = asyncio.run(scenario())
+    assert method == 'tenant_filters'
+    assert params['user_id'] == '42'
+    assert params['filters']['arsip']['folder'] is None
+
+
+def test_member_counts_survive_refresh_and_are_fetched_outside_the_lock():
+    from benchmarks.fake_telegram import FakeParticipants
+
+    class CountingClient(FakeClient):
+        def __init__(self, server):
+            super().__init__(server)
+            self.counted = []
+            self.release = asyncio.Event()
+
+        async def get_participants(self, entity, limit=None):
+            await self.release.wait()
+            self.counted.append(entity.id)
+            return FakeParticipants(5000)
+
+    async def scenario():
+        server = FakeServer(groups=4, users=0, latency=0)
+        for dialog in server.dialogs:
+            dialog.entity.participants_count = None  # large groups come without a count
+        client = CountingClient(server)
+        index = TargetIndex(client, set())
+        target_filter = index.filters['besar'] = TargetFilter('besar')
+        target_filter.set_rule('members', '1000-')
+
+        compiling = asyncio.create_task(index.targets('besar'))
+        await asyncio.sleep(0.01)
+        # Counting is in progress, the dialog list is still served
+        listed = await asyncio.wait_for(index.dialogs(), 1)
+        client.release.set()
+        first = await compiling
+
+        index.invalidate(dialogs=True)
+        second = await index.targets('besar')
+        return client.counted, listed, first, second
+
+    counted, listed, first, second = asyncio.run(scenario())
+    assert len(listed) == 4
+    assert len(first) == len(second) == 4
+    # One fetch per group, the refresh reused them
+    assert len(counted) == 4
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+
+from storage import AsyncJsonStore, JsonStore
+
+
+def restart(admin_bot, monkeypatch, tmp_path, compact_every=100):
+    """Fresh store and registry over the same files, like a new process"""
+    store = AsyncJsonStore(JsonStore(str(tmp_path / 'data.json'), default={
+        'userbots': {}, 'premium_users': {}, 'users': {}
+    }))
+    monkeypatch.setattr(admin_bot, 'data_store', store)
+    return admin_bot.UserRegistry(str(tmp_path / 'users.journal'), compact_every=compact_every)
+
+
+def saved_users(tmp_path):
+    with open(tmp_path / 'data.json') as f:
+        return set(json.load(f)['users'])
+
+
+def test_journal_is_replayed_after_a_crash_with_a_torn_last_line(admin_bot, monkeypatch, tmp_path):
+    registry = restart(admin_bot, monkeypatch, tmp_path)
+
+    async def before_crash():
+        return [await registry.add(user_id, f"u{user_id}") for user_id in (1, 2, 2, 3)]
+
+    assert asyncio.run(before_crash()) == [True, True, False, True]
+    # The process died halfway through journaling user 4
+    with open(tmp_path / 'users.journal', 'a') as f:
+        f.write('{"id": 4, "userna')
+
+    registry = restart(admin_bot, monkeypatch, tmp_path)
+
+    async def after_restart():
+        again = [await registry.add(user_id) for user_id in (1, 2, 3)]
+        torn = await registry.add(4)
+        return again, torn, registry._pending
+
+    again, torn, pending = asyncio.run(after_restart())
+    assert again == [False, False, False]
+    # The torn entry was skipped, so user 4 is journaled again
+    assert torn is True
+    assert pending == 4
+
+
+def test_compaction_folds_the_journal_into_data_json(admin_bot, monkeypatch, tmp_path):
+    registry = restart(admin_bot, monkeypatch, tmp_path, compact_every=3)
+
+    async def scenario():
+        for user_id in (1, 2, 3):
+            await registry.add(user_id)
+        compacted = os.listdir(tmp_path)
+        await registry.add(4)
+        return compacted, registry._pending
+
+    compacted, pending = asyncio.run(scenario())
+    assert 'users.journal' not in compacted and 'users.journal.compacting' not in compacted
+    assert saved_users(tmp_path) == {'1', '2', '3'}
+    # Users after the compaction start a fresh journal
+    with open(tmp_path / 'users.journal') as f:
+        assert [json.loads(line)['id'] for line in f] == [4]
+    assert pending == 1
+
+
+def test_interrupted_compaction_is_finished_on_restart(admin_bot, monkeypatch, tmp_path):
+    registry = restart(admin_bot, monkeypatch, tmp_path)
+
+    async def first_run():
+        for user_id in (1, 2):
+            await registry.add(user_id)
+        await registry.compact()
+        await registry.add(3)
+
+    asyncio.run(first_run())
+    # Crash after the journal was moved aside and data.json saved, before it was removed
+    with open(tmp_path / 'users.journal.compacting', 'w') as f:
+        f.write(json.dumps({'id': 2, 'username': None, 'first_seen': 'x'}) + '\n')
+
+    registry = restart(admin_bot, monkeypatch, tmp_path)
+
+    async def second_run():
+        known = [await registry.add(user_id) for user_id in (1, 2, 3)]
+        await registry.compact()
+        return known
+
+    assert asyncio.run(second_run()) == [False, False, False]
+    assert saved_users(tmp_path) == {'1', '2', '3'}
+    assert not os.path.exists(tmp_path / 'users.journal')
+    assert not os.path.exists(tmp_path / 'users.journal.compacting')
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import datetime, timedelta
+
+
+def userbots(count):
+    start = datetime(2030, 1, 1)
+    return {
+        str(1000 + n): {
+            'first_name': f"Bot{n:03d}",
+            'phone': f"+62800{n:04d}",
+            'active': n % 3 != 0,
+            'expires_at': (start + timedelta(days=n)).isoformat(),
+        }
+        for n in range(count)
+    }
+
+
+def ids(rows):
+    return [user_id for _, user_id, _ in rows]
+
+
+def test_pages_follow_the_cursor_both_ways(admin_bot):
+    async def scenario():
+        await admin_bot.save_data({'userbots': userbots(25), 'premium_users': {}, 'users': {}})
+        index = admin_bot.UserbotIndex(admin_bot.data_store)
+        first = await index.page('e', size=10)
+        second = await index.page('e', first[0][-1][0], 'n', size=10)
+        last = await index.page('e', second[0][-1][0], 'n', size=10)
+        back = await index.page('e', second[0][0][0], 'p', size=10)
+        return first, second, last, back
+
+    first, second, last, back = asyncio.run(scenario())
+    assert ids(first[0]) == [str(1000 + n) for n in range(10)]
+    assert first[1:] == (False, True, (0, 25))
+    assert ids(second[0]) == [str(1000 + n) for n in range(10, 20)]
+    assert second[1:3] == (True, True)
+    assert ids(last[0]) == [str(1000 + n) for n in range(20, 25)]
+    assert last[1:3] == (True, False)
+    assert ids(back[0]) == ids(first[0])
+    assert back[1:3] == (False, True)
+
+
+def test_cursor_stays_valid_after_deletions(admin_bot):
+    async def scenario():
+        await admin_bot.save_data({'userbots': userbots(25), 'premium_users': {}, 'users': {}})
+        index = admin_bot.UserbotIndex(admin_bot.data_store)
+        first = await index.page('e', size=10)
+        cursor = first[0][-1][0]
+        data = await admin_bot.load_data()
+        # The cursor's own record and the next one are gone before paging on
+        del data['userbots']['1009']
+        del data['userbots']['1010']
+        await admin_bot.save_data(data)
+        after = await index.page('e', cursor, 'n', size=10)
+        for n in range(11, 25):
+            del data['userbots'][str(1000 + n)]
+        await admin_bot.save_data(data)
+        emptied = await index.page('e', cursor, 'n', size=10)
+        return after, emptied
+
+    after, emptied = asyncio.run(scenario())
+    assert ids(after[0]) == [str(1000 + n) for n in range(11, 21)]
+    assert after[1] is True
+    # Nothing left past the cursor, paging restarts from the beginning
+    assert ids(emptied[0]) == [str(1000 + n) for n in range(9)]
+    assert emptied[1:3] == (False, False)
+
+
+def test_sorts_and_search(admin_bot):
+    async def scenario():
+        bots = userbots(12)
+        bots['1005']['first_name'] = "aaa"
+        await admin_bot.save_data({'userbots': bots, 'premium_users': {}, 'users': {}})
+        index = admin_bot.UserbotIndex(admin_bot.data_store)
+        by_name = await index.page('n', size=3)
+        by_status = await index.page('s', size=20)
+        search = await index.page('e', query='bot01', size=10)
+        found = await index.find('+628000007')
+        exact = await index.find('1003')
+        return by_name, by_status, search, found, exact
+
+    by_name, by_status, search, found, exact = asyncio.run(scenario())
+    assert ids(by_name[0]) == ['1005', '1000', '1001']
+    statuses = [info['active'] for _, _, info in by_status[0]]
+    assert statuses == sorted(statuses, reverse=True)
+    assert ids(search[0]) == ['1010', '1011']
+    assert search[3] is None
+    assert found == ['1007']
+    assert exact == ['1003']
+
+
+def test_callback_cursor_fits_in_callback_data(admin_bot):
+    info = {'first_name': "Nama Yang Sangat Panjang Sekali|x", 'expires_at': datetime(2030, 1, 1).isoformat()}
+    for sort in admin_bot.UserbotIndex.SORTS:
+        key = admin_bot.UserbotIndex.key(sort, '1234567890', info)
+        assert key.endswith('|1234567890')
+        assert len(f"ubl:n:{key}".encode()) <= 64
+
+
+def button_data(buttons):
+    # Newer Telethon layers keep the callback data on button.type
+    return [(getattr(button, 'data', None) or button.type.data).decode() for row in buttons for button in row]
+
+
+def test_list_paging_callbacks_stay_in_their_list(admin, admin_bot):
+    from conftest import FakeCallback
+
+    async def click(data, chat_id=1):
+        func, match = admin.bot.handler(data.encode())
+        event = FakeCallback(data.encode(), admin_bot.ADMIN_IDS[0], chat_id)
+        event.pattern_match = match
+        await func(event)
+        return event
+
+    async def scenario():
+        await admin_bot.save_data({'userbots': userbots(25), 'premium_users': {}, 'users': {}})
+        rows = (await admin.userbot_index.page('e', size=10))[0]
+        cursor = rows[-1][0]
+        return {
+            'next': await click(f"ubl:n:{cursor}"),
+            'sort': await click("ubl:s:n"),
+            'clear': await click("ubl:q:"),
+            # Another chat, so the sort chosen above does not apply
+            'delete': await click(f"ubd:n:{cursor}", chat_id=2),
+        }
+
+    events = asyncio.run(scenario())
+    for name in ('next', 'sort', 'clear'):
+        text, buttons = events[name].edits[-1]
+        data = button_data(buttons)
+        assert "Hapus Userbot**" not in text
+        assert not any(item.startswith('delete_') for item in data)
+        assert any(item.startswith('toggle_') for item in data)
+        assert all(not item.startswith('ubd:') for item in data)
+    assert "Menampilkan `11-20`" in events['next'].edits[-1][0]
+    assert "Urut: Nama" in events['sort'].edits[-1][0]
+
+    text, buttons = events['delete'].edits[-1]
+    data = button_data(buttons)
+    assert "Hapus Userbot**" in text
+    assert [item for item in data if item.startswith('delete_')][0] == 'delete_1010'
+    assert not any(item.startswith('toggle_') for item in data)
+
+
+def test_list_callbacks_are_admin_only(admin, admin_bot):
+    from conftest import FakeCallback
+
+    func, match = admin.bot.handler(b"ubl:s:n")
+    event = FakeCallback(b"ubl:s:n", sender_id=-1)
+    event.pattern_match = match
+    asyncio.run(func(event))
+    assert event.answers and not event.edits
@@ -0,0 +1,44 @@
+import asyncio
+import os
+import socket
+import time
+
+import pytest
+
+from zygote import ZygoteClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, 'send_fds') or not hasattr(os, 'fork'),
+    reason="zygote needs fork and fd passing"
+)
+
+
+async def wait_exit(process, timeout=20):
+    deadline = time.monotonic() + timeout
+    while process.poll() is None and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return process.poll()
+
+
+def test_exit_status_is_reported_by_the_zygote(tmp_path):
+    async def scenario():
+        zygote = ZygoteClient(str(tmp_path / 'zygote.sock'))
+        try:
+            # Wrong argument count: userbot.main prints usage and exits 1
+            process = await zygote.spawn([os.path.join(ROOT, 'userbot.py')], dict(os.environ), ROOT)
+            code = await wait_exit(process)
+            output = process.stdout.read()
+            process.stdout.close()
+            process.stderr.close()
+            # Nothing left to signal once the status is known
+            process.kill()
+            return code, output, process.status, process.pidfd
+        finally:
+            zygote.close()
+
+    code, output, status, pidfd = asyncio.run(scenario())
+    assert code == 1
+    assert "Usage:" in output
+    assert status is None and pidfd is None
@@ -0,0 +1,81 @@
+# timer_queue.py
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Timer:
+    __slots__ = ('when', 'callback', 'cancelled')
+
+    def __init__(self, when, callback):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TimerQueue:
+    """All deadlines of the process in one heap, served by a single task.
+
+    Forward tasks of every Userbot in this process (one in a tenant process,
+    many in the admin bot or a shard worker) arm timers here instead of each
+    keeping its own sleeping coroutine. Deadlines are time.monotonic() values;
+    re-arming is cancel() plus a new call_at(), which wakes the runner if the
+    new deadline is the earliest.
+    """
+
+    def __init__(self):
+        self._heap = []  # (when, seq, timer)
+        self._seq = itertools.count()
+        self._changed = None
+        self._runner = None
+
+    def __len__(self):
+        return sum(1 for _, _, timer in self._heap if not timer.cancelled)
+
+    def call_at(self, when, callback):
+        loop = asyncio.get_running_loop()
+        if self._runner is not None and self._runner.get_loop() is not loop:
+            # Timers of a previous event loop can never fire
+            self._heap = []
+            self._runner = None
+
+        timer = Timer(when, callback)
+        heapq.heappush(self._heap, (when, next(self._seq), timer))
+        if self._runner is None or self._runner.done():
+            self._changed = asyncio.Event()
+            self._runner = loop.create_task(self._run())
+        elif self._heap[0][2] is timer:
+            self._changed.set()
+        return timer
+
+    def call_later(self, delay, callback):
+        return self.call_at(time.monotonic() + delay, callback)
+
+    async def _run(self):
+        while self._heap:
+            when, _, timer = self._heap[0]
+            if timer.cancelled:
+                heapq.heappop(self._heap)
+                continue
+
+            delay = when - time.monotonic()
+            if delay <= 0:
+                heapq.heappop(self._heap)
+                try:
+                    timer.callback()
+                except Exception as e:
+                    logger.error(f"Timer callback failed: {str(e)}")
+                continue
+
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+timer_queue = TimerQueue()
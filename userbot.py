@@ -1,48 +1,925 @@
-from telethon import TelegramClient, events,utils
-from telethon.tl.types import InputPeerChannel
-from telethon.errors import RPCError, FloodWaitError, ChatWriteForbiddenError
+from telethon import TelegramClient, events
+from telethon.errors import (
+    RPCError, FloodWaitError, ChatWriteForbiddenError, MessageNotModifiedError, SlowModeWaitError,
+    ChannelPrivateError, UserBannedInChannelError, ChatRestrictedError
+)
 from telethon.sessions import StringSession
+from telethon.tl.functions.channels import GetFullChannelRequest
 import asyncio
 import os
+import re
 import sys
 import time
 from typing import Dict
-from datetime import datetime
+from array import array
+from datetime import datetime, timedelta
+from collections import Counter, OrderedDict, deque
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('userbot.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from metrics import REGISTRY
+from timer_queue import timer_queue
+
 logger = logging.getLogger(__name__)
 
+# Number of recent cycles kept per task for `.detail` / `.status`
+CYCLE_HISTORY = 10
+
+# Per-group backoff after a failed send: BACKOFF_BASE * 2^(failures-1), capped
+BACKOFF_BASE = 60
+BACKOFF_MAX = 6 * 3600
+# Consecutive permanent failures before a group is quarantined into banned_groups
+QUARANTINE_AFTER = 3
+
+# The account can't write there until someone changes the group's settings
+PERMANENT_ERRORS = (ChatWriteForbiddenError, ChannelPrivateError, UserBannedInChannelError, ChatRestrictedError)
+
+# Share of the account send rate that forward tasks may commit
+ADMISSION_HEADROOM = 0.9
+# Account-wide sends per minute assumed before anything is measured. Well under
+# what Telegram tolerates, and a first task of ~250 groups at delay 5 fits
+INITIAL_SEND_RATE = 60
+# Seconds of send history the account-wide rate is measured over
+RATE_WINDOW = 600
+# How far one cycle moves the rate towards a higher measured rate
+RATE_SMOOTHING = 0.3
+# Safety cap only, admission is decided by load
+MAX_FORWARD_TASKS = 100
+
+# Seconds before the target index re-reads the dialog list without a dialog event
+TARGET_REFRESH = 15 * 60
+# Seconds a fetched member count is reused across dialog refreshes
+MEMBER_COUNT_TTL = 6 * 3600
+
+# Id files for bulk .ban/.deleteban: plain text only, read fully into memory
+ID_FILE_LIMIT = 256 * 1024
+ID_FILE_USAGE = "Kirim/reply file `.txt` (text/plain) berisi ID grup, satu per baris"
+
+# Rows per page of the paged command replies (.detail shows whole tasks)
+PAGE_SIZE = 20
+DETAIL_PAGE_SIZE = 3
+
+# Groups whose failures are remembered per task, least recently failed are dropped
+FAILURE_CAPACITY = 256
+# Text for the failure codes the forward loop records itself, others show the error name
+FAILURE_TEXT = {
+    'FLOOD': "Flood limit",
+    'FORBIDDEN': "Bot dibanned/dibatasi",
+    'QUARANTINED': "Dikarantina (auto-ban)",
+}
+
+def _percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class CycleStats:
+    """Phase timings of one forward cycle, all durations in seconds"""
+
+    __slots__ = (
+        'started', 'wall', 'dialog_scan', 'flood_wait', 'pause', 'sends', 'failures',
+        'skipped', 'targets', 'send_p50', 'send_p95', '_latencies'
+    )
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.wall = 0.0
+        self.dialog_scan = 0.0
+        self.flood_wait = 0.0
+        self.pause = 0.0
+        self.sends = 0
+        self.failures = 0
+        self.skipped = 0
+        self.targets = 0
+        self.send_p50 = 0.0
+        self.send_p95 = 0.0
+        self._latencies = []
+
+    def add_send(self, latency, ok=True):
+        self._latencies.append(latency)
+        if ok:
+            self.sends += 1
+        else:
+            self.failures += 1
+
+    def finish(self):
+        self.wall = time.monotonic() - self.started
+        ordered = sorted(self._latencies)
+        self.send_p50 = _percentile(ordered, 0.5)
+        self.send_p95 = _percentile(ordered, 0.95)
+        self._latencies = []
+
+    @property
+    def sends_per_minute(self):
+        return self.sends / self.wall * 60 if self.wall else 0.0
+
+class GroupScheduler:
+    """Decides per group whether a forward is worth attempting right now.
+
+    Shared by all tasks of a Userbot, since slow mode and bans apply to the
+    account. State lives in parallel arrays indexed by a slot per group, so a
+    tracked group costs a few machine words instead of an object. Groups
+    without state are always eligible, the check is one dict lookup.
+    """
+
+    __slots__ = ('index', 'ids', 'last_sent', 'next_allowed', 'slowmode', 'failures')
+
+    def __init__(self):
+        self.index: Dict[int, int] = {}  # chat_id -> slot
+        self.ids = array('q')
+        self.last_sent = array('d')  # time.monotonic()
+        self.next_allowed = array('d')
+        self.slowmode = array('I')  # seconds
+        self.failures = array('H')  # consecutive
+
+    def __len__(self):
+        return len(self.ids)
+
+    def eligible(self, chat_id, now):
+        slot = self.index.get(chat_id)
+        return slot is None or now >= self.next_allowed[slot]
+
+    def _slot(self, chat_id):
+        slot = self.index.get(chat_id)
+        if slot is None:
+            slot = self.index[chat_id] = len(self.ids)
+            self.ids.append(chat_id)
+            self.last_sent.append(0.0)
+            self.next_allowed.append(0.0)
+            self.slowmode.append(0)
+            self.failures.append(0)
+        return slot
+
+    def sent(self, chat_id, now):
+        slot = self.index.get(chat_id)
+        if slot is None:
+            return
+        self.last_sent[slot] = now
+        self.failures[slot] = 0
+        self.next_allowed[slot] = now + self.slowmode[slot]
+
+    def interval(self, chat_id):
+        """Known slow mode interval of a group in seconds, 0 when not known"""
+        slot = self.index.get(chat_id)
+        return 0 if slot is None else self.slowmode[slot]
+
+    def slowed(self, chat_id, seconds, now, wait=None):
+        """Slow mode of `seconds` between sends; `wait` is the time left before the next one"""
+        slot = self._slot(chat_id)
+        self.slowmode[slot] = seconds
+        self.next_allowed[slot] = now + (seconds if wait is None else wait)
+
+    def failed(self, chat_id, now, permanent=False):
+        """Back the group off, returns True once it should be quarantined"""
+        slot = self._slot(chat_id)
+        failures = self.failures[slot] = min(self.failures[slot] + 1, 0xFFFF)
+        self.next_allowed[slot] = now + min(BACKOFF_BASE * 2 ** min(failures - 1, 32), BACKOFF_MAX)
+        return permanent and failures >= QUARANTINE_AFTER
+
+    def forget(self, chat_id):
+        slot = self.index.pop(chat_id, None)
+        if slot is None:
+            return
+        # Move the last slot into the hole so the arrays stay dense
+        last = len(self.ids) - 1
+        columns = (self.ids, self.last_sent, self.next_allowed, self.slowmode, self.failures)
+        if slot != last:
+            for column in columns:
+                column[slot] = column[last]
+            self.index[self.ids[slot]] = slot
+        for column in columns:
+            column.pop()
+
+class AdmissionController:
+    """Admits forward tasks against the account's send capacity.
+
+    Every task sends to its target groups once per `delay` minutes, so it
+    demands groups / delay sends per minute; loads are (groups, delay) pairs.
+    A task is accepted while the total demand stays under ADMISSION_HEADROOM
+    of `rate`. The rate starts at INITIAL_SEND_RATE and follows what the
+    account actually sends across all tasks over the last RATE_WINDOW
+    seconds: it rises towards a higher measured rate, and a cycle that hit a
+    flood wait caps it at the rate the account had when Telegram pushed back.
+    """
+
+    __slots__ = ('rate', 'sends', 'since')
+
+    def __init__(self, rate=INITIAL_SEND_RATE):
+        self.rate = rate
+        self.sends = deque()  # monotonic time of every successful send
+        self.since = time.monotonic()
+
+    def sent(self, now):
+        self.sends.append(now)
+
+    def measured(self, now):
+        """Sends per minute of the whole account over the last RATE_WINDOW seconds"""
+        while self.sends and self.sends[0] < now - RATE_WINDOW:
+            self.sends.popleft()
+        span = min(RATE_WINDOW, now - self.since)
+        return len(self.sends) * 60 / span if span > 0 else 0.0
+
+    def observe(self, cycle, now):
+        measured = self.measured(now)
+        if cycle.flood_wait > 0:
+            if measured:
+                self.rate = min(self.rate, measured)
+        elif measured > self.rate:
+            self.rate += RATE_SMOOTHING * (measured - self.rate)
+
+    def demand(self, loads):
+        return sum(groups / delay for groups, delay in loads)
+
+    def utilization(self, loads):
+        return self.demand(loads) / self.rate if self.rate else float('inf')
+
+    def admit(self, loads, groups, delay, forward_interval):
+        """(accepted, utilization with the task, projected cycle seconds)"""
+        utilization = self.utilization(list(loads) + [(groups, delay)])
+        send_phase = max(groups * forward_interval, delay * 60 * utilization)
+        return utilization <= ADMISSION_HEADROOM, utilization, send_phase + delay * 60
+
+class FailureLog:
+    """Bounded failure history of a task: chat_id -> (code, count, last_seen).
+
+    Nothing but the id, a short code and two numbers is kept per group; text
+    is rendered only when someone looks at it.
+    """
+
+    __slots__ = ('capacity', 'entries')
+
+    def __init__(self, capacity=FAILURE_CAPACITY):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def record(self, chat_id, code, now):
+        entry = self.entries.get(chat_id)
+        if entry is None:
+            if len(self.entries) >= self.capacity:
+                self.entries.popitem(last=False)
+            self.entries[chat_id] = (code, 1, now)
+        else:
+            self.entries[chat_id] = (code, entry[1] + 1, now)
+            self.entries.move_to_end(chat_id)
+
+    def recent(self, limit):
+        """Most recently failed groups first, as (chat_id, code, count, last_seen)"""
+        items = []
+        for chat_id in reversed(self.entries):
+            if len(items) == limit:
+                break
+            items.append((chat_id, *self.entries[chat_id]))
+        return items
+
+def parse_group_ids(text):
+    """Every integer in `text`, so id lists can be one per line, comma or space separated"""
+    return {int(v) for v in re.findall(r'-?\d+', text)}
+
+def failure_text(code):
+    return FAILURE_TEXT.get(code, code)
+
+DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+class TimeWindow:
+    """Cron-style window in local time, e.g. `08:00-22:00` or `mon-fri 09:00-17:00`.
+
+    A window whose end is before its start runs past midnight. Cycles only
+    start inside the window; a cycle that is due outside it waits for the
+    next opening.
+    """
+
+    __slots__ = ('days', 'start', 'end', 'text')
+
+    def __init__(self, days, start, end, text):
+        self.days = days  # weekday numbers, Monday is 0
+        self.start = start  # minutes after midnight
+        self.end = end
+        self.text = text
+
+    @classmethod
+    def parse(cls, spec):
+        parts = spec.lower().split()
+        if not parts or len(parts) > 2:
+            raise ValueError("Format window: `[hari] HH:MM-HH:MM`")
+
+        days = set(range(7))
+        if len(parts) == 2:
+            days = set()
+            for item in parts[0].split(','):
+                first, _, last = item.partition('-')
+                a = DAY_NAMES.index(first)
+                b = DAY_NAMES.index(last) if last else a
+                days.update((a + i) % 7 for i in range((b - a) % 7 + 1))
+
+        def minutes(value):
+            hour, minute = value.split(':')
+            hour, minute = int(hour), int(minute)
+            if not (0 <= hour < 24 and 0 <= minute < 60):
+                raise ValueError(f"Jam tidak valid: {value}")
+            return hour * 60 + minute
+
+        start, end = (minutes(v) for v in parts[-1].split('-'))
+        if start == end:
+            raise ValueError("Jam mulai dan selesai tidak boleh sama")
+        return cls(days, start, end, spec)
+
+    def contains(self, at):
+        minute = at.hour * 60 + at.minute
+        day = at.weekday()
+        if self.start < self.end:
+            return day in self.days and self.start <= minute < self.end
+        if minute >= self.start:
+            return day in self.days
+        return minute < self.end and (day - 1) % 7 in self.days
+
+    def next_open(self, at):
+        """`at` itself when inside the window, otherwise the next opening"""
+        if self.contains(at):
+            return at
+        midnight = at.replace(hour=0, minute=0, second=0, microsecond=0)
+        for i in range(8):
+            opening = midnight + timedelta(days=i, minutes=self.start)
+            if opening >= at and opening.weekday() in self.days:
+                return opening
+        return at
+
+class TargetGroup:
+    """One group dialog as the forward loop needs it, resolved once per refresh"""
+
+    __slots__ = ('id', 'peer', 'title', 'members', 'folder', 'megagroup')
+
+    def __init__(self, dialog):
+        self.id = dialog.id
+        self.peer = dialog.input_entity
+        self.title = dialog.title or ""
+        self.members = getattr(dialog.entity, 'participants_count', None)
+        self.folder = dialog.folder_id or 0
+        self.megagroup = bool(getattr(dialog.entity, 'megagroup', False))
+
+class TargetFilter:
+    """Named target list: groups matching every rule, plus `include`, minus `exclude`.
+
+    A list without rules and without includes targets every group, so
+    `exclude` alone works as a per-list ban list.
+    """
+
+    __slots__ = ('name', 'title', 'min_members', 'max_members', 'folder', 'kind', 'include', 'exclude')
+
+    RULES = ('title', 'members', 'folder', 'type', 'include', 'exclude')
+
+    def __init__(self, name):
+        self.name = name
+        self.title = None  # compiled regex
+        self.min_members = None
+        self.max_members = None
+        self.folder = None  # 0 daftar utama, 1 arsip
+        self.kind = None  # 'super' or 'basic'
+        self.include = set()
+        self.exclude = set()
+
+    def has_rules(self):
+        return (self.title is not None or self.min_members is not None or self.max_members is not None
+                or self.folder is not None or self.kind is not None)
+
+    def needs_members(self):
+        return self.min_members is not None or self.max_members is not None
+
+    def set_rule(self, rule, value):
+        """Apply `.target <list> <rule> <value>`, `off` clears the rule"""
+        off = value.lower() == 'off'
+        if rule == 'title':
+            try:
+                self.title = None if off else re.compile(value, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Regex tidak valid: {e}")
+        elif rule == 'members':
+            if off:
+                self.min_members = self.max_members = None
+                return
+            low, sep, high = value.partition('-')
+            if not sep:
+                raise ValueError("Format members: `min-max`, `min-` atau `-max`")
+            self.min_members = int(low) if low else None
+            self.max_members = int(high) if high else None
+        elif rule == 'folder':
+            self.folder = None if off else int(value)
+        elif rule == 'type':
+            if not off and value not in ('super', 'basic'):
+                raise ValueError("Type harus `super` atau `basic`")
+            self.kind = None if off else value
+        elif rule in ('include', 'exclude'):
+            ids = getattr(self, rule)
+            if off:
+                ids.clear()
+            else:
+                ids.update(int(v) for v in value.replace(',', ' ').split())
+        else:
+            raise ValueError(f"Rule tidak dikenal: {rule}")
+
+    def matches(self, group):
+        if group.id in self.exclude:
+            return False
+        if group.id in self.include:
+            return True
+        if not self.has_rules():
+            return not self.include
+        if self.title is not None and not self.title.search(group.title):
+            return False
+        if self.min_members is not None and (group.members or 0) < self.min_members:
+            return False
+        if self.max_members is not None and (group.members is None or group.members > self.max_members):
+            return False
+        if self.folder is not None and group.folder != self.folder:
+            return False
+        if self.kind is not None and group.megagroup != (self.kind == 'super'):
+            return False
+        return True
+
+    def to_dict(self):
+        """JSON form, for persisting the list outside the tenant"""
+        return {
+            'title': self.title.pattern if self.title is not None else None,
+            'min_members': self.min_members,
+            'max_members': self.max_members,
+            'folder': self.folder,
+            'kind': self.kind,
+            'include': sorted(self.include),
+            'exclude': sorted(self.exclude),
+        }
+
+    @classmethod
+    def from_dict(cls, name, data):
+        target_filter = cls(name)
+        if data.get('title') is not None:
+            target_filter.title = re.compile(data['title'], re.IGNORECASE)
+        target_filter.min_members = data.get('min_members')
+        target_filter.max_members = data.get('max_members')
+        target_filter.folder = data.get('folder')
+        target_filter.kind = data.get('kind')
+        target_filter.include = set(data.get('include', ()))
+        target_filter.exclude = set(data.get('exclude', ()))
+        return target_filter
+
+    def describe(self):
+        rules = []
+        if self.title is not None:
+            rules.append(f"• title: `{self.title.pattern}`")
+        if self.needs_members():
+            rules.append(f"• members: `{self.min_members or ''}-{self.max_members or ''}`")
+        if self.folder is not None:
+            rules.append(f"• folder: `{self.folder}`")
+        if self.kind is not None:
+            rules.append(f"• type: `{self.kind}`")
+        if self.include:
+            rules.append(f"• include: `{len(self.include)}` grup")
+        if self.exclude:
+            rules.append(f"• exclude: `{len(self.exclude)}` grup")
+        return "\n".join(rules) or "• semua grup"
+
+class TargetIndex:
+    """Group dialogs and the compiled target lists of one account.
+
+    The dialog list is read once and kept until a dialog event (join, leave,
+    kick, title change) marks it stale or TARGET_REFRESH passes. Each target
+    list is compiled against it on first use, with banned groups already
+    left out, so a forward cycle just walks a tuple of peers. Member counts
+    the dialog list lacks are fetched outside the index lock and kept by
+    group id for MEMBER_COUNT_TTL, so a refresh does not fetch them again.
+    """
+
+    def __init__(self, client, banned_groups):
+        self.client = client
+        self.banned_groups = banned_groups
+        self.filters: Dict[str, TargetFilter] = {}
+        self.groups = []
+        self.refreshed = None  # time.monotonic() of the last dialog read
+        self._compiled = {}  # list name (None = all groups) -> tuple of TargetGroup
+        self._lock = asyncio.Lock()
+        self.member_counts = {}  # group id -> (members, time.monotonic() of the fetch)
+        self._count_lock = asyncio.Lock()
+
+    def invalidate(self, dialogs=False):
+        """Drop compiled lists; with dialogs=True also re-read the dialog list"""
+        if dialogs:
+            self.refreshed = None
+        self._compiled.clear()
+
+    async def refresh(self):
+        self.groups = [TargetGroup(d) async for d in self.client.iter_dialogs() if d.is_group]
+        self._cached_counts(self.groups)
+        self.refreshed = time.monotonic()
+        self._compiled.clear()
+
+    def _cached_counts(self, groups):
+        """Fill in fetched member counts that are still fresh, returns the groups still missing one"""
+        now = time.monotonic()
+        missing = []
+        for group in groups:
+            if group.members is None:
+                cached = self.member_counts.get(group.id)
+                if cached and now - cached[1] < MEMBER_COUNT_TTL:
+                    group.members = cached[0]
+                else:
+                    missing.append(group)
+        return missing
+
+    async def count_members(self, groups):
+        """Fill in member counts the dialog list did not carry"""
+        # One fetch at a time per account, concurrent callers reuse what the first one got
+        async with self._count_lock:
+            for group in self._cached_counts(groups):
+                try:
+                    members = (await self.client.get_participants(group.peer, limit=0)).total
+                except Exception:
+                    members = 0
+                self.member_counts[group.id] = (members, time.monotonic())
+                group.members = members
+
+    def _stale(self):
+        return self.refreshed is None or time.monotonic() - self.refreshed > TARGET_REFRESH
+
+    async def dialogs(self):
+        """Every group dialog, banned or not"""
+        async with self._lock:
+            if self._stale():
+                await self.refresh()
+            return self.groups
+
+    async def targets(self, name=None):
+        """Tuple of TargetGroup for a list, compiled at most once per change"""
+        while True:
+            async with self._lock:
+                if self._stale():
+                    await self.refresh()
+                compiled = self._compiled.get(name)
+                if compiled is not None:
+                    return compiled
+                groups = [g for g in self.groups if g.id not in self.banned_groups]
+                missing = []
+                if name is not None:
+                    target_filter = self.filters[name]
+                    if target_filter.needs_members():
+                        missing = self._cached_counts(groups)
+                    if not missing:
+                        groups = [g for g in groups if target_filter.matches(g)]
+                if not missing:
+                    compiled = self._compiled[name] = tuple(groups)
+                    return compiled
+            # Slow and rate limited, so .listgrup and other lists don't wait on it
+            await self.count_members(missing)
+
 class ForwardTask:
-    def __init__(self, message_id: int, chat_id: int, delay: int):
+    __slots__ = (
+        'message_id', 'chat_id', 'delay', 'running', 'success_count', 'failed_count',
+        'failures', 'last_preview', 'started', 'cycles',
+        'mode', 'window', 'last_started', 'last_finished', 'next_run', 'timer', 'waiter',
+        'target', 'target_count'
+    )
+
+    def __init__(self, message_id: int, chat_id: int, delay: int, target=None):
         self.message_id = message_id
         self.chat_id = chat_id
         self.delay = delay
         self.running = True
         self.success_count = 0
         self.failed_count = 0
-        self.failed_groups = []
+        self.failures = FailureLog()
         self.last_preview = None
-        self.start_time = datetime.now()
+        self.started = time.monotonic()
+        self.cycles = deque(maxlen=CYCLE_HISTORY)
+        # 'rate': cycles start every `delay` minutes, 'delay': `delay` minutes after the last one ended
+        self.mode = 'rate'
+        self.window = None
+        self.last_started = self.started
+        self.last_finished = self.started
+        self.next_run = None  # time.monotonic() of the next cycle
+        self.timer = None
+        self.waiter = None
+        self.target = target  # TargetFilter name, None forwards to every group
+        self.target_count = 0  # groups in the target list when last compiled
+
+    def wake(self):
+        """Start the next cycle now, also how a stopped task leaves its wait"""
+        if self.waiter and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def schedule_text(self):
+        mode = "fixed-rate" if self.mode == 'rate' else "fixed-delay"
+        window = f" • window `{self.window.text}`" if self.window else ""
+        if self.next_run is None:
+            return f"`{mode}`{window}"
+        minutes = max(0.0, self.next_run - time.monotonic()) / 60
+        return f"`{mode}`{window} • berikutnya dalam `{minutes:.1f}` menit"
+
+    def runtime(self):
+        """Whole seconds since the task started"""
+        return int(time.monotonic() - self.started)
+
+    def timing_summary(self):
+        """Markdown breakdown of the last cycle next to the rolling average"""
+        if not self.cycles:
+            return "⏱ **Timing:** belum ada cycle selesai"
+
+        last = self.cycles[-1]
+        n = len(self.cycles)
+
+        def avg(attr):
+            return sum(getattr(c, attr) for c in self.cycles) / n
+
+        return f"""⏱ **Timing (terakhir | rata-rata {n} cycle):**
+• Durasi cycle: `{last.wall:.1f}s` | `{avg('wall'):.1f}s`
+• Scan dialog: `{last.dialog_scan:.1f}s` | `{avg('dialog_scan'):.1f}s`
+• Kirim p50/p95: `{last.send_p50 * 1000:.0f}/{last.send_p95 * 1000:.0f}ms` | `{avg('send_p50') * 1000:.0f}/{avg('send_p95') * 1000:.0f}ms`
+• Flood wait: `{last.flood_wait:.1f}s` | `{avg('flood_wait'):.1f}s`
+• Jeda antar kirim: `{last.pause:.1f}s` | `{avg('pause'):.1f}s`
+• Kirim/menit: `{last.sends_per_minute:.1f}` | `{avg('sends_per_minute'):.1f}`"""
+
+class StatusBoard:
+    """One live dashboard message per chat, shared by all forward tasks started there.
+
+    Tasks publish their own section with update(). The merged text is only
+    sent when it differs from what the chat already shows, and at most once
+    per `min_interval` seconds per chat; updates inside that window collapse
+    into a single trailing edit. Status edits use the same account rate
+    budget as the forwards, so they should stay rare.
+    """
+
+    MAX_LENGTH = 4000
+    SEPARATOR = "\n━━━━━━━━━━━━━━━\n"
+
+    def __init__(self, min_interval=30):
+        self.min_interval = min_interval
+        self.boards = {}  # chat_id -> board dict
+
+    async def attach(self, event, task_id):
+        """Register a task in the dashboard of the event's chat"""
+        board = self.boards.get(event.chat_id)
+        if board is None or not board['running']:
+            # Registered before the reply is awaited so concurrent tasks share it
+            board = {
+                'message': asyncio.get_running_loop().create_future(),
+                'sections': {},
+                'running': set(),
+                'shown': None,
+                'last_edit': time.monotonic(),
+                'pending': None,
+            }
+            self.boards[event.chat_id] = board
+            board['running'].add(task_id)
+            try:
+                message = await event.reply("🔄 **Memulai proses forward...**", parse_mode='md')
+            except Exception as e:
+                # Don't leave a board without a message for later tasks to join
+                if self.boards.get(event.chat_id) is board:
+                    del self.boards[event.chat_id]
+                board['running'].discard(task_id)
+                board['message'].set_exception(e)
+                board['message'].exception()  # tasks that already joined may never await it
+                raise
+            board['message'].set_result(message)
+            board['shown'] = message.text
+        else:
+            # Drop sections of finished tasks when a new task joins
+            for stale in [t for t in board['sections'] if t not in board['running']]:
+                del board['sections'][stale]
+        board['running'].add(task_id)
+        board['sections'][task_id] = f"🔄 Task `{task_id}`: memulai..."
+        self._schedule(board)
+
+    def update(self, chat_id, task_id, text):
+        board = self.boards.get(chat_id)
+        if board is None:
+            return
+        board['sections'][task_id] = text.strip()
+        self._schedule(board)
+
+    def finish(self, chat_id, task_id, text):
+        """Final section of a stopped task, kept until another task joins"""
+        board = self.boards.get(chat_id)
+        if board is None:
+            return
+        board['running'].discard(task_id)
+        self.update(chat_id, task_id, text)
+
+    def render(self, board):
+        header = f"📊 **Forward Dashboard** (`{len(board['running'])}` task aktif)\n"
+        sections = list(board['sections'].values())
+        text = header
+        for i, section in enumerate(sections):
+            candidate = text + (self.SEPARATOR if i else "\n") + section
+            if len(candidate) > self.MAX_LENGTH:
+                text += f"\n\n… dan {len(sections) - i} task lainnya, lihat `.detail`"
+                break
+            text = candidate
+        return text
+
+    def _schedule(self, board):
+        if board['pending'] is not None and not board['pending'].done():
+            return  # the trailing edit will pick up this change
+        delay = max(0.0, board['last_edit'] + self.min_interval - time.monotonic())
+        board['pending'] = asyncio.create_task(self._flush(board, delay))
+
+    async def _flush(self, board, delay):
+        if delay:
+            await asyncio.sleep(delay)
+        text = self.render(board)
+        if text == board['shown']:
+            return
+        board['last_edit'] = time.monotonic()
+        try:
+            message = await board['message']
+            await message.edit(text, parse_mode='md')
+        except MessageNotModifiedError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to update forward dashboard: {str(e)}")
+            return
+        board['shown'] = text
+
+class Paginator:
+    """One paged reply per chat, turned with `.next`, `.prev` and `.page <n>`.
+
+    A page is rendered only when it is shown, from the items the view was
+    opened with (usually the cached dialog index), and turning edits the same
+    message instead of sending more replies. User accounts can't attach
+    inline keyboards, so navigation is by command.
+    """
+
+    MAX_LENGTH = 4000
+    NAVIGATION = "⬅️ `.prev` • `.next` ➡️ • `.page <n>`"
+
+    def __init__(self):
+        self.views = {}  # chat_id -> view dict
+
+    async def open(self, event, title, items, render, page_size):
+        """Reply with the first page; render(items, start) returns the page body"""
+        view = {
+            'title': title,
+            'items': items,
+            'render': render,
+            'page_size': page_size,
+            'page': 0,
+            'message': None,
+        }
+        self.views[event.chat_id] = view
+        view['message'] = await event.reply(await self.render(view), parse_mode='md')
+
+    async def turn(self, event, delta=0, page=None):
+        view = self.views.get(event.chat_id)
+        if view is None:
+            await event.reply("ℹ️ Tidak ada daftar yang bisa dibuka di chat ini.", parse_mode='md')
+            return
+        target = view['page'] + delta if page is None else page
+        target = min(max(target, 0), self.pages(view) - 1)
+        if target == view['page']:
+            return
+        view['page'] = target
+        try:
+            await view['message'].edit(await self.render(view), parse_mode='md')
+        except MessageNotModifiedError:
+            pass
+
+    def pages(self, view):
+        return max(1, -(-len(view['items']) // view['page_size']))
+
+    async def render(self, view):
+        start = view['page'] * view['page_size']
+        body = await view['render'](view['items'][start:start + view['page_size']], start)
+        header = f"{view['title']} • Halaman `{view['page'] + 1}/{self.pages(view)}` • Total `{len(view['items'])}`\n\n"
+        footer = f"\n\n{self.NAVIGATION}" if self.pages(view) > 1 else ""
+        room = self.MAX_LENGTH - len(header) - len(footer)
+        if len(body) > room:
+            body = body[:room - 1] + "…"
+        return header + body + footer
 
 class Userbot:
-    def __init__(self, session_string, api_id, api_hash):
-        self.client = TelegramClient(StringSession(session_string), api_id, api_hash, 
+    # Pause between two forwards inside a cycle, in seconds
+    forward_interval = 2
+    # Minimum seconds between two edits of a chat's forward dashboard
+    status_interval = 30
+
+    def __init__(self, session_string, api_id, api_hash, client=None):
+        # client lets callers hand in an existing (or simulated) TelegramClient
+        self.client = client or TelegramClient(StringSession(session_string), api_id, api_hash,
                                    device_model="Userbot v1.0")
         self.banned_groups = set()
+        self.targets = TargetIndex(self.client, self.banned_groups)
+        self.scheduler = GroupScheduler()
+        self.admission = AdmissionController()
         self.forward_tasks: Dict[str, ForwardTask] = {}  # key: task_id (chat_id_msg_id)
-
-    async def start(self):
-        """Start userbot and register handlers"""
-        await self.client.start()
+        self.status_board = StatusBoard(self.status_interval)
+        self.paginator = Paginator()
+        # Called with the sorted ban list after every change, so the host can persist it
+        self.banned_listener = None
+        # Same for the target lists, called with {name: TargetFilter.to_dict()}
+        self.filters_listener = None
+
+    def stop_tasks(self, task_ids=None):
+        """Stop the given forward tasks (all when None), returns the stopped ids"""
+        task_ids = list(self.forward_tasks) if task_ids is None else task_ids
+        stopped = []
+        for task_id in task_ids:
+            task = self.forward_tasks.pop(task_id, None)
+            if task:
+                task.running = False
+                task.wake()
+                stopped.append(task_id)
+        return stopped
+
+    def ban_groups(self, ids):
+        """Ban many groups as one set operation, returns the ids that were not banned yet"""
+        added = set(ids) - self.banned_groups
+        if added:
+            self.banned_groups |= added
+            for chat_id in added:
+                self.scheduler.forget(chat_id)
+            self._banned_changed()
+        return added
+
+    def unban_groups(self, ids):
+        """Unban many groups as one set operation, returns the ids that were banned"""
+        removed = self.banned_groups & set(ids)
+        if removed:
+            self.banned_groups -= removed
+            for chat_id in removed:
+                self.scheduler.forget(chat_id)
+            self._banned_changed()
+        return removed
+
+    def load_banned(self, ids):
+        """Restore a persisted ban list, without reporting it back"""
+        self.banned_groups.clear()
+        self.banned_groups.update(ids)
+        self.targets.invalidate()
+
+    def _banned_changed(self):
+        self.targets.invalidate()
+        if self.banned_listener:
+            self.banned_listener(sorted(self.banned_groups))
+
+    def load_filters(self, filters):
+        """Restore persisted target lists, without reporting them back"""
+        self.targets.filters.clear()
+        for name, data in filters.items():
+            try:
+                self.targets.filters[name] = TargetFilter.from_dict(name, data)
+            except (re.error, TypeError, ValueError) as e:
+                logger.error(f"Target list {name} tidak bisa dipulihkan: {str(e)}")
+        self.targets.invalidate()
+
+    def _filters_changed(self):
+        self.targets.invalidate()
+        if self.filters_listener:
+            self.filters_listener({name: f.to_dict() for name, f in self.targets.filters.items()})
+
+    def loads(self, skip=None):
+        """(target groups, delay) of every task except `skip`, for admission"""
+        return [(t.target_count, t.delay) for k, t in self.forward_tasks.items() if k != skip]
+
+    def control_stats(self):
+        """Live per-task counters, served to the admin bot over the control channel"""
+        return {
+            'connected': self.client.is_connected(),
+            'tasks': [
+                {
+                    'id': task_id,
+                    'running': task.running,
+                    'delay': task.delay,
+                    'success': task.success_count,
+                    'failed': task.failed_count,
+                    'cycles': len(task.cycles),
+                    'last_cycle_s': round(task.cycles[-1].wall, 2) if task.cycles else None,
+                }
+                for task_id, task in self.forward_tasks.items()
+            ],
+        }
+
+    async def failure_summary(self, task, limit=5):
+        """Markdown list of the groups that failed most recently, titles looked up now"""
+        recent = task.failures.recent(limit)
+        if not recent:
+            return "⚠️ **Gagal terakhir:** tidak ada"
+
+        now = time.monotonic()
+        lines = [f"⚠️ **Gagal terakhir ({len(task.failures)} grup):**"]
+        for chat_id, code, count, last_seen in recent:
+            try:
+                title = (await self.client.get_entity(chat_id)).title
+            except Exception:
+                title = str(chat_id)
+            lines.append(f"• `{title[:40]}`: {failure_text(code)} ×{count} ({int(now - last_seen)}s lalu)")
+        return "\n".join(lines)
+
+    async def start(self, login=True):
+        """Start userbot and register handlers.
+
+        login=False skips client.start(), which prompts on stdin for an
+        unauthorized session; the caller connects and checks authorization.
+        """
+        if login:
+            await self.client.start()
         print("Userbot started successfully!")
 
         @self.client.on(events.NewMessage(pattern=r'(?i)[!/\.]help$'))
@@ -61,17 +938,24 @@ class Userbot:
 • `.stop` - Stop semua forward task
 • `.delforward <task_id>` - Hapus forward task tertentu
 • `.setdelay <task_id> <menit>` - Set delay untuk task
+• `.setmode <task_id> rate|delay` - Jadwal tetap / jeda setelah cycle selesai
+• `.window <task_id> [hari] HH:MM-HH:MM` - Forward hanya di jam tertentu (`off` untuk hapus)
+• `.settarget <task_id> <list|all>` - Ganti target list task
 
 👥 **Group Commands:**
 • `.listgrup` - List semua grup
+• `.next` / `.prev` / `.page <n>` - Pindah halaman `.listgrup`, `.listban`, `.detail`
 • `.ban` - Ban grup dari forward
+• `.ban <id> ...` / `.ban title <regex>` / file ID - Ban banyak grup sekaligus
 • `.listban` - List grup yang dibanned
-• `.deleteban` - Hapus grup dari ban list
+• `.deleteban` - Hapus grup dari ban list (bulk sama seperti `.ban`, plus `all`)
+• `.target` - Target list: filter judul, member, folder, tipe grup
 
 ⚙️ **Catatan:**
-• Maksimal 10 forward task bersamaan
-• Forward akan ke semua grup kecuali yang dibanned
-• Proses: Kirim ke semua grup → Tunggu delay → Ulangi
+• Task baru diterima selama kapasitas kirim akun masih cukup
+• Forward ke semua grup kecuali yang dibanned, atau ke target list: `.hiyaok 5 <list>`
+• Mode `rate` (default): cycle mulai tiap `delay` menit, tidak bergeser
+• Mode `delay`: tunggu `delay` menit setelah cycle selesai
 • Task berhenti jika pesan sumber dihapus
 
 ❗️ Jika ada masalah, gunakan .stop untuk hentikan semua task
@@ -93,10 +977,9 @@ Contoh penggunaan:
                 """, parse_mode='md')
                 return
 
-            # Check if maximum tasks reached
-            if len(self.forward_tasks) >= 10:
-                await event.reply("""
-⚠️ **Error:** Maksimal forward task (10) tercapai!
+            if len(self.forward_tasks) >= MAX_FORWARD_TASKS:
+                await event.reply(f"""
+⚠️ **Error:** Maksimal forward task ({MAX_FORWARD_TASKS}) tercapai!
 
 Gunakan:
 • `.stop` untuk stop semua task
@@ -107,15 +990,16 @@ Gunakan:
 
             try:
                 args = event.text.split()
-                if len(args) != 2:
+                if len(args) not in (2, 3):
                     raise ValueError
                 delay = int(args[1])
+                target = args[2] if len(args) == 3 else None
                 if delay < 1:
                     await event.reply("""
 ⚠️ **Error:** Delay minimal 1 menit
 
 Format command:
-`.hiyaok <delay_in_minutes>`
+`.hiyaok <delay_in_minutes> [target_list]`
 Example: `.hiyaok 5`
                     """, parse_mode='md')
                     return
@@ -124,14 +1008,20 @@ Example: `.hiyaok 5`
 ❌ **Error:** Format command tidak valid
 
 Penggunaan yang benar:
-• `.hiyaok <delay>`
+• `.hiyaok <delay> [target_list]`
 • Example: `.hiyaok 5` (delay 5 menit)
                 """, parse_mode='md')
                 return
 
+            if target is not None and target not in self.targets.filters:
+                await event.reply(f"❌ Target list `{target}` tidak ada. Lihat `.target`", parse_mode='md')
+                return
+
             replied_msg = await event.get_reply_message()
             task_id = f"{replied_msg.chat_id}_{replied_msg.id}"
 
+            groups = len(await self.targets.targets(target))
+            # Checked after the last await, so nothing can slip in before the task is added
             if task_id in self.forward_tasks:
                 await event.reply(f"""
 ⚠️ **Error:** Pesan ini sudah dalam proses forward!
@@ -141,134 +1031,35 @@ Gunakan `.detail` untuk cek status
                 """, parse_mode='md')
                 return
 
+            accepted, utilization, cycle_seconds = self.admission.admit(
+                self.loads(), groups, delay, self.forward_interval
+            )
+            if not accepted:
+                await event.reply(f"""
+⚠️ **Error:** Kapasitas kirim akun tidak cukup!
+
+📊 Beban dengan task ini: `{utilization:.0%}` (batas `{ADMISSION_HEADROOM:.0%}`)
+👥 Target: `{groups}` grup • Kapasitas: `{self.admission.rate:.1f}` kirim/menit
+
+Gunakan delay lebih besar, atau `.delforward` untuk hapus task lain.
+                """, parse_mode='md')
+                return
+
             self.forward_tasks[task_id] = ForwardTask(
                 message_id=replied_msg.id,
                 chat_id=replied_msg.chat_id,
-                delay=delay
+                delay=delay,
+                target=target
             )
+            self.forward_tasks[task_id].target_count = groups
 
             # Start forward task
             asyncio.create_task(self._forward_message(task_id, event))
-
-        async def _forward_message(self, task_id: str, event):
-            task = self.forward_tasks[task_id]
-            initial_msg = await event.reply("🔄 **Memulai proses forward...**", parse_mode='md')
-
-            while task.running:
-                try:
-                    # Check if source message still exists
-                    message = await self.client.get_messages(task.chat_id, ids=task.message_id)
-                    if not message:
-                        raise RPCError("Message was deleted")
-
-                    task.last_preview = message.text[:200] if message.text else "[Media Message]"
-                    success = 0
-                    failed = 0
-                    failed_groups = []
-
-                    async for dialog in self.client.iter_dialogs():
-                        if not task.running:
-                            break
-
-                        if dialog.is_group and dialog.id not in self.banned_groups:
-                            try:
-                                await self.client.forward_messages(dialog.id, message)
-                                success += 1
-                                await asyncio.sleep(2)  # Small delay between forwards
-                            except FloodWaitError as e:
-                                await asyncio.sleep(e.seconds)
-                                # Retry once after flood wait
-                                try:
-                                    await self.client.forward_messages(dialog.id, message)
-                                    success += 1
-                                except:
-                                    failed += 1
-                                    failed_groups.append(f"{dialog.title}: Flood limit")
-                            except ChatWriteForbiddenError:
-                                failed += 1
-                                failed_groups.append(f"{dialog.title}: Bot dibanned/dibatasi")
-                            except Exception as e:
-                                failed += 1
-                                failed_groups.append(f"{dialog.title}: {str(e)}")
-
-                    task.success_count += success
-                    task.failed_count += failed
-                    task.failed_groups = failed_groups
-
-                    runtime = datetime.now() - task.start_time
-                    hours, remainder = divmod(runtime.seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-
-                    status = f"""
-📊 **Forward Status:**
-🆔 Task ID: `{task_id}`
-⏱ Runtime: `{hours}h {minutes}m {seconds}s`
-
-📝 **Pesan Preview:**
-`{task.last_preview[:100]}...`
-
-📈 **Cycle Ini:**
-✅ Sukses: `{success}`
-❌ Gagal: `{failed}`
-
-📊 **Total Statistik:**
-✅ Total Sukses: `{task.success_count}`
-❌ Total Gagal: `{task.failed_count}`
-
-⚠️ **Grup yang Gagal (Cycle Ini):**
-```
-{chr(10).join(failed_groups[:5]) if failed_groups else 'Tidak ada'}
-{'...' if len(failed_groups) > 5 else ''}
-```
-
-⏳ Menunggu {task.delay} menit untuk cycle berikutnya...
-                    """
-                    await initial_msg.edit(status, parse_mode='md')
-
-                    if task.running:
-                        await asyncio.sleep(task.delay * 60)
-
-                except RPCError as e:
-                    if "MESSAGE_ID_INVALID" in str(e) or not message:
-                        runtime = datetime.now() - task.start_time
-                        error_msg = f"""
-⚠️ **Forward Task Berhenti!**
-
-❌ **Alasan:** Pesan sumber dihapus/tidak ditemukan
-🆔 **Task ID:** `{task_id}`
-
-📊 **Statistik Akhir:**
-✅ Total Sukses: `{task.success_count}`
-❌ Total Gagal: `{task.failed_count}`
-⏱ Runtime: `{hours}h {minutes}m {seconds}s`
-                        """
-                        await initial_msg.edit(error_msg, parse_mode='md')
-                        if task_id in self.forward_tasks:
-                            del self.forward_tasks[task_id]
-                        break
-                    else:
-                        error_msg = f"""
-⚠️ **Forward Error:**
-Task ID: `{task_id}`
-Error: `{str(e)}`
-
-Task akan dilanjutkan dalam {task.delay} menit...
-                        """
-                        await initial_msg.edit(error_msg, parse_mode='md')
-                        if task.running:
-                            await asyncio.sleep(task.delay * 60)
-
-                except Exception as e:
-                    error_msg = f"""
-⚠️ **Forward Error:**
-Task ID: `{task_id}`
-Error: `{str(e)}`
-
-Task akan dilanjutkan dalam {task.delay} menit...
-                    """
-                    await initial_msg.edit(error_msg, parse_mode='md')
-                    if task.running:
-                        await asyncio.sleep(task.delay * 60)
+            await event.reply(
+                f"✅ Task `{task_id}` diterima • Target `{groups}` grup • Beban akun `{utilization:.0%}` • "
+                f"Perkiraan cycle `{cycle_seconds / 60:.1f}` menit",
+                parse_mode='md'
+            )
 
         @self.client.on(events.NewMessage(pattern=r'[!/\.]detail'))
         async def detail_handler(event):
@@ -279,25 +1070,29 @@ Task akan dilanjutkan dalam {task.delay} menit...
                 await event.reply("📝 Tidak ada forward task yang aktif.", parse_mode='md')
                 return
 
-            details = []
-            for task_id, task in self.forward_tasks.items():
-                runtime = datetime.now() - task.start_time
-                hours, remainder = divmod(runtime.seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
+            async def render(tasks, start):
+                details = []
+                for task_id, task in tasks:
+                    hours, remainder = divmod(task.runtime(), 3600)
+                    minutes, seconds = divmod(remainder, 60)
 
-                details.append(f"""
+                    details.append(f"""
 🔄 **Task ID:** `{task_id}`
-📝 **Preview:** `{task.last_preview[:100]}...`
+📝 **Preview:** `{(task.last_preview or '')[:100]}...`
 ⏱ **Delay:** `{task.delay} menit`
 ⏳ **Runtime:** `{hours}h {minutes}m {seconds}s`
+🗓 **Jadwal:** {task.schedule_text()}
+🎯 **Target:** `{task.target or 'all'}` (`{task.target_count}` grup)
 📊 **Statistik:**
 • Total Sukses: `{task.success_count}`
 • Total Gagal: `{task.failed_count}`
+{await self.failure_summary(task)}
+{task.timing_summary()}
 """)
+                return "\n".join(details).strip()
 
-            await event.reply(
-                "📋 **Active Forward Tasks:**\n" + "\n".join(details),
-                parse_mode='md'
+            await self.paginator.open(
+                event, "📋 **Active Forward Tasks**", list(self.forward_tasks.items()), render, DETAIL_PAGE_SIZE
             )
 
         @self.client.on(events.NewMessage(pattern=r'[!/\.]setdelay'))
@@ -322,10 +1117,24 @@ Format: `.setdelay <task_id> <minutes>`
                     return
 
                 if task_id in self.forward_tasks:
-                    self.forward_tasks[task_id].delay = delay
+                    accepted, utilization, _ = self.admission.admit(
+                        self.loads(skip=task_id), self.forward_tasks[task_id].target_count,
+                        delay, self.forward_interval
+                    )
+                    if not accepted and delay < self.forward_tasks[task_id].delay:
+                        await event.reply(f"""
+⚠️ **Error:** Delay `{delay}` menit membuat beban akun `{utilization:.0%}` (batas `{ADMISSION_HEADROOM:.0%}`)
+                        """, parse_mode='md')
+                        return
+                    task = self.forward_tasks[task_id]
+                    task.delay = delay
+                    if task.waiter:
+                        # Waiting for the next cycle: move the timer now, not after the old delay
+                        self._arm(task)
                     await event.reply(f"""
 ⏱️ **Berhasil!**
 Delay untuk task `{task_id}` diset ke `{delay}` menit
+⏳ Jadwal: {task.schedule_text()}
                     """, parse_mode='md')
                 else:
                     await event.reply("""
@@ -341,6 +1150,63 @@ Penggunaan:
 • Example: `.setdelay 123_456 5`
                 """, parse_mode='md')
 
+        @self.client.on(events.NewMessage(pattern=r'[!/\.]setmode'))
+        async def setmode_handler(event):
+            if event.sender_id != event.client.uid:
+                return
+
+            args = event.text.split()
+            if len(args) != 3 or args[2] not in ('rate', 'delay'):
+                await event.reply("""
+❌ **Error:** Format command tidak valid
+
+Penggunaan:
+• `.setmode <task_id> rate` - cycle mulai tiap delay menit (tidak bergeser)
+• `.setmode <task_id> delay` - tunggu delay menit setelah cycle selesai
+                """, parse_mode='md')
+                return
+
+            task = self.forward_tasks.get(args[1])
+            if not task:
+                await event.reply("❌ **Error:** Task tidak ditemukan!", parse_mode='md')
+                return
+
+            task.mode = args[2]
+            if task.waiter:
+                self._arm(task)
+            await event.reply(f"✅ Task `{args[1]}`: {task.schedule_text()}", parse_mode='md')
+
+        @self.client.on(events.NewMessage(pattern=r'[!/\.]window'))
+        async def window_handler(event):
+            if event.sender_id != event.client.uid:
+                return
+
+            args = event.text.split(maxsplit=2)
+            task = self.forward_tasks.get(args[1]) if len(args) == 3 else None
+            if len(args) != 3:
+                await event.reply("""
+❌ **Error:** Format command tidak valid
+
+Penggunaan:
+• `.window <task_id> 08:00-22:00`
+• `.window <task_id> mon-fri 09:00-17:00`
+• `.window <task_id> off`
+                """, parse_mode='md')
+                return
+            if not task:
+                await event.reply("❌ **Error:** Task tidak ditemukan!", parse_mode='md')
+                return
+
+            try:
+                task.window = None if args[2].strip().lower() == 'off' else TimeWindow.parse(args[2])
+            except ValueError as e:
+                await event.reply(f"❌ **Error:** `{str(e)}`", parse_mode='md')
+                return
+
+            if task.waiter:
+                self._arm(task)
+            await event.reply(f"✅ Task `{args[1]}`: {task.schedule_text()}", parse_mode='md')
+
         @self.client.on(events.NewMessage(pattern=r'[!/\.]stop'))
         async def stop_handler(event):
             if event.sender_id != event.client.uid:
@@ -353,8 +1219,7 @@ Penggunaan:
 
             task_details = []
             for task_id, task in self.forward_tasks.items():
-                runtime = datetime.now() - task.start_time
-                hours, remainder = divmod(runtime.seconds, 3600)
+                hours, remainder = divmod(task.runtime(), 3600)
                 minutes, seconds = divmod(remainder, 60)
 
                 task_details.append(f"""
@@ -364,6 +1229,7 @@ Penggunaan:
 • Failed: `{task.failed_count}`
 ⏱ Runtime: `{hours}h {minutes}m {seconds}s`""")
                 task.running = False
+                task.wake()
 
             self.forward_tasks.clear()
 
@@ -382,11 +1248,11 @@ Penggunaan:
                 task_id = event.text.split()[1]
                 if task_id in self.forward_tasks:
                     task = self.forward_tasks[task_id]
-                    runtime = datetime.now() - task.start_time
-                    hours, remainder = divmod(runtime.seconds, 3600)
+                    hours, remainder = divmod(task.runtime(), 3600)
                     minutes, seconds = divmod(remainder, 60)
 
                     task.running = False
+                    task.wake()
                     del self.forward_tasks[task_id]
 
                     await event.reply(f"""
@@ -418,58 +1284,96 @@ Penggunaan:
             if event.sender_id != event.client.uid:
                 return
 
-            groups = []
-            async for dialog in self.client.iter_dialogs():
-                if dialog.is_group:
-                    try:
-                        member_count = await self.client.get_participants(dialog, limit=0)
-                        groups.append(f"""
-📢 Grup: {dialog.title}
-🆔 ID: `{dialog.id}`
-👥 Members: {len(member_count)}
-{('🚫 Di-ban' if dialog.id in self.banned_groups else '✅ Aktif')}
-                        """)
-                    except Exception as e:
-                        groups.append(f"""
-📢 Grup: {dialog.title}
-🆔 ID: `{dialog.id}`
-👥 Members: Error counting
-⚠️ Error: {str(e)}
-                        """)
-
-            groups_text = "\n".join(groups)
-
-            if len(groups_text) > 4000:
-                # Split into multiple messages if too long
-                message_parts = []
-                current_part = "📋 **Daftar Grup:**\n"
-
-                for group in groups:
-                    if len(current_part) + len(group) > 4000:
-                        message_parts.append(current_part)
-                        current_part = "📋 **Daftar Grup (Lanjutan):**\n" + group
-                    else:
-                        current_part += group
-
-                if current_part:
-                    message_parts.append(current_part)
-
-                for part in message_parts:
-                    await event.reply(part, parse_mode='md')
-            else:
-                await event.reply(
-                    f"📋 **Daftar Grup:**\n{groups_text}",
-                    parse_mode='md'
+            async def render(groups, start):
+                # Member counts are fetched for the shown page only, then stay in the index
+                await self.targets.count_members(groups)
+                return "\n\n".join(
+                    f"{start + i + 1}. 📢 {g.title}\n🆔 `{g.id}` • 👥 {g.members} • "
+                    f"{'🚫 Di-ban' if g.id in self.banned_groups else '✅ Aktif'}"
+                    for i, g in enumerate(groups)
                 )
 
+            await self.paginator.open(event, "📋 **Daftar Grup**", await self.targets.dialogs(), render, PAGE_SIZE)
+
+        async def bulk_ids(event, banned):
+            """Group ids for a bulk `.ban`/`.deleteban`, None when the command has no bulk form.
+
+            Takes ids in the command, `title <regex>`, `all` (deleteban only) or
+            a file with one id per line, attached or replied to.
+            """
+            args = event.text.split(maxsplit=2)
+            source = event if event.document is not None else None
+            if source is None and len(args) == 1 and event.is_reply:
+                # Only a bare command takes its ids from the replied file
+                reply = await event.get_reply_message()
+                if reply is not None and reply.document is not None:
+                    source = reply
+            if source is not None:
+                file = source.file
+                name = (file.name or '').lower() if file else ''
+                mime_type = (file.mime_type or '') if file else ''
+                if mime_type != 'text/plain' and not name.endswith('.txt'):
+                    raise ValueError(ID_FILE_USAGE)
+                if file.size and file.size > ID_FILE_LIMIT:
+                    raise ValueError(f"File terlalu besar (maks {ID_FILE_LIMIT // 1024} KB)\n{ID_FILE_USAGE}")
+                content = await source.download_media(file=bytes)
+                if not content or len(content) > ID_FILE_LIMIT:
+                    raise ValueError(ID_FILE_USAGE)
+                ids = parse_group_ids(content.decode('utf-8', 'ignore'))
+                if not ids:
+                    raise ValueError(f"Tidak ada ID grup yang valid di file\n{ID_FILE_USAGE}")
+                return ids
+
+            if len(args) == 1:
+                return None
+            if args[1] == 'all' and banned:
+                return set(self.banned_groups)
+            if args[1] == 'title':
+                if len(args) != 3:
+                    raise ValueError("Format: `title <regex>`")
+                try:
+                    pattern = re.compile(args[2], re.IGNORECASE)
+                except re.error as e:
+                    raise ValueError(f"Regex tidak valid: {e}")
+                return {
+                    g.id for g in await self.targets.dialogs()
+                    if pattern.search(g.title) and (g.id in self.banned_groups) == banned
+                }
+            ids = parse_group_ids(event.text.split(maxsplit=1)[1])
+            if not ids:
+                raise ValueError("Tidak ada ID grup yang valid")
+            return ids
+
+        async def bulk_report(title, changed, requested):
+            known = {g.id for g in await self.targets.dialogs()}
+            targets = await self.targets.targets()
+            unknown = len(changed - known)
+            return f"""
+{title}
+
+• Diminta: `{requested}` grup • Berubah: `{len(changed)}` grup
+• Total di-ban: `{len(self.banned_groups)}` grup
+• Target forward sekarang: `{len(targets)}` grup{f"{chr(10)}• Tidak ada di daftar dialog: `{unknown}` grup" if unknown else ""}
+            """
+
         @self.client.on(events.NewMessage(pattern=r'[!/\.]ban'))
         async def ban_handler(event):
             if event.sender_id != event.client.uid:
                 return
 
+            try:
+                ids = await bulk_ids(event, banned=False)
+            except ValueError as e:
+                await event.reply(f"❌ **Error:** {str(e)}", parse_mode='md')
+                return
+            if ids is not None:
+                added = self.ban_groups(ids)
+                await event.reply(await bulk_report("🚫 **Bulk Ban Selesai**", added, len(ids)), parse_mode='md')
+                return
+
             if event.is_group:
                 if event.chat_id not in self.banned_groups:
-                    self.banned_groups.add(event.chat_id)
+                    self.ban_groups([event.chat_id])
                     group = await event.get_chat()
                     await event.reply(f"""
 🚫 **Grup Di-ban dari Forward**
@@ -483,7 +1387,12 @@ Gunakan `.deleteban` di grup ini untuk unban.
                 else:
                     await event.reply("ℹ️ Grup ini sudah di-ban dari forward.", parse_mode='md')
             else:
-                await event.reply("❌ Command ini hanya berfungsi di grup!", parse_mode='md')
+                await event.reply("""
+❌ Command ini hanya berfungsi di grup, atau pakai bentuk bulk:
+• `.ban <id> <id> ...`
+• `.ban title <regex>`
+• `.ban` sambil kirim/reply file `.txt` berisi ID (satu per baris)
+                """, parse_mode='md')
 
         @self.client.on(events.NewMessage(pattern=r'[!/\.]listban'))
         async def listban_handler(event):
@@ -494,29 +1403,35 @@ Gunakan `.deleteban` di grup ini untuk unban.
                 await event.reply("📋 **Tidak ada grup yang di-ban**", parse_mode='md')
                 return
 
-            banned = []
-            for group_id in self.banned_groups:
-                try:
-                    group = await self.client.get_entity(group_id)
-                    banned.append(f"• {group.title} (`{group_id}`)")
-                except:
-                    banned.append(f"• Unknown Group (`{group_id}`)")
+            titles = {g.id: g.title for g in await self.targets.dialogs()}
 
-            await event.reply(f"""
-📋 **Daftar Grup yang Di-ban:**
-{chr(10).join(banned)}
+            async def render(group_ids, start):
+                return "\n".join(
+                    f"• {titles.get(group_id, 'Unknown Group')} (`{group_id}`)" for group_id in group_ids
+                )
 
-Total: `{len(self.banned_groups)}` grup
-            """, parse_mode='md')
+            await self.paginator.open(
+                event, "📋 **Daftar Grup yang Di-ban**", sorted(self.banned_groups), render, PAGE_SIZE
+            )
 
         @self.client.on(events.NewMessage(pattern=r'[!/\.]deleteban'))
         async def deleteban_handler(event):
             if event.sender_id != event.client.uid:
                 return
 
+            try:
+                ids = await bulk_ids(event, banned=True)
+            except ValueError as e:
+                await event.reply(f"❌ **Error:** {str(e)}", parse_mode='md')
+                return
+            if ids is not None:
+                removed = self.unban_groups(ids)
+                await event.reply(await bulk_report("✅ **Bulk Unban Selesai**", removed, len(ids)), parse_mode='md')
+                return
+
             if event.is_group:
                 if event.chat_id in self.banned_groups:
-                    self.banned_groups.remove(event.chat_id)
+                    self.unban_groups([event.chat_id])
                     group = await event.get_chat()
                     await event.reply(f"""
 ✅ **Grup Berhasil Di-unban**
@@ -530,7 +1445,161 @@ Grup ini akan menerima forward lagi.
                 else:
                     await event.reply("ℹ️ Grup ini tidak sedang di-ban.", parse_mode='md')
             else:
-                await event.reply("❌ Command ini hanya berfungsi di grup!", parse_mode='md')
+                await event.reply("""
+❌ Command ini hanya berfungsi di grup, atau pakai bentuk bulk:
+• `.deleteban <id> <id> ...`
+• `.deleteban title <regex>`
+• `.deleteban all`
+• `.deleteban` sambil kirim/reply file `.txt` berisi ID (satu per baris)
+                """, parse_mode='md')
+
+        @self.client.on(events.NewMessage(pattern=r'[!/\.]next$'))
+        async def next_handler(event):
+            if event.sender_id != event.client.uid:
+                return
+            await self.paginator.turn(event, 1)
+
+        @self.client.on(events.NewMessage(pattern=r'[!/\.]prev$'))
+        async def prev_handler(event):
+            if event.sender_id != event.client.uid:
+                return
+            await self.paginator.turn(event, -1)
+
+        @self.client.on(events.NewMessage(pattern=r'[!/\.]page (\d+)$'))
+        async def page_handler(event):
+            if event.sender_id != event.client.uid:
+                return
+            await self.paginator.turn(event, page=int(event.pattern_match.group(1)) - 1)
+
+        @self.client.on(events.ChatAction)
+        async def dialogs_changed_handler(event):
+            # Joins, leaves, kicks and renames change the groups the target lists are built from
+            if event.new_title or event.created or event.client.uid in (event.user_ids or ()):
+                self.targets.invalidate(dialogs=True)
+
+        async def show_target(event, name):
+            target_filter = self.targets.filters[name]
+            targets = await self.targets.targets(name)
+            sample = "\n".join(f"• {g.title[:40]} (`{g.id}`)" for g in targets[:10])
+            more = f"\n• ... dan `{len(targets) - 10}` grup lain" if len(targets) > 10 else ""
+            await event.reply(f"""
+🎯 **Target List `{name}`**
+
+⚙️ **Rules:**
+{target_filter.describe()}
+
+👥 **Grup ({len(targets)}):**
+{sample or '• tidak ada grup yang cocok'}{more}
+            """, parse_mode='md')
+
+        @self.client.on(events.NewMessage(pattern=r'[!/\.]target'))
+        async def target_handler(event):
+            if event.sender_id != event.client.uid:
+                return
+
+            args = event.text.split(maxsplit=3)
+            if len(args) == 1:
+                if not self.targets.filters:
+                    await event.reply("📋 **Belum ada target list.** Buat dengan `.target <nama> <rule> <nilai>`", parse_mode='md')
+                    return
+                lines = []
+                for name in self.targets.filters:
+                    count = len(await self.targets.targets(name))
+                    used = sum(1 for t in self.forward_tasks.values() if t.target == name)
+                    lines.append(f"• `{name}`: `{count}` grup • dipakai `{used}` task")
+                await event.reply("🎯 **Target Lists:**\n" + "\n".join(lines), parse_mode='md')
+                return
+
+            if args[1] == 'del' and len(args) == 3:
+                name = args[2]
+                if name not in self.targets.filters:
+                    await event.reply(f"❌ Target list `{name}` tidak ada.", parse_mode='md')
+                    return
+                users = [k for k, t in self.forward_tasks.items() if t.target == name]
+                if users:
+                    await event.reply(
+                        f"⚠️ Target list `{name}` masih dipakai task: {', '.join(f'`{k}`' for k in users)}\n"
+                        f"Pindahkan dulu dengan `.settarget <task_id> all`",
+                        parse_mode='md'
+                    )
+                    return
+                del self.targets.filters[name]
+                self._filters_changed()
+                await event.reply(f"🗑 Target list `{name}` dihapus.", parse_mode='md')
+                return
+
+            name = args[1]
+            if len(args) == 2 and name in self.targets.filters:
+                await show_target(event, name)
+                return
+
+            if len(args) != 4 or args[2] not in TargetFilter.RULES:
+                await event.reply("""
+❌ **Error:** Format command tidak valid
+
+Penggunaan:
+• `.target` - Lihat semua target list
+• `.target <nama>` - Detail target list
+• `.target <nama> title <regex>` - Judul grup cocok dengan regex
+• `.target <nama> members <min>-<max>` - Jumlah member (`1000-`, `-500`)
+• `.target <nama> folder <0|1>` - Daftar utama / arsip
+• `.target <nama> type super|basic` - Supergroup / grup biasa
+• `.target <nama> include <id,id>` - Selalu ikut
+• `.target <nama> exclude <id,id>` - Tidak pernah ikut
+• `.target <nama> <rule> off` - Hapus rule
+• `.target del <nama>` - Hapus target list
+                """, parse_mode='md')
+                return
+
+            target_filter = self.targets.filters.get(name) or TargetFilter(name)
+            try:
+                target_filter.set_rule(args[2], args[3])
+            except ValueError as e:
+                await event.reply(f"❌ **Error:** {str(e)}", parse_mode='md')
+                return
+            self.targets.filters[name] = target_filter
+            self._filters_changed()
+            await show_target(event, name)
+
+        @self.client.on(events.NewMessage(pattern=r'[!/\.]settarget'))
+        async def settarget_handler(event):
+            if event.sender_id != event.client.uid:
+                return
+
+            args = event.text.split()
+            if len(args) != 3:
+                await event.reply("""
+❌ **Error:** Format command tidak valid
+
+Penggunaan:
+• `.settarget <task_id> <target_list>`
+• `.settarget <task_id> all` - Forward ke semua grup
+                """, parse_mode='md')
+                return
+
+            task_id, name = args[1], args[2]
+            task = self.forward_tasks.get(task_id)
+            if task is None:
+                await event.reply("❌ **Error:** Task tidak ditemukan!\nGunakan `.detail` untuk cek task yang aktif", parse_mode='md')
+                return
+            target = None if name == 'all' else name
+            if target is not None and target not in self.targets.filters:
+                await event.reply(f"❌ Target list `{name}` tidak ada. Lihat `.target`", parse_mode='md')
+                return
+
+            groups = len(await self.targets.targets(target))
+            accepted, utilization, _ = self.admission.admit(
+                self.loads(skip=task_id), groups, task.delay, self.forward_interval
+            )
+            if not accepted and groups > task.target_count:
+                await event.reply(f"""
+⚠️ **Error:** Target `{name}` (`{groups}` grup) membuat beban akun `{utilization:.0%}` (batas `{ADMISSION_HEADROOM:.0%}`)
+                """, parse_mode='md')
+                return
+
+            task.target = target
+            task.target_count = groups
+            await event.reply(f"🎯 Task `{task_id}` sekarang forward ke `{name}` (`{groups}` grup) mulai cycle berikutnya", parse_mode='md')
 
         # Add status command
         @self.client.on(events.NewMessage(pattern=r'[!/\.]status'))
@@ -544,6 +1613,21 @@ Grup ini akan menerima forward lagi.
             
             total_forwards = sum(task.success_count for task in self.forward_tasks.values())
             total_fails = sum(task.failed_count for task in self.forward_tasks.values())
+
+            # Timing over every task's rolling window of recent cycles
+            cycles = [c for task in self.forward_tasks.values() for c in task.cycles]
+            if cycles:
+                last_cycles = [task.cycles[-1] for task in self.forward_tasks.values() if task.cycles]
+                timing = f"""
+⏱ **Timing ({len(cycles)} cycle terakhir):**
+• Kirim/menit (semua task): `{sum(c.sends_per_minute for c in last_cycles):.1f}`
+• Durasi cycle rata-rata: `{sum(c.wall for c in cycles) / len(cycles):.1f}s`
+• Scan dialog rata-rata: `{sum(c.dialog_scan for c in cycles) / len(cycles):.1f}s`
+• Kirim p95 terburuk: `{max(c.send_p95 for c in cycles) * 1000:.0f}ms`
+• Total flood wait: `{sum(c.flood_wait for c in cycles):.1f}s`
+"""
+            else:
+                timing = ""
             
             await event.reply(f"""
 🤖 **Userbot Status**
@@ -554,34 +1638,394 @@ Grup ini akan menerima forward lagi.
 • Phone: `{me.phone}`
 
 📊 **Statistics:**
-• Active Tasks: `{active_tasks}/10`
+• Active Tasks: `{active_tasks}`
+• Beban kirim: `{self.admission.utilization(self.loads()):.0%}` dari `{self.admission.rate:.1f}` kirim/menit
 • Banned Groups: `{banned_count}`
 • Total Forwards: `{total_forwards}`
 • Total Fails: `{total_fails}`
-
+{timing}
 💡 Use `.help` for commands list
             """, parse_mode='md')
 
-if __name__ == "__main__":
+    def _arm(self, task):
+        """Point the task's timer at its next cycle, returns the deadline"""
+        if task.mode == 'rate':
+            deadline = max(task.last_started + task.delay * 60, time.monotonic())
+        else:
+            deadline = task.last_finished + task.delay * 60
+        if task.window:
+            now = time.monotonic()
+            at = datetime.now() + timedelta(seconds=deadline - now)
+            deadline += (task.window.next_open(at) - at).total_seconds()
+
+        task.next_run = deadline
+        if task.waiter is None or task.waiter.done():
+            task.waiter = asyncio.get_running_loop().create_future()
+        if task.timer:
+            task.timer.cancel()
+        task.timer = timer_queue.call_at(deadline, task.wake)
+        return deadline
+
+    async def _next_cycle(self, task):
+        """Wait until the task's timer fires, it is re-armed or the task stops"""
+        if task.waiter is None:
+            self._arm(task)
+        try:
+            await task.waiter
+        finally:
+            task.waiter = None
+            if task.timer:
+                task.timer.cancel()
+                task.timer = None
+
+    async def slowmode_interval(self, group):
+        """Slow mode interval of a supergroup in seconds, 0 when unknown"""
+        if not group.megagroup:
+            return 0
+        try:
+            full = await self.client(GetFullChannelRequest(group.peer))
+            return full.full_chat.slowmode_seconds or 0
+        except Exception as e:
+            logger.warning(f"Could not read slow mode of {group.id}: {str(e)}")
+            return 0
+
+    async def _forward_message(self, task_id: str, event):
+        task = self.forward_tasks[task_id]
+        try:
+            await self.status_board.attach(event, task_id)
+        except Exception as e:
+            # Without a dashboard the task can't report, drop it instead of leaving it stuck
+            logger.error(f"Failed to start forward task {task_id}: {str(e)}")
+            task.running = False
+            self.forward_tasks.pop(task_id, None)
+            return
+
+        while task.running:
+            # Anchor on the planned start so fixed-rate cycles don't drift
+            task.last_started = task.next_run or time.monotonic()
+            try:
+                # Check if source message still exists
+                message = await self.client.get_messages(task.chat_id, ids=task.message_id)
+                if not message:
+                    raise RPCError("Message was deleted")
+
+                task.last_preview = message.text[:200] if message.text else "[Media Message]"
+                success = 0
+                failed = 0
+                failed_codes = Counter()
+                cycle = CycleStats()
+
+                # Only non-zero when the dialog list or a target list had to be rebuilt
+                scan_start = time.monotonic()
+                targets = await self.targets.targets(task.target)
+                cycle.dialog_scan = time.monotonic() - scan_start
+                cycle.targets = task.target_count = len(targets)
+
+                for group in targets:
+                    if not task.running:
+                        break
+
+                    sent_at = time.monotonic()
+                    if not self.scheduler.eligible(group.id, sent_at):
+                        # Slow mode or backoff still running, don't waste a send
+                        cycle.skipped += 1
+                        continue
+                    try:
+                        with REGISTRY.timer('userbot_forward_seconds'):
+                            await self.client.forward_messages(group.peer, message)
+                        cycle.add_send(time.monotonic() - sent_at)
+                        self.scheduler.sent(group.id, time.monotonic())
+                        self.admission.sent(time.monotonic())
+                        success += 1
+                        pause_start = time.monotonic()
+                        await asyncio.sleep(self.forward_interval)  # Small delay between forwards
+                        cycle.pause += time.monotonic() - pause_start
+                    except FloodWaitError as e:
+                        cycle.add_send(time.monotonic() - sent_at, ok=False)
+                        wait_start = time.monotonic()
+                        await asyncio.sleep(e.seconds)
+                        cycle.flood_wait += time.monotonic() - wait_start
+                        # Retry once after flood wait
+                        sent_at = time.monotonic()
+                        try:
+                            await self.client.forward_messages(group.peer, message)
+                            cycle.add_send(time.monotonic() - sent_at)
+                            self.scheduler.sent(group.id, time.monotonic())
+                            self.admission.sent(time.monotonic())
+                            success += 1
+                        except:
+                            failed += 1
+                            self.scheduler.failed(group.id, time.monotonic())
+                            code = 'FLOOD'
+                            failed_codes[code] += 1
+                            task.failures.record(group.id, code, time.monotonic())
+                    except SlowModeWaitError as e:
+                        # Not a failure, the group just isn't sendable for a while. e.seconds
+                        # is only the time left, the interval comes from the chat itself
+                        interval = self.scheduler.interval(group.id) or await self.slowmode_interval(group)
+                        self.scheduler.slowed(group.id, interval, time.monotonic(), wait=e.seconds)
+                        cycle.skipped += 1
+                    except PERMANENT_ERRORS:
+                        cycle.add_send(time.monotonic() - sent_at, ok=False)
+                        failed += 1
+                        code = 'FORBIDDEN'
+                        if self.scheduler.failed(group.id, time.monotonic(), permanent=True):
+                            self.ban_groups([group.id])
+                            code = 'QUARANTINED'
+                        failed_codes[code] += 1
+                        task.failures.record(group.id, code, time.monotonic())
+                    except Exception as e:
+                        cycle.add_send(time.monotonic() - sent_at, ok=False)
+                        failed += 1
+                        self.scheduler.failed(group.id, time.monotonic())
+                        code = type(e).__name__
+                        failed_codes[code] += 1
+                        task.failures.record(group.id, code, time.monotonic())
+                cycle.finish()
+                task.cycles.append(cycle)
+                if task.running:
+                    self.admission.observe(cycle, time.monotonic())
+
+                task.success_count += success
+                task.failed_count += failed
+                REGISTRY.inc('userbot_forwards_total', success)
+                REGISTRY.inc('userbot_forward_failures_total', failed)
+
+                hours, remainder = divmod(task.runtime(), 3600)
+                minutes, seconds = divmod(remainder, 60)
+
+                task.last_finished = time.monotonic()
+                if task.running:
+                    self._arm(task)
+
+                status = f"""
+🆔 **Task:** `{task_id}` • ⏱ `{hours}h {minutes}m`
+📝 `{task.last_preview[:60]}...`
+📈 Cycle ini: ✅ `{success}` ❌ `{failed}` ⏭ `{cycle.skipped}` • Total: ✅ `{task.success_count}` ❌ `{task.failed_count}`
+⚠️ Gagal: {', '.join(f'{failure_text(code)} ×{n}' for code, n in failed_codes.most_common(3)) if failed_codes else 'Tidak ada'}
+⏳ Jadwal: {task.schedule_text()}
+                """
+                self.status_board.update(event.chat_id, task_id, status)
+
+                if task.running:
+                    await self._next_cycle(task)
+
+            except RPCError as e:
+                if "MESSAGE_ID_INVALID" in str(e) or not message:
+                    hours, remainder = divmod(task.runtime(), 3600)
+                    minutes, seconds = divmod(remainder, 60)
+                    error_msg = f"""
+⚠️ **Forward Task Berhenti!**
+
+❌ **Alasan:** Pesan sumber dihapus/tidak ditemukan
+🆔 **Task ID:** `{task_id}`
+
+📊 **Statistik Akhir:**
+✅ Total Sukses: `{task.success_count}`
+❌ Total Gagal: `{task.failed_count}`
+⏱ Runtime: `{hours}h {minutes}m {seconds}s`
+                    """
+                    self.status_board.finish(event.chat_id, task_id, error_msg)
+                    if task_id in self.forward_tasks:
+                        del self.forward_tasks[task_id]
+                    break
+                else:
+                    error_msg = f"""
+⚠️ **Forward Error:**
+Task ID: `{task_id}`
+Error: `{str(e)}`
+
+Task akan dilanjutkan dalam {task.delay} menit...
+                    """
+                    self.status_board.update(event.chat_id, task_id, error_msg)
+                    if task.running:
+                        task.last_finished = time.monotonic()
+                        await self._next_cycle(task)
+
+            except Exception as e:
+                error_msg = f"""
+⚠️ **Forward Error:**
+Task ID: `{task_id}`
+Error: `{str(e)}`
+
+Task akan dilanjutkan dalam {task.delay} menit...
+                """
+                self.status_board.update(event.chat_id, task_id, error_msg)
+                if task.running:
+                    task.last_finished = time.monotonic()
+                    await self._next_cycle(task)
+
+        if not task.running:
+            self.status_board.finish(event.chat_id, task_id, f"🛑 Task `{task_id}` dihentikan")
+
+class ControlLogHandler(logging.Handler):
+    """Stream log records to the admin bot as `log` notifications"""
+
+    def __init__(self, channel, loop):
+        super().__init__()
+        self.channel = channel
+        self.loop = loop
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        # Records can come from any thread, the connection lives on the loop
+        self.loop.call_soon_threadsafe(
+            self.channel.notify, 'log', level=record.levelno, name=record.name, message=message
+        )
+
+class ControlChannel:
+    """RPC link to the admin bot over the socket inherited as USERBOT_CONTROL_FD.
+
+    The admin bot asks for health and per-task stats, sends stop commands and
+    restores the persisted ban list; the tenant pushes readiness, counters,
+    ban list changes and its log records.
+    """
+
+    # Methods that are also safe against a userbot hosted inside another
+    # process (admin bot or shard worker), i.e. everything but shutdown
+    SHARED_METHODS = ('health', 'stats', 'stop_task', 'stop_all', 'set_banned', 'set_filters', 'notify')
+
+    def __init__(self, userbot, fd=None):
+        self.userbot = userbot
+        self.fd = fd
+        self.connection = None
+        self.started = time.monotonic()
+
+    def handlers(self):
+        # The 'notify' control method is send_notice, notify() pushes to the admin bot
+        return {
+            'health': self.health,
+            'stats': self.stats,
+            'stop_task': self.stop_task,
+            'stop_all': self.stop_all,
+            'set_banned': self.set_banned,
+            'set_filters': self.set_filters,
+            'notify': self.send_notice,
+            'shutdown': self.shutdown,
+        }
+
+    async def dispatch(self, method, **params):
+        if method not in self.SHARED_METHODS:
+            raise ValueError(f"Unknown control method: {method}")
+        return await self.handlers()[method](**params)
+
+    async def start(self):
+        import socket
+        import rpc
+
+        self.connection = await rpc.connect_socket(
+            socket.socket(fileno=self.fd),
+            handlers=self.handlers(),
+            name='admin'
+        )
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(ControlLogHandler(self, asyncio.get_running_loop()))
+        root.setLevel(logging.INFO)
+
+    def notify(self, method, **params):
+        if self.connection:
+            self.connection.notify(method, **params)
+
+    def ready(self):
+        self.notify('ready', pid=os.getpid())
+
+    async def report_metrics(self, interval=30):
+        """Periodically push counters, the admin bot turns them into per-tenant rates"""
+        while True:
+            await asyncio.sleep(interval)
+            self.notify('metrics', counters=REGISTRY.snapshot_counters('userbot_'))
+
+    async def health(self):
+        return {
+            'pid': os.getpid(),
+            'connected': self.userbot.client.is_connected(),
+            'uptime_s': round(time.monotonic() - self.started, 1),
+            'tasks': len(self.userbot.forward_tasks),
+        }
+
+    async def stats(self):
+        return dict(self.userbot.control_stats(), counters=REGISTRY.snapshot_counters('userbot_'))
+
+    async def stop_task(self, task_id):
+        return {'stopped': self.userbot.stop_tasks([task_id])}
+
+    async def stop_all(self):
+        return {'stopped': self.userbot.stop_tasks()}
+
+    async def set_banned(self, ids):
+        self.userbot.load_banned(ids)
+        return {'banned': len(self.userbot.banned_groups)}
+
+    async def set_filters(self, filters):
+        self.userbot.load_filters(filters)
+        return {'filters': len(self.userbot.targets.filters)}
+
+    async def send_notice(self, text):
+        """Post text to the account's Saved Messages over the tenant's own connection"""
+        await self.userbot.client.send_message('me', text, parse_mode='md')
+        return {'sent': True}
+
+    async def shutdown(self):
+        self.userbot.stop_tasks()
+        asyncio.create_task(self._shutdown())
+        return {'stopping': True}
+
+    async def _shutdown(self):
+        await asyncio.sleep(0)  # let the reply go out first
+        try:
+            await self.userbot.client.disconnect()
+        finally:
+            asyncio.get_running_loop().stop()
+
+def main(argv):
+    """Entry point, also called in a fresh child forked by zygote.py"""
     # Check arguments
-    if len(sys.argv) != 4:
+    if len(argv) != 3:
         print("Usage: python userbot.py <session_string> <api_id> <api_hash>")
         sys.exit(1)
 
-    session_string = sys.argv[1]
-    api_id = int(sys.argv[2])
-    api_hash = sys.argv[3]
+    session_string = argv[0]
+    api_id = int(argv[1])
+    api_hash = argv[2]
+
+    control_fd = os.environ.get('USERBOT_CONTROL_FD')
+    if not control_fd:
+        # Only the script needs the queue logging setup, importers keep their own
+        from logging_setup import setup_logging
+
+        # Without a control channel the admin bot (if any) reads our stdout,
+        # standalone runs keep userbot.log
+        setup_logging(None if os.environ.get('USERBOT_TENANT_ID') else 'userbot.log')
 
     # Create and start userbot
     print("Starting userbot...")
     userbot = Userbot(session_string, api_id, api_hash)
 
-    loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
     
     try:
+        control = None
+        if control_fd:
+            # Logs go to the admin bot through this channel from here on
+            control = ControlChannel(userbot, int(control_fd))
+            loop.run_until_complete(control.start())
+
         print("Connecting to Telegram...")
         loop.run_until_complete(userbot.start())
         print("Userbot is running!")
+        if control:
+            userbot.banned_listener = lambda ids: control.notify('banned_groups', ids=ids)
+            userbot.filters_listener = lambda filters: control.notify('target_filters', filters=filters)
+            control.ready()
+            loop.create_task(control.report_metrics())
         loop.run_forever()
     except KeyboardInterrupt:
         print("Stopping userbot...")
@@ -589,3 +2033,6 @@ if __name__ == "__main__":
         print(f"Error: {str(e)}")
     finally:
         loop.close()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
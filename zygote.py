@@ -0,0 +1,352 @@
+# zygote.py
+"""Preforked template process for userbot tenants.
+
+The zygote imports userbot.py (and with it Telethon) once, then waits on a
+unix socket. For every new tenant the admin bot sends the command line and
+the write ends of the tenant's stdout/stderr pipes, plus its control socket
+(see userbot.ControlChannel). The zygote forks and the child runs
+userbot.main() in an interpreter that is already warm, instead of paying for
+a fresh interpreter and the Telethon import on every start.
+
+    python zygote.py /tmp/userbot-zygote.sock
+
+The zygote exits when its stdin is closed, i.e. when the admin bot is gone.
+Forked tenants run in their own session (setsid) exactly like the ones
+started with subprocess, so signals to their process group work the same.
+
+The zygote is the parent of every tenant, so it reaps them with waitpid and
+reports the exit status back on the socket the spawn request came in on,
+which the admin bot keeps open for the lifetime of the child.
+"""
+import asyncio
+import json
+import os
+import select
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+
+READY_LINE = "ZYGOTE READY"
+MAX_REQUEST = 1024 * 1024
+SPAWN_TIMEOUT = 10
+
+def _run_child(request, out_fd, err_fd, control_fd=None):
+    """Runs in the forked child, never returns into the zygote loop"""
+    code = 1
+    try:
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(out_fd, 1)
+        os.dup2(err_fd, 2)
+        for fd in (devnull, out_fd, err_fd):
+            os.close(fd)
+        # PYTHONUNBUFFERED only applies at interpreter start, the ready line
+        # still has to reach the admin bot immediately
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        if control_fd is not None:
+            # Same socket, but under the fd number it got in this process
+            os.environ['USERBOT_CONTROL_FD'] = str(control_fd)
+        sys.argv = request['argv']
+
+        import random
+        random.seed()
+
+        import userbot
+        userbot.main(sys.argv[1:])
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+def _handle(conn, children, inherited):
+    """Fork one tenant, returns True when conn now belongs to the child"""
+    try:
+        message, fds, _, _ = socket.recv_fds(conn, MAX_REQUEST, 3)
+        if len(fds) not in (2, 3):
+            raise ValueError("expected stdout, stderr and optionally a control fd")
+        request = json.loads(message)
+
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            for obj in inherited + list(children.values()):
+                obj.close()
+            conn.close()
+            _run_child(request, *fds)
+
+        for fd in fds:
+            os.close(fd)
+        conn.sendall(json.dumps({'pid': pid}).encode())
+        children[pid] = conn
+        return True
+    except Exception as e:
+        try:
+            conn.sendall(json.dumps({'error': str(e)}).encode())
+        except OSError:
+            pass
+        return False
+
+def _reap(children):
+    """Collect exited tenants and send each status to its admin socket"""
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            conn.sendall(json.dumps({'exit': os.waitstatus_to_exitcode(status)}).encode())
+        except OSError:
+            pass
+        conn.close()
+
+def serve(path):
+    # The whole point: everything a tenant needs is imported before the fork
+    import userbot  # noqa: F401
+
+    # SIGCHLD only wakes the selector, children are reaped in the loop
+    wake_r, wake_w = socket.socketpair()
+    wake_r.setblocking(False)
+    wake_w.setblocking(False)
+    signal.set_wakeup_fd(wake_w.fileno())
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    listener.listen(16)
+    print(READY_LINE, flush=True)
+
+    children = {}  # pid -> spawn socket the exit status goes to
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    selector.register(wake_r, selectors.EVENT_READ)
+    selector.register(sys.stdin.fileno(), selectors.EVENT_READ)
+    try:
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj is listener:
+                    conn, _ = listener.accept()
+                    if not _handle(conn, children, [listener, wake_r, wake_w]):
+                        conn.close()
+                elif key.fileobj is wake_r:
+                    try:
+                        while wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    _reap(children)
+                elif not os.read(sys.stdin.fileno(), 4096):
+                    return
+    finally:
+        listener.close()
+        for conn in children.values():
+            conn.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+class ForkedProcess:
+    """The part of subprocess.Popen the admin bot uses, for a zygote child
+
+    The exit status arrives on `status`, the socket the spawn went through.
+    The pid is only signalled through a pidfd opened right after the fork,
+    so a recycled pid never gets a signal meant for an exited tenant.
+    """
+
+    def __init__(self, pid, stdout, stderr, status=None):
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.status = status
+        self.returncode = None
+        self.pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                self.pidfd = os.pidfd_open(pid)
+            except OSError:
+                pass
+
+    def poll(self):
+        if self.returncode is None:
+            code = self._read_status()
+            if code is None and self.status is None and self._gone():
+                # Zygote is gone, the process exited but its code is lost
+                code = -1
+            if code is not None:
+                self.returncode = code
+                self._release()
+        return self.returncode
+
+    def _read_status(self):
+        if self.status is None:
+            return None
+        try:
+            message = self.status.recv(MAX_REQUEST)
+        except (BlockingIOError, InterruptedError):
+            return None
+        except OSError:
+            message = b''
+        if not message:
+            # Zygote exited before the child, fall back to the pidfd
+            self.status.close()
+            self.status = None
+            return None
+        return json.loads(message)['exit']
+
+    def _gone(self):
+        if self.pidfd is not None:
+            readable, _, _ = select.select([self.pidfd], [], [], 0)
+            return bool(readable)
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def _release(self):
+        if self.status is not None:
+            self.status.close()
+            self.status = None
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+            self.pidfd = None
+
+    def communicate(self):
+        out = err = ''
+        try:
+            err = self.stderr.read()
+            self.stderr.close()
+        except (ValueError, OSError):
+            pass
+        return out, err
+
+    def send_signal(self, sig):
+        if self.poll() is not None:
+            return
+        try:
+            if self.pidfd is not None:
+                signal.pidfd_send_signal(self.pidfd, sig)
+            else:
+                os.kill(self.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+class ZygoteClient:
+    """Starts the zygote on first use and asks it to fork tenants"""
+
+    def __init__(self, path, script=None):
+        self.path = path
+        self.script = script or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zygote.py')
+        self.process = None
+        self._lock = asyncio.Lock()
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    async def ensure_started(self, timeout=30):
+        async with self._lock:
+            if self.alive():
+                return
+            self.process = subprocess.Popen(
+                [sys.executable, self.script, self.path],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                cwd=os.path.dirname(self.script),
+                text=True
+            )
+            line = await asyncio.wait_for(asyncio.to_thread(self.process.stdout.readline), timeout)
+            if line.strip() != READY_LINE:
+                self.close()
+                raise RuntimeError(f"Zygote gagal start: {line.strip()!r}")
+
+    def _request(self, payload, fds):
+        """Send a spawn request, returns the reply and the open socket"""
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            conn.settimeout(SPAWN_TIMEOUT)
+            conn.connect(self.path)
+            socket.send_fds(conn, [payload], fds)
+            reply = json.loads(conn.recv(MAX_REQUEST))
+        except BaseException:
+            conn.close()
+            raise
+        # Stays open, the zygote writes the exit status here
+        conn.setblocking(False)
+        return reply, conn
+
+    async def spawn(self, argv, env, cwd, control_fd=None):
+        """Fork a tenant running `userbot.main(argv[1:])`, returns a ForkedProcess"""
+        await self.ensure_started()
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        fds = [out_w, err_w] + ([control_fd] if control_fd is not None else [])
+        try:
+            payload = json.dumps({'argv': argv, 'env': env, 'cwd': cwd}).encode()
+            reply, conn = await asyncio.to_thread(self._request, payload, fds)
+        except BaseException:
+            os.close(out_r)
+            os.close(err_r)
+            raise
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+
+        if 'error' in reply:
+            conn.close()
+            os.close(out_r)
+            os.close(err_r)
+            raise RuntimeError(reply['error'])
+        return ForkedProcess(
+            reply['pid'],
+            os.fdopen(out_r, 'r', buffering=1),
+            os.fdopen(err_r, 'r', buffering=1),
+            status=conn
+        )
+
+    def close(self):
+        if self.process:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except Exception:
+                self.process.kill()
+            self.process = None
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python zygote.py <socket_path>")
+        sys.exit(1)
+    serve(sys.argv[1])